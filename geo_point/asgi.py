@@ -13,4 +13,24 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "geo_point.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from geo_service.db import close_async_pools, pool_connections  # noqa: E402
+
+
+async def application(scope, receive, send):
+    # Handles the lifespan protocol of servers like uvicorn: its loop serves
+    # every request of the process, so the async views pool their database
+    # connections there, and the pools are closed on shutdown.
+    if scope["type"] != "lifespan":
+        await django_application(scope, receive, send)
+        return
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            pool_connections()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await close_async_pools()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
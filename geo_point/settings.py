@@ -48,6 +48,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "geo_service.middleware.MetricsMiddleware",
+    "geo_service.middleware.ReplicaPinningMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -81,6 +83,10 @@ WSGI_APPLICATION = "geo_point.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Behind a transaction pooling proxy such as PgBouncer every transaction
+# may run in another server session, so no session state can be relied on.
+DB_TRANSACTION_POOLING = bool(os.getenv("DB_TRANSACTION_POOLING"))
+
 DATABASES = {
     "default": {
         "ENGINE": "django.contrib.gis.db.backends.postgis",
@@ -89,9 +95,49 @@ DATABASES = {
         "PASSWORD": os.getenv("POSTGRES_PASSWORD"),
         "HOST": os.getenv("POSTGRES_HOST"),
         "PORT": os.getenv("POSTGRES_PORT"),
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", 0)),
+        "CONN_HEALTH_CHECKS": True,
+        "DISABLE_SERVER_SIDE_CURSORS": DB_TRANSACTION_POOLING,
     }
 }
 
+# A SpatiaLite file instead of PostGIS for single-node and edge deployments.
+# Bounding box queries, vector tiles, file imports and the async views need
+# PostGIS and answer 501 there.
+DB_ENGINE = os.getenv("DB_ENGINE", "postgis")
+
+if DB_ENGINE == "spatialite":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.contrib.gis.db.backends.spatialite",
+            "NAME": os.getenv("SPATIALITE_PATH", BASE_DIR / "db.sqlite3"),
+        }
+    }
+    if os.getenv("SPATIALITE_LIBRARY_PATH"):
+        SPATIALITE_LIBRARY_PATH = os.getenv("SPATIALITE_LIBRARY_PATH")
+
+# Streaming replicas of the default database as comma separated host[:port]
+# pairs. Place reads are spread over them, see geo_service.routers.
+DB_REPLICAS = []
+if DB_ENGINE != "spatialite":
+    for number, replica in enumerate(
+        filter(None, os.getenv("DB_REPLICA_HOSTS", "").split(","))
+    ):
+        host, _, port = replica.strip().partition(":")
+        DATABASES[f"replica_{number}"] = {
+            **DATABASES["default"],
+            "HOST": host,
+            "PORT": port or DATABASES["default"]["PORT"],
+            "TEST": {"MIRROR": "default"},
+        }
+        DB_REPLICAS.append(f"replica_{number}")
+
+DATABASE_ROUTERS = ["geo_service.routers.ReplicaRouter"]
+
+# How long reads of a client stay on the primary after it wrote, which has
+# to cover the replication lag.
+DB_REPLICA_STICKY_SECONDS = int(os.getenv("DB_REPLICA_STICKY_SECONDS", 5))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -147,3 +193,143 @@ SPECTACULAR_SETTINGS = {
 }
 
 DEFAULT_SRID = 4326
+
+NEAREST_POINT_MAX_K = 100
+NEAREST_POINT_BATCH_SIZE = 1000
+
+PLACE_IMPORT_BATCH_SIZE = 5000
+PLACE_IMPORT_MAX_REJECTS = 1000
+
+# Coordinates are snapped to a grid of this size (in degrees) before being
+# stored, so places closer than the tolerance count as duplicates.
+PLACE_COORDINATE_TOLERANCE = None
+
+# In-memory KD-tree answering nearest point lookups without PostGIS. It is
+# patched from model signals of the current process and rebuilt once it is
+# older than SPATIAL_INDEX_MAX_AGE seconds, which bounds how long writes
+# made by other worker processes can go unnoticed.
+SPATIAL_INDEX_ENGINE = bool(os.getenv("SPATIAL_INDEX_ENGINE"))
+SPATIAL_INDEX_MAX_AGE = int(os.getenv("SPATIAL_INDEX_MAX_AGE", 300))
+# Every lookup scans the patched places linearly, so the index is rebuilt
+# once there are more than SPATIAL_INDEX_MAX_PATCHES of them.
+SPATIAL_INDEX_MAX_PATCHES = 256
+
+# Response cache for nearest point lookups: "lru" keeps it in process,
+# "django" stores it in the NEAREST_POINT_CACHE_ALIAS cache. Lookups share
+# an entry per geohash cell of the given precision when the answer is the
+# same for the whole cell, and only answers within
+# NEAREST_POINT_CACHE_RADIUS meters are cached. Writes only invalidate the
+# "lru" entries of their own process, so these expire after
+# NEAREST_POINT_CACHE_LRU_TIMEOUT seconds.
+NEAREST_POINT_CACHE_BACKEND = os.getenv("NEAREST_POINT_CACHE_BACKEND")
+NEAREST_POINT_CACHE_ALIAS = "default"
+NEAREST_POINT_CACHE_MAX_ENTRIES = 100_000
+NEAREST_POINT_CACHE_TIMEOUT = 3600
+NEAREST_POINT_CACHE_LRU_TIMEOUT = 10
+NEAREST_POINT_CACHE_PRECISION = 7
+NEAREST_POINT_CACHE_REGION_PRECISION = 4
+NEAREST_POINT_CACHE_RADIUS = 50_000
+
+PLACE_LIST_PAGE_SIZE = 100
+PLACE_LIST_MAX_PAGE_SIZE = 1000
+# Places fetched per round trip when a list is streamed.
+PLACE_STREAM_CHUNK_SIZE = 2000
+
+# A bounding box query returns places while at most PLACE_BBOX_MAX_PLACES
+# fall inside, and grid clusters above that. The grid has
+# PLACE_BBOX_CLUSTER_CELLS cells across a map tile of the requested zoom,
+# and never more than PLACE_BBOX_MAX_GRID cells across the box.
+PLACE_BBOX_MAX_PLACES = 500
+PLACE_BBOX_CLUSTER_CELLS = 8
+PLACE_BBOX_MAX_GRID = 64
+
+# Directory for rendered vector tiles, tile caching is off when unset.
+TILE_CACHE_DIR = os.getenv("TILE_CACHE_DIR")
+TILE_CACHE_MAX_ZOOM = 16
+
+# Pool of the async read views under api/geo/async/, per worker process.
+ASYNC_DB_POOL_MIN_SIZE = int(os.getenv("ASYNC_DB_POOL_MIN_SIZE", 1))
+ASYNC_DB_POOL_MAX_SIZE = int(os.getenv("ASYNC_DB_POOL_MAX_SIZE", 10))
+ASYNC_DB_POOL_TIMEOUT = 30
+
+# Hot queries are prepared once per database session, which pays off with
+# persistent connections (DB_CONN_MAX_AGE). Prepared statements are session
+# state, so they stay off under transaction pooling.
+DB_PREPARED_STATEMENTS = (
+    bool(os.getenv("DB_PREPARED_STATEMENTS")) and not DB_TRANSACTION_POOLING
+)
+
+# SpatiaLite looks for nearest places in a frame of this many meters around
+# the point first and widens it fourfold until the frame holds them.
+SPATIALITE_NEAREST_RADIUS = 1000
+
+# Queries PlaceViewSet runs that take longer than SLOW_QUERY_THRESHOLD
+# milliseconds are logged and kept in a ring of SLOW_QUERY_LOG_SIZE entries
+# in the SLOW_QUERY_LOG_CACHE_ALIAS cache, which has to be shared for the
+# slow_queries command to see them. SLOW_QUERY_EXPLAIN_RATE of them are
+# explained, which runs them a second time.
+SLOW_QUERY_THRESHOLD = (
+    float(os.getenv("SLOW_QUERY_THRESHOLD"))
+    if os.getenv("SLOW_QUERY_THRESHOLD")
+    else None
+)
+SLOW_QUERY_EXPLAIN_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_RATE", 1.0))
+SLOW_QUERY_LOG_SIZE = 500
+SLOW_QUERY_LOG_CACHE_ALIAS = "default"
+
+# Radius searches return pages of PLACE_RADIUS_PAGE_SIZE places, and stop
+# after PLACE_RADIUS_MAX_RESULTS places however many are in the radius.
+PLACE_RADIUS_PAGE_SIZE = 100
+PLACE_RADIUS_MAX_PAGE_SIZE = 1000
+PLACE_RADIUS_MAX_RESULTS = 10_000
+
+# Full-text search returns PLACE_SEARCH_LIMIT places by default. Near a
+# given point the text rank is scaled by
+# PLACE_SEARCH_DISTANCE_SCALE / (PLACE_SEARCH_DISTANCE_SCALE + distance),
+# so a place that far away counts half as much as one right there.
+PLACE_SEARCH_LIMIT = 20
+PLACE_SEARCH_MAX_LIMIT = 100
+PLACE_SEARCH_DISTANCE_SCALE = 10_000
+
+# The export endpoint runs one COPY per page of this many places.
+PLACE_EXPORT_CHUNK_SIZE = 50_000
+
+# CACHE_URL (redis://host:6379/0) keeps the default cache in Redis, shared
+# by every worker. Without it each process has a cache of its own.
+if os.getenv("CACHE_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("CACHE_URL"),
+        }
+    }
+
+# Holds the dataset version behind the ETags of place lists and nearest
+# point lookups, which are only sent with DATASET_ETAGS. In a cache of its
+# own, a write would only replace the version of the process that made it
+# while the others kept answering 304, so it defaults to on with CACHE_URL.
+DATASET_VERSION_CACHE_ALIAS = "default"
+DATASET_ETAGS = bool(os.getenv("DATASET_ETAGS", os.getenv("CACHE_URL")))
+
+# Set once geo_service_place is partitioned by region (partition_places).
+# Nearest, radius, bounding box and search queries are then limited to the
+# regions they can reach, so PostgreSQL only visits those partitions.
+PLACE_PARTITIONED = bool(os.getenv("PLACE_PARTITIONED"))
+
+# With PLACE_INGEST_ASYNC set, creates are answered 202 with an
+# acknowledgement id as soon as they are validated, and written by a
+# background thread in multi-row INSERTs of up to PLACE_INGEST_BATCH_SIZE
+# places at least every PLACE_INGEST_FLUSH_MS milliseconds. At most
+# PLACE_INGEST_QUEUE_SIZE places wait per process, further creates get a
+# 503. Acknowledgements are kept in the PLACE_INGEST_CACHE_ALIAS cache for
+# PLACE_INGEST_STATUS_TIMEOUT seconds.
+PLACE_INGEST_ASYNC = bool(os.getenv("PLACE_INGEST_ASYNC"))
+PLACE_INGEST_QUEUE_SIZE = int(os.getenv("PLACE_INGEST_QUEUE_SIZE", 10_000))
+PLACE_INGEST_BATCH_SIZE = int(os.getenv("PLACE_INGEST_BATCH_SIZE", 500))
+PLACE_INGEST_FLUSH_MS = int(os.getenv("PLACE_INGEST_FLUSH_MS", 50))
+PLACE_INGEST_CACHE_ALIAS = "default"
+PLACE_INGEST_STATUS_TIMEOUT = 3600
+
+# The change feed returns pages of PLACE_CHANGES_PAGE_SIZE changes.
+PLACE_CHANGES_PAGE_SIZE = 1000
+PLACE_CHANGES_MAX_PAGE_SIZE = 10_000
@@ -22,9 +22,16 @@ from drf_spectacular.views import (
     SpectacularRedocView,
 )
 
+from geo_service.views import metrics
+
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path(
+        "api/geo/async/",
+        include("geo_service.async_urls", namespace="geoservice-async"),
+    ),
     path("api/geo/", include("geo_service.urls", namespace="geoservice")),
+    path("metrics", metrics, name="metrics"),
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path(
         "api/doc/swagger/",
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class GeoServiceConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "geo_service"
+
+    def ready(self):
+        from geo_service import receivers  # noqa: F401
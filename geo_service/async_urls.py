@@ -0,0 +1,15 @@
+from django.urls import path
+
+from geo_service import async_views
+
+urlpatterns = [
+    path("places/", async_views.list_places, name="place-list"),
+    path("places/<int:pk>/", async_views.retrieve, name="place-detail"),
+    path(
+        "places/get_nearest_point/",
+        async_views.get_nearest_point,
+        name="place-get-nearest-point",
+    ),
+]
+
+app_name = "geoservice-async"
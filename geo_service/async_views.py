@@ -0,0 +1,204 @@
+import functools
+import time
+
+from django.conf import settings
+from django.db import connections, router
+from django.http import HttpResponse, HttpResponseNotAllowed
+from psycopg.rows import dict_row
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from geo_service.db import async_connection
+from geo_service.metrics import current_metrics, measure
+from geo_service.models import DESCRIPTION_HEAD_PATTERN, Place
+from geo_service.pagination import PlaceCursorPagination
+from geo_service.queries import (
+    NEAREST_PLACES_SQL,
+    PLACE_SQL,
+    PLACE_TABLE,
+    WITHIN_DISTANCE_CLAUSE,
+)
+from geo_service.serializers import place_list_row
+from geo_service.views import PlaceViewSet
+
+PLACES_PAGE_SQL = """
+    SELECT
+        id,
+        name,
+        coalesce(substring(description, %(pattern)s), '') AS description_head,
+        ST_Y(geom) AS latitude,
+        ST_X(geom) AS longitude
+    FROM {table}
+    {where}
+    ORDER BY id {direction}
+    OFFSET %(offset)s
+    LIMIT %(limit)s
+"""
+
+
+def _response(data, status_code: int = status.HTTP_200_OK) -> HttpResponse:
+    # Rendered like the DRF views, so both paths give the same bytes.
+    with measure("serialization"):
+        content = JSONRenderer().render(data)
+    return HttpResponse(
+        content, content_type="application/json", status=status_code
+    )
+
+
+def _postgis_only(view):
+    # The pool speaks to PostgreSQL only, there is nothing to pool for
+    # SpatiaLite.
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if connections["default"].vendor != "postgresql":
+            return _response(
+                "This endpoint needs the PostGIS database backend.",
+                status.HTTP_501_NOT_IMPLEMENTED,
+            )
+        return await view(request, *args, **kwargs)
+
+    return wrapper
+
+
+async def _fetch(sql: str, params: dict) -> list:
+    async with async_connection(router.db_for_read(Place)) as connection:
+        cursor = connection.cursor(row_factory=dict_row)
+        # Pooled connections bypass Django's execute wrappers.
+        metrics = current_metrics()
+        started = time.perf_counter()
+        await cursor.execute(sql, params)
+        rows = await cursor.fetchall()
+        if metrics is not None:
+            metrics.queries += 1
+            metrics.add("sql", time.perf_counter() - started)
+        return rows
+
+
+@_postgis_only
+async def get_nearest_point(request):
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    latitude = request.GET.get("latitude")
+    longitude = request.GET.get("longitude")
+    distance = request.GET.get("distance")
+    k = request.GET.get("k")
+
+    if latitude is None or longitude is None:
+        return _response(
+            "You have to provide latitude and longitude.",
+            status.HTTP_400_BAD_REQUEST,
+        )
+    if not PlaceViewSet.is_number(latitude) or not PlaceViewSet.is_number(
+        longitude
+    ):
+        return _response(
+            "You have to provide valid latitude and longitude.",
+            status.HTTP_400_BAD_REQUEST,
+        )
+    if k is not None and not PlaceViewSet.is_valid_k(k):
+        return _response(
+            f"k must be an integer between 1 and "
+            f"{settings.NEAREST_POINT_MAX_K}.",
+            status.HTTP_400_BAD_REQUEST,
+        )
+    sql = NEAREST_PLACES_SQL.format(
+        table=PLACE_TABLE,
+        srid=settings.DEFAULT_SRID,
+        where=WITHIN_DISTANCE_CLAUSE if distance else "",
+    )
+    rows = await _fetch(
+        sql,
+        {
+            "longitude": float(longitude),
+            "latitude": float(latitude),
+            "max_distance": int(distance) if distance else None,
+            "k": int(k) if k else 1,
+        },
+    )
+    if not rows:
+        return _response(
+            {"detail": "No nearest point found."}, status.HTTP_404_NOT_FOUND
+        )
+    places = [
+        {
+            "id": row["id"],
+            "name": row["name"],
+            "description": row["description"],
+            "latitude": row["latitude"],
+            "longitude": row["longitude"],
+            "distance": row["distance"],
+        }
+        for row in rows
+    ]
+    return _response(places if k else places[0])
+
+
+@_postgis_only
+async def retrieve(request, pk: int):
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    rows = await _fetch(PLACE_SQL.format(table=PLACE_TABLE), {"id": pk})
+    if not rows:
+        return _response({"detail": "Not found."}, status.HTTP_404_NOT_FOUND)
+    return _response(rows[0])
+
+
+@_postgis_only
+async def list_places(request):
+    """A page of places like the sync list gives, whose cursors work on
+    either."""
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    paginator = PlaceCursorPagination()
+    query = Request(request)
+    page_size = paginator.get_page_size(query)
+    try:
+        cursor = paginator.decode_cursor(query)
+    except NotFound as error:
+        return _response({"detail": error.detail}, error.status_code)
+    offset, reverse, position = cursor or (0, False, None)
+    rows = await _fetch(
+        PLACES_PAGE_SQL.format(
+            table=PLACE_TABLE,
+            where=(
+                f"WHERE id {'<' if reverse else '>'} %(position)s"
+                if position is not None
+                else ""
+            ),
+            direction="DESC" if reverse else "ASC",
+        ),
+        {
+            "pattern": DESCRIPTION_HEAD_PATTERN,
+            "position": int(position) if position is not None else None,
+            "offset": offset,
+            "limit": page_size + 1,
+        },
+    )
+
+    # The state CursorPagination.paginate_queryset leaves for its links.
+    paginator.base_url = request.build_absolute_uri()
+    paginator.ordering = (paginator.ordering,)
+    paginator.page_size = page_size
+    paginator.cursor = cursor
+    paginator.page = rows[:page_size]
+    following = str(rows[-1]["id"]) if len(rows) > page_size else None
+    positioned = position is not None or offset > 0
+    if reverse:
+        paginator.page.reverse()
+        paginator.has_next, paginator.next_position = positioned, position
+        paginator.has_previous = following is not None
+        paginator.previous_position = following
+    else:
+        paginator.has_next = following is not None
+        paginator.next_position = following
+        paginator.has_previous = positioned
+        paginator.previous_position = position
+    return _response(
+        {
+            "next": paginator.get_next_link(),
+            "previous": paginator.get_previous_link(),
+            "results": [place_list_row(row) for row in paginator.page],
+        }
+    )
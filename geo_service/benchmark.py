@@ -0,0 +1,341 @@
+import http.client
+import json
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+SCENARIOS = ("nearest", "list", "create", "update")
+
+# Share of generated places spread uniformly instead of around a cluster.
+BACKGROUND_SHARE = 0.1
+
+WORDS = (
+    "old town square river bridge museum park market church castle "
+    "station harbour gallery library theatre garden tower street hill "
+    "lake forest monument palace fountain"
+).split()
+
+KM_PER_DEGREE = 111.32
+
+
+class PlaceGenerator:
+    """Reproducible stream of clustered places.
+
+    Places gather around ``clusters`` centres like towns, with
+    Zipf-distributed cluster sizes and a normal spread of a few
+    kilometres, plus a uniform background. The same seed always gives the
+    same places and the same query points.
+    """
+
+    def __init__(self, seed: int = 0, clusters: int = 1000):
+        self.seed = seed
+        generator = random.Random(seed)
+        self.centres = [
+            (
+                generator.uniform(-180, 180),
+                math.degrees(math.asin(generator.uniform(-0.95, 0.95))),
+                generator.uniform(1, 25),
+            )
+            for _ in range(clusters)
+        ]
+        self.weights = list(
+            _cumulative(1 / rank for rank in range(1, clusters + 1))
+        )
+
+    def _coordinates(self, generator: random.Random) -> tuple:
+        if generator.random() < BACKGROUND_SHARE:
+            return (
+                generator.uniform(-180, 180),
+                math.degrees(math.asin(generator.uniform(-1, 1))),
+            )
+        longitude, latitude, spread = generator.choices(
+            self.centres, cum_weights=self.weights
+        )[0]
+        latitude += generator.gauss(0, spread / KM_PER_DEGREE)
+        latitude = max(min(latitude, 90.0), -90.0)
+        scale = KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01)
+        longitude += generator.gauss(0, spread / scale)
+        longitude = (longitude + 180) % 360 - 180
+        return round(longitude, 7), round(latitude, 7)
+
+    def places(self, count: int):
+        generator = random.Random(f"{self.seed}:places")
+        for number in range(1, count + 1):
+            longitude, latitude = self._coordinates(generator)
+            yield {
+                "name": f"Place {number}",
+                "description": " ".join(
+                    generator.choices(WORDS, k=generator.randint(3, 40))
+                ).capitalize(),
+                "longitude": longitude,
+                "latitude": latitude,
+            }
+
+    def points(self, stream: str):
+        generator = random.Random(f"{self.seed}:{stream}")
+        while True:
+            yield self._coordinates(generator)
+
+
+def _cumulative(values):
+    total = 0.0
+    for value in values:
+        total += value
+        yield total
+
+
+class NDJSONStream:
+    """Text stream of places as NDJSON, readable by ``import_places``."""
+
+    def __init__(self, places):
+        self._lines = (json.dumps(place) + "\n" for place in places)
+        self._buffer = ""
+
+    def read(self, size: int = -1) -> str:
+        pieces = [self._buffer]
+        length = len(self._buffer)
+        while size < 0 or length < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            pieces.append(line)
+            length += len(line)
+        data = "".join(pieces)
+        if size < 0:
+            size = len(data)
+        self._buffer = data[size:]
+        return data[:size]
+
+
+def percentile(values: list, fraction: float) -> float:
+    """Linear interpolation between the closest ranks of sorted values."""
+    if not values:
+        return 0.0
+    position = (len(values) - 1) * fraction
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def summarize(latencies: list, errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies) * 1000, 3)
+            if latencies
+            else 0.0,
+            **{
+                name: round(percentile(latencies, fraction) * 1000, 3)
+                for name, fraction in (
+                    ("p50", 0.5),
+                    ("p95", 0.95),
+                    ("p99", 0.99),
+                )
+            },
+            "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        },
+    }
+
+
+class LoadRunner:
+    """Drives the API over HTTP from ``concurrency`` threads.
+
+    Each thread keeps one connection open and picks scenarios by weight
+    until ``requests`` requests were sent or ``duration`` seconds passed.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        scenarios: dict,
+        concurrency: int = 8,
+        duration: float = 30.0,
+        requests: int = None,
+        seed: int = 0,
+        k: int = None,
+    ):
+        self.base_url = base_url.rstrip("/") + "/"
+        self.scenarios = scenarios
+        self.concurrency = concurrency
+        self.duration = duration
+        self.requests = requests
+        self.seed = seed
+        self.k = k
+        self.generator = PlaceGenerator(seed)
+        self._lock = threading.Lock()
+        self._sent = 0
+        self._ids = []
+        self._latencies = {scenario: [] for scenario in SCENARIOS}
+        self._errors = {scenario: 0 for scenario in SCENARIOS}
+
+    def _connection(self):
+        url = urlsplit(self.base_url)
+        connection_class = (
+            http.client.HTTPSConnection
+            if url.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        return connection_class(url.netloc, timeout=30)
+
+    def _path(self, path: str, query: dict = None) -> str:
+        path = urlsplit(self.base_url).path + path
+        return f"{path}?{urlencode(query)}" if query else path
+
+    def _take_request(self) -> bool:
+        with self._lock:
+            if self.requests is not None and self._sent >= self.requests:
+                return False
+            self._sent += 1
+            return True
+
+    def _request(self, scenario: str, points, generator, number: str):
+        longitude, latitude = next(points)
+        body = None
+        if scenario == "nearest":
+            query = {"latitude": latitude, "longitude": longitude}
+            if self.k:
+                query["k"] = self.k
+            return "GET", self._path("places/get_nearest_point/", query), body
+        if scenario == "list":
+            return "GET", self._path("places/", {"page_size": 100}), body
+        place = {
+            "name": f"Benchmark place {number}",
+            "description": "Created by the benchmark",
+            "latitude": latitude,
+            "longitude": longitude,
+            "srid": 4326,
+        }
+        if scenario == "update":
+            with self._lock:
+                pk = generator.choice(self._ids)
+            return "PATCH", self._path(f"places/{pk}/"), place
+        return "POST", self._path("places/"), {**place, "on_conflict": "skip"}
+
+    def _worker(self, worker: int, deadline: float) -> None:
+        generator = random.Random(f"{self.seed}:worker:{worker}")
+        points = self.generator.points(f"queries:{worker}")
+        names = list(self.scenarios)
+        weights = [self.scenarios[name] for name in names]
+        connection = self._connection()
+        number = 0
+        try:
+            while time.monotonic() < deadline and self._take_request():
+                number += 1
+                scenario = generator.choices(names, weights)[0]
+                if scenario == "update" and not self._ids:
+                    # Nothing to update yet, create a place instead.
+                    scenario = "create"
+                method, path, body = self._request(
+                    scenario, points, generator, f"{worker}-{number}"
+                )
+                headers = {"Accept": "application/json"}
+                if body is not None:
+                    body = json.dumps(body)
+                    headers["Content-Type"] = "application/json"
+                started = time.perf_counter()
+                try:
+                    connection.request(method, path, body, headers)
+                    response = connection.getresponse()
+                    content = response.read()
+                except (OSError, http.client.HTTPException):
+                    connection.close()
+                    connection = self._connection()
+                    with self._lock:
+                        self._errors[scenario] += 1
+                    continue
+                latency = time.perf_counter() - started
+                with self._lock:
+                    if response.status >= 500:
+                        self._errors[scenario] += 1
+                    else:
+                        self._latencies[scenario].append(latency)
+                    if method == "POST" and response.status == 201:
+                        self._ids.append(json.loads(content)["id"])
+        finally:
+            connection.close()
+
+    def _seed_ids(self) -> None:
+        connection = self._connection()
+        try:
+            connection.request(
+                "GET", self._path("places/", {"page_size": 1000})
+            )
+            response = connection.getresponse()
+            if response.status == 200:
+                self._ids = [
+                    place["id"]
+                    for place in json.loads(response.read())["results"]
+                ]
+        finally:
+            connection.close()
+
+    def run(self) -> dict:
+        if "update" in self.scenarios:
+            self._seed_ids()
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.duration
+        with ThreadPoolExecutor(self.concurrency) as executor:
+            for future in [
+                executor.submit(self._worker, worker, deadline)
+                for worker in range(self.concurrency)
+            ]:
+                future.result()
+        elapsed = time.perf_counter() - started
+        latencies = [
+            latency
+            for scenario_latencies in self._latencies.values()
+            for latency in scenario_latencies
+        ]
+        return {
+            "config": {
+                "base_url": self.base_url,
+                "scenarios": self.scenarios,
+                "concurrency": self.concurrency,
+                "duration": self.duration,
+                "requests": self.requests,
+                "seed": self.seed,
+                "k": self.k,
+            },
+            "elapsed": round(elapsed, 3),
+            "scenarios": {
+                scenario: summarize(
+                    self._latencies[scenario], self._errors[scenario], elapsed
+                )
+                for scenario in SCENARIOS
+                if scenario in self.scenarios or self._latencies[scenario]
+            },
+            "total": summarize(latencies, sum(self._errors.values()), elapsed),
+        }
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.1) -> list:
+    """Differences between two runs as ``(scenario, metric, baseline,
+    current, change, regressed)`` rows.
+
+    Latencies regress when they grow by more than ``threshold``,
+    throughput when it drops by more than ``threshold``.
+    """
+    rows = []
+    for scenario, result in current["scenarios"].items():
+        before = baseline["scenarios"].get(scenario)
+        if before is None:
+            continue
+        metrics = [("throughput", before["throughput"], result["throughput"])]
+        metrics += [
+            (name, before["latency_ms"][name], result["latency_ms"][name])
+            for name in ("p50", "p95", "p99")
+        ]
+        for metric, old, new in metrics:
+            change = (new - old) / old if old else 0.0
+            if metric == "throughput":
+                regressed = change < -threshold
+            else:
+                regressed = change > threshold
+            rows.append((scenario, metric, old, new, change, regressed))
+    return rows
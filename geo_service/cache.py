@@ -0,0 +1,321 @@
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.contrib.gis.measure import Distance as DistanceMeasure
+from django.core.cache import caches
+
+from geo_service import geohash
+from geo_service.models import Place
+from geo_service.spatial_index import (
+    EARTH_RADIUS,
+    chord_to_distance,
+    spheroid_distance,
+    to_unit_vector,
+)
+
+KEY_PREFIX = "geo:nearest"
+GLOBAL_TOKEN_KEY = f"{KEY_PREFIX}:token"
+
+# Above this many regions a single write invalidates everything instead.
+MAX_INVALIDATED_REGIONS = 1024
+
+
+class LRUCacheBackend:
+    """Entries of one process, kept at most ``timeout`` seconds: writes
+    only invalidate the entries of the process that made them."""
+
+    def __init__(self, max_entries: int, timeout: float):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: list) -> dict:
+        found = {}
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                if key not in self._entries:
+                    continue
+                expires, value = self._entries[key]
+                if expires <= now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = value
+        return found
+
+    def set_many(self, values: dict) -> None:
+        expires = time.monotonic() + self.timeout
+        with self._lock:
+            for key, value in values.items():
+                self._entries[key] = expires, value
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def add(self, key: str, value) -> None:
+        if self.get_many([key]):
+            return
+        self.set_many({key: value})
+
+
+class DjangoCacheBackend:
+    def __init__(self, alias: str, timeout: int):
+        self.cache = caches[alias]
+        self.timeout = timeout
+
+    def get_many(self, keys: list) -> dict:
+        return self.cache.get_many(keys)
+
+    def set_many(self, values: dict) -> None:
+        self.cache.set_many(values, timeout=self.timeout)
+
+    def add(self, key: str, value) -> None:
+        self.cache.add(key, value, timeout=self.timeout)
+
+
+def _new_token() -> str:
+    return uuid.uuid4().hex
+
+
+def _cell_diagonal(cell: str) -> float:
+    # On the sphere places are ranked, on the spheroid they are measured.
+    corners = geohash.bounds(cell)
+    return max(
+        _distance(to_unit_vector(*corners[:2]), to_unit_vector(*corners[2:])),
+        spheroid_distance(*corners),
+    )
+
+
+def _distance(a: tuple, b: tuple) -> float:
+    return chord_to_distance(math.dist(a, b))
+
+
+def _measured_from(point: Point, rows: list) -> list:
+    """Places of the cached ``rows``, measured from ``point`` and ordered
+    like the lookups order them."""
+    origin = to_unit_vector(point.x, point.y)
+    ranked = []
+    for pk, name, description, longitude, latitude in rows:
+        place = Place(
+            id=pk,
+            name=name,
+            description=description,
+            geom=Point(longitude, latitude, srid=settings.DEFAULT_SRID),
+        )
+        place.distance = DistanceMeasure(
+            m=spheroid_distance(point.x, point.y, longitude, latitude)
+        )
+        rank = _distance(origin, to_unit_vector(longitude, latitude))
+        ranked.append((rank, pk, place))
+    ranked.sort(key=lambda item: item[:2])
+    return [place for _, _, place in ranked]
+
+
+class NearestPointCache:
+    """Response cache for nearest point lookups.
+
+    Lookups are quantized to a geohash cell. An answer is cached only when
+    it holds for every point of the cell: the k places found must be
+    nearer, by more than twice the cell diagonal, than any other place,
+    and none may be within a diagonal of the maximum distance. A cached
+    answer gets its distances measured again from the point looked up, on
+    the spheroid like PostGIS and the spatial index engine measure them.
+
+    Every entry is stamped with the tokens of the whole dataset and of the
+    coarse region containing the cell; a write replaces the tokens of all
+    regions within NEAREST_POINT_CACHE_RADIUS of the place, which are
+    exactly the regions whose cached answers the write could change, since
+    answers farther than that radius are never cached.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._backend = None
+        self._backend_config = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(settings.NEAREST_POINT_CACHE_BACKEND)
+
+    @property
+    def backend(self):
+        config = (
+            settings.NEAREST_POINT_CACHE_BACKEND,
+            settings.NEAREST_POINT_CACHE_ALIAS,
+            settings.NEAREST_POINT_CACHE_MAX_ENTRIES,
+            settings.NEAREST_POINT_CACHE_TIMEOUT,
+            settings.NEAREST_POINT_CACHE_LRU_TIMEOUT,
+        )
+        if config != self._backend_config:
+            if config[0] == "django":
+                self._backend = DjangoCacheBackend(config[1], config[3])
+            else:
+                self._backend = LRUCacheBackend(config[2], config[4])
+            self._backend_config = config
+        return self._backend
+
+    def _lookup(self, key: str, region_key: str) -> tuple:
+        keys = [key, GLOBAL_TOKEN_KEY, region_key]
+        found = self.backend.get_many(keys)
+        if GLOBAL_TOKEN_KEY not in found or region_key not in found:
+            for token_key in keys[1:]:
+                if token_key not in found:
+                    self.backend.add(token_key, _new_token())
+            found = self.backend.get_many(keys)
+        return found.get(key), (
+            found.get(GLOBAL_TOKEN_KEY),
+            found.get(region_key),
+        )
+
+    def get_or_set(self, point: Point, k: int, distance, compute) -> tuple:
+        """Return ``(places, hit)``, the ``k`` places nearest to ``point``
+        within ``distance`` meters if it is given, nearest first.
+
+        ``compute(point, k, distance)`` looks places up without the cache
+        and returns them with their ``distance``.
+        """
+        cell = geohash.encode(
+            point.x, point.y, settings.NEAREST_POINT_CACHE_PRECISION
+        )
+        region = cell[: settings.NEAREST_POINT_CACHE_REGION_PRECISION]
+        key = f"{KEY_PREFIX}:{cell}:{k}:{distance}"
+        region_key = f"{KEY_PREFIX}:region:{region}"
+
+        entry, tokens = self._lookup(key, region_key)
+        if entry is not None and entry[0] == tokens:
+            self.hits += 1
+            return _measured_from(point, entry[1]), True
+        self.misses += 1
+
+        diagonal = _cell_diagonal(cell)
+        # One place more, and places a diagonal beyond the maximum
+        # distance, show whether other points of the cell would get
+        # another answer.
+        found = compute(
+            point, k + 1, distance + diagonal if distance is not None else None
+        )
+        places = [
+            place
+            for place in found[:k]
+            if distance is None or place.distance.m <= distance
+        ]
+        rows = [
+            (
+                place.pk,
+                place.name,
+                place.description,
+                place.geom.x,
+                place.geom.y,
+            )
+            for place in places
+        ]
+        if self._holds_for_cell(point, found, k, distance, diagonal):
+            # The tokens were read before computing, so a write that raced
+            # with the lookup leaves this entry already invalid.
+            self.backend.set_many({key: (tokens, rows)})
+        # Measured like a hit would be, so both answer the same.
+        return _measured_from(point, rows), False
+
+    @staticmethod
+    def _holds_for_cell(
+        point: Point, found: list, k: int, distance, diagonal
+    ) -> bool:
+        # Lookups rank places on the sphere and measure and filter them on
+        # the spheroid; within the cell neither distance moves by more
+        # than the diagonal.
+        origin = to_unit_vector(point.x, point.y)
+        ranks = [
+            _distance(origin, to_unit_vector(*place.geom.coords))
+            for place in found
+        ]
+        distances = [place.distance.m for place in found]
+        if distance is not None and any(
+            distance - diagonal < found_distance <= distance + diagonal
+            for found_distance in distances
+        ):
+            return False
+        if len(ranks) > k and ranks[k] - ranks[k - 1] <= 2 * diagonal:
+            return False
+        # Only answers a write within the radius can change are cached.
+        farthest = (
+            max(distances[:k])
+            if distances and (distance is None or distances[0] <= distance)
+            else distance
+        )
+        return (
+            farthest is not None
+            and farthest + diagonal <= settings.NEAREST_POINT_CACHE_RADIUS
+        )
+
+    def invalidate(self, longitude: float, latitude: float) -> None:
+        self.invalidate_many([(longitude, latitude)])
+
+    def invalidate_many(self, points: list) -> None:
+        """Invalidate the answers a write at any of the ``(longitude,
+        latitude)`` points could change."""
+        regions = set()
+        for longitude, latitude in points:
+            regions |= self._regions_near(longitude, latitude)
+            if len(regions) > MAX_INVALIDATED_REGIONS:
+                self.invalidate_all()
+                return
+        self.backend.set_many(
+            {
+                f"{KEY_PREFIX}:region:{region}": _new_token()
+                for region in regions
+            }
+        )
+
+    @staticmethod
+    def _regions_near(longitude: float, latitude: float) -> set:
+        radius = math.degrees(
+            settings.NEAREST_POINT_CACHE_RADIUS / EARTH_RADIUS
+        )
+        min_latitude = max(latitude - radius, -90.0)
+        max_latitude = min(latitude + radius, 90.0)
+        widest = max(abs(min_latitude), abs(max_latitude))
+        if widest >= 89.0:
+            spans = [(-180.0, 180.0)]
+        else:
+            longitude_radius = radius / math.cos(math.radians(widest))
+            west = longitude - longitude_radius
+            east = longitude + longitude_radius
+            spans = [(max(west, -180.0), min(east, 180.0))]
+            # Wrap around the antimeridian.
+            if west < -180:
+                spans.append((west + 360, 180.0))
+            if east > 180:
+                spans.append((-180.0, east - 360))
+
+        regions = set()
+        for west, east in spans:
+            regions |= geohash.covering(
+                west,
+                min_latitude,
+                east,
+                max_latitude,
+                settings.NEAREST_POINT_CACHE_REGION_PRECISION,
+            )
+        return regions
+
+    def invalidate_all(self) -> None:
+        self.backend.set_many({GLOBAL_TOKEN_KEY: _new_token()})
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+nearest_point_cache = NearestPointCache()
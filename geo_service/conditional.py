@@ -0,0 +1,134 @@
+import datetime
+import functools
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections, router
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from geo_service.models import Place
+
+VERSION_KEY = "geo:dataset_version"
+
+PLACE_VERSION_SQL = "SELECT updated_at FROM {table} WHERE id = %s"
+
+
+class DatasetVersion:
+    """A token of the whole dataset, replaced after every write.
+
+    The token is random rather than a counter, so losing it to eviction
+    can never bring back a version a client already holds. It is kept in
+    the DATASET_VERSION_CACHE_ALIAS cache, which has to be shared by all
+    processes serving the API.
+    """
+
+    @property
+    def cache(self):
+        return caches[settings.DATASET_VERSION_CACHE_ALIAS]
+
+    def get(self) -> tuple:
+        """``(token, time of the last write)``."""
+        version = self.cache.get(VERSION_KEY)
+        if version is None:
+            self.cache.add(VERSION_KEY, self._new(), timeout=None)
+            version = self.cache.get(VERSION_KEY)
+        token, modified = version
+        return token, datetime.datetime.fromtimestamp(
+            modified, datetime.timezone.utc
+        )
+
+    def bump(self) -> None:
+        self.cache.set(VERSION_KEY, self._new(), timeout=None)
+
+    @staticmethod
+    def _new() -> tuple:
+        return uuid.uuid4().hex, time.time()
+
+
+dataset_version = DatasetVersion()
+
+
+def place_version(pk: int):
+    """When the place was last written, without loading it."""
+    alias = router.db_for_read(Place)
+    with connections[alias].cursor() as cursor:
+        cursor.execute(
+            PLACE_VERSION_SQL.format(table=Place._meta.db_table), [pk]
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def dataset_validators(request, **kwargs) -> tuple:
+    """ETag and Last-Modified of a response that may depend on any place.
+
+    The ETag covers the full path with its query and the rendered format,
+    so every page, filter and format gets its own. None without
+    DATASET_ETAGS, as the version is then not known to be shared.
+    """
+    if not settings.DATASET_ETAGS:
+        return None, None
+    token, modified = dataset_version.get()
+    if settings.DB_REPLICAS and (
+        time.time() - modified.timestamp() < settings.DB_REPLICA_STICKY_SECONDS
+    ):
+        # A replica may not have the last write yet, and its answer must
+        # not be remembered under the new version.
+        return None, None
+    path = request.get_full_path()
+    representation = hashlib.md5(
+        f"{path} {request.accepted_renderer.format}".encode(),
+        usedforsecurity=False,
+    ).hexdigest()
+    return f"{token}-{representation}", modified
+
+
+def place_validators(request, pk: str, **kwargs) -> tuple:
+    updated_at = place_version(int(pk)) if pk.isdigit() else None
+    if updated_at is None:
+        return None, None
+    version = f"{pk}-{updated_at.timestamp()!r}"
+    return f"{version}-{request.accepted_renderer.format}", updated_at
+
+
+def conditional(validators):
+    """Answer GET and HEAD with 304 Not Modified while the ETag or
+    Last-Modified from ``validators(request, **kwargs)`` still match, and
+    send them with every other successful response."""
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(self, request, *args, **kwargs)
+            etag, last_modified = validators(request, **kwargs)
+            if etag is not None:
+                etag = quote_etag(etag)
+            response = get_conditional_response(
+                request,
+                etag=etag,
+                last_modified=(
+                    int(last_modified.timestamp()) if last_modified else None
+                ),
+            )
+            if response is None:
+                response = view(self, request, *args, **kwargs)
+            if (
+                200 <= response.status_code < 300
+                or response.status_code == 304
+            ):
+                if etag is not None:
+                    response.headers.setdefault("ETag", etag)
+                if last_modified is not None:
+                    response.headers.setdefault(
+                        "Last-Modified", http_date(last_modified.timestamp())
+                    )
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,103 @@
+import asyncio
+import contextlib
+import weakref
+
+from django.conf import settings
+from django.db import connections
+from psycopg import AsyncConnection
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import AsyncConnectionPool
+
+_pools = {}
+
+# Loops that live as long as the server, see pool_connections().
+_pooled_loops = weakref.WeakSet()
+
+
+def conninfo(alias: str = "default") -> str:
+    """libpq connection string of a database from DATABASES."""
+    database = connections[alias].settings_dict
+    options = {
+        "dbname": database["NAME"],
+        "user": database["USER"],
+        "password": database["PASSWORD"],
+        "host": database["HOST"],
+        "port": database["PORT"],
+        **database.get("OPTIONS", {}),
+    }
+    return make_conninfo(
+        **{key: value for key, value in options.items() if value}
+    )
+
+
+def _connection_kwargs() -> dict:
+    # psycopg prepares repeated queries itself, which transaction pooling
+    # does not survive either.
+    return (
+        {"prepare_threshold": None} if settings.DB_TRANSACTION_POOLING else {}
+    )
+
+
+async def _open_pool(alias: str) -> AsyncConnectionPool:
+    pool = AsyncConnectionPool(
+        conninfo(alias),
+        min_size=settings.ASYNC_DB_POOL_MIN_SIZE,
+        max_size=settings.ASYNC_DB_POOL_MAX_SIZE,
+        timeout=settings.ASYNC_DB_POOL_TIMEOUT,
+        kwargs=_connection_kwargs(),
+        open=False,
+    )
+    await pool.open()
+    return pool
+
+
+async def get_async_pool(alias: str = "default") -> AsyncConnectionPool:
+    """Connection pool of ``alias`` for the running event loop.
+
+    A pool belongs to the loop it was opened in, which under uvicorn is
+    the single loop of the worker process. Concurrent first callers share
+    one opening task.
+    """
+    # Pools of loops closed without close_async_pools() cannot be closed
+    # any more, their connections go with them.
+    for key in [key for key in _pools if key[1].is_closed()]:
+        del _pools[key]
+    key = (alias, asyncio.get_running_loop())
+    opening = _pools.get(key)
+    if opening is None:
+        opening = _pools[key] = asyncio.ensure_future(_open_pool(alias))
+    return await opening
+
+
+async def close_async_pools() -> None:
+    loop = asyncio.get_running_loop()
+    for key in [key for key in _pools if key[1] is loop]:
+        pool = await _pools.pop(key)
+        await pool.close()
+
+
+def pool_connections() -> None:
+    """Let async views running on the current loop share pooled
+    connections. Only for a loop that lives as long as the server, whose
+    pools close_async_pools() closes on shutdown."""
+    _pooled_loops.add(asyncio.get_running_loop())
+
+
+@contextlib.asynccontextmanager
+async def async_connection(alias: str = "default"):
+    """A connection to ``alias`` for the running loop.
+
+    It comes from the pool of a loop given to pool_connections(). Any other
+    loop, like the one a WSGI server runs each async view on, gets a
+    connection of its own that is closed after use.
+    """
+    if asyncio.get_running_loop() in _pooled_loops:
+        pool = await get_async_pool(alias)
+        async with pool.connection() as connection:
+            yield connection
+        return
+    connection = await AsyncConnection.connect(
+        conninfo(alias), **_connection_kwargs()
+    )
+    async with connection:
+        yield connection
@@ -0,0 +1,150 @@
+from django.conf import settings
+from django.db import connections, router
+
+from geo_service.models import Place
+
+PLACE_TABLE = Place._meta.db_table
+
+COPY_SQL = "COPY (SELECT {columns} FROM {table}{where} ORDER BY id) TO STDOUT"
+
+RANGE_CLAUSE = " WHERE id > {after} AND id <= {last}"
+
+# The last id of the next ``limit`` places after ``after``, so that every
+# COPY reads a full page however sparse the ids are.
+PAGE_END_SQL = """
+    SELECT max(id) FROM (
+        SELECT id FROM {table} WHERE id > %s ORDER BY id LIMIT %s
+    ) page
+"""
+
+# RFC 8142 records: a record separator, a GeoJSON feature and a newline.
+# JSON holds no raw control characters, so CSV mode with control
+# characters as delimiter and quote writes the features unescaped.
+GEOJSON_SEQ_COLUMN = """
+    E'\\x1e' || json_build_object(
+        'type', 'Feature',
+        'id', id,
+        'geometry', ST_AsGeoJSON(geom)::json,
+        'properties', json_build_object(
+            'name', name, 'description', description
+        )
+    )::text
+"""
+
+# Binary COPY frames every chunk with this header and a -1 field count.
+PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + bytes(8)
+PGCOPY_TRAILER = b"\xff\xff"
+
+# Format: (content type, file extension, selected columns, COPY options)
+EXPORT_FORMATS = {
+    "csv": (
+        "text/csv",
+        "csv",
+        "id, name, description, "
+        "ST_Y(geom) AS latitude, ST_X(geom) AS longitude",
+        "FORMAT csv",
+    ),
+    "geojsonseq": (
+        "application/geo+json-seq",
+        "geojsons",
+        GEOJSON_SEQ_COLUMN,
+        "FORMAT csv, DELIMITER E'\\x1f', QUOTE E'\\x01'",
+    ),
+    # PostgreSQL's own binary rows with the geometry as EWKB, which
+    # ``COPY geo_service_place (id, name, description, geom, updated_at,
+    # region) FROM STDIN (FORMAT binary)`` loads back as is.
+    "pgcopy": (
+        "application/octet-stream",
+        "pgcopy",
+        "id, name, description, geom, updated_at, region",
+        "FORMAT binary",
+    ),
+}
+
+
+class PlaceExportError(Exception):
+    pass
+
+
+def _copy_sql(export_format: str, where: str = "", header: bool = True):
+    _, _, columns, options = EXPORT_FORMATS[export_format]
+    if export_format == "csv" and header:
+        options += ", HEADER"
+    sql = COPY_SQL.format(columns=columns, table=PLACE_TABLE, where=where)
+    return f"{sql} WITH ({options})"
+
+
+def _connection():
+    connection = connections[router.db_for_read(Place)]
+    if connection.vendor != "postgresql":
+        raise PlaceExportError("Exports need the PostGIS database backend.")
+    return connection
+
+
+def export_places(export_format: str, file) -> None:
+    """Write every place to the binary ``file`` with a single COPY, so
+    the export is one consistent snapshot.
+
+    psycopg hands the rows over to ``file`` as the server sends them.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise PlaceExportError(
+            f"Unknown format {export_format}, "
+            f"use one of: {', '.join(EXPORT_FORMATS)}."
+        )
+    with _connection().cursor() as cursor:
+        with cursor.copy(_copy_sql(export_format)) as copy:
+            for data in copy:
+                file.write(data)
+
+
+def _unframed(blocks):
+    """The binary COPY ``blocks`` without their header and trailer."""
+    skip = len(PGCOPY_HEADER)
+    tail = b""
+    for block in blocks:
+        block = bytes(block)
+        if skip:
+            block, skip = block[skip:], max(skip - len(block), 0)
+        block = tail + block
+        block, tail = (
+            block[: -len(PGCOPY_TRAILER)],
+            block[-len(PGCOPY_TRAILER) :],
+        )
+        if block:
+            yield block
+
+
+def iter_export(export_format: str, chunk_size: int = None):
+    """Yield the export as bytes, one COPY per page of ``chunk_size``
+    places in id order, streamed as the server sends them so memory stays
+    flat however many places there are.
+
+    Every page is read on its own, so places written during the export
+    may be missing from it.
+    """
+    chunk_size = chunk_size or settings.PLACE_EXPORT_CHUNK_SIZE
+    binary = export_format == "pgcopy"
+    with _connection().cursor() as cursor:
+        if binary:
+            yield PGCOPY_HEADER
+        after = 0
+        while True:
+            cursor.execute(
+                PAGE_END_SQL.format(table=PLACE_TABLE), [after, chunk_size]
+            )
+            (last,) = cursor.fetchone()
+            if last is None:
+                break
+            sql = _copy_sql(
+                export_format,
+                RANGE_CLAUSE.format(after=after, last=last),
+                header=after == 0,
+            )
+            with cursor.copy(sql) as copy:
+                blocks = _unframed(copy) if binary else copy
+                for block in blocks:
+                    yield bytes(block)
+            after = last
+        if binary:
+            yield PGCOPY_TRAILER
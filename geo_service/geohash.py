@@ -0,0 +1,90 @@
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def encode(longitude: float, latitude: float, precision: int) -> str:
+    # Same bisection as ST_GeoHash: a coordinate on a split goes below it.
+    longitude_range = [-180.0, 180.0]
+    latitude_range = [-90.0, 90.0]
+    cell = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(cell) < precision:
+        value, bounds = (
+            (longitude, longitude_range)
+            if even
+            else (latitude, latitude_range)
+        )
+        mid = (bounds[0] + bounds[1]) / 2
+        bits <<= 1
+        if value > mid:
+            bits |= 1
+            bounds[0] = mid
+        else:
+            bounds[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            cell.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(cell)
+
+
+def cell_size(precision: int) -> tuple:
+    longitude_bits = (5 * precision + 1) // 2
+    latitude_bits = 5 * precision // 2
+    return 360.0 / 2**longitude_bits, 180.0 / 2**latitude_bits
+
+
+def bounds(cell: str) -> tuple:
+    longitude_range = [-180.0, 180.0]
+    latitude_range = [-90.0, 90.0]
+    even = True
+    for char in cell:
+        bits = BASE32.index(char)
+        for shift in range(4, -1, -1):
+            target = longitude_range if even else latitude_range
+            mid = (target[0] + target[1]) / 2
+            if bits >> shift & 1:
+                target[0] = mid
+            else:
+                target[1] = mid
+            even = not even
+    return (
+        longitude_range[0],
+        latitude_range[0],
+        longitude_range[1],
+        latitude_range[1],
+    )
+
+
+def center(cell: str) -> tuple:
+    min_longitude, min_latitude, max_longitude, max_latitude = bounds(cell)
+    return (
+        (min_longitude + max_longitude) / 2,
+        (min_latitude + max_latitude) / 2,
+    )
+
+
+def covering(
+    min_longitude: float,
+    min_latitude: float,
+    max_longitude: float,
+    max_latitude: float,
+    precision: int,
+) -> set:
+    """Cells of the given precision that intersect the bounding box."""
+    width, height = cell_size(precision)
+    cells = set()
+    column = int((min_longitude + 180) // width)
+    last_column = int((min(max_longitude, 180.0) + 180) // width)
+    first_row = int((min_latitude + 90) // height)
+    last_row = int((min(max_latitude, 90.0) + 90) // height)
+    while column <= last_column:
+        longitude = min(-180 + (column + 0.5) * width, 180.0)
+        for row in range(first_row, last_row + 1):
+            latitude = min(-90 + (row + 0.5) * height, 90.0)
+            cells.add(encode(longitude, latitude, precision))
+        column += 1
+    return cells
@@ -0,0 +1,438 @@
+import csv
+import json
+import re
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.gis.gdal import GDALException
+from django.db import IntegrityError, connections, router, transaction
+
+from geo_service.models import (
+    CONSTRAINT_CONFLICT_TARGET,
+    DUPLICATE_COORDINATES_MESSAGE,
+    OnConflict,
+    Place,
+    place_region,
+    snap_coordinates,
+)
+from geo_service.signals import places_bulk_changed
+from geo_service.transforms import (
+    is_valid_srid,
+    to_default_srid,
+    transform_coordinates,
+)
+
+FORMATS = ("ndjson", "geojson", "csv")
+
+FORMAT_SUFFIXES = {
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".geojson": "geojson",
+    ".geojsons": "geojson",
+    ".json": "geojson",
+    ".csv": "csv",
+}
+
+CHUNK_SIZE = 64 * 1024
+MAX_FEATURE_SIZE = 16 * 1024 * 1024
+
+FEATURES_ARRAY = re.compile(r'"features"\s*:\s*\[')
+
+CREATE_STAGING_TABLE_SQL = """
+    CREATE TEMPORARY TABLE place_import (
+        line bigint NOT NULL,
+        name varchar(255) NOT NULL,
+        description text NOT NULL,
+        geom geometry(Point, {srid}) NOT NULL,
+        region text NOT NULL
+    ) ON COMMIT DROP
+"""
+
+COPY_STAGING_TABLE_SQL = (
+    "COPY place_import (line, name, description, geom, region) FROM STDIN"
+)
+
+# The unique constraint on geom decides what a duplicate is. Rows of the
+# file that share coordinates are collapsed first, since a single INSERT
+# must not hit the same conflicting row twice.
+MERGE_STAGING_TABLE_SQL = """
+    WITH merged AS (
+        INSERT INTO {table} (name, description, geom, updated_at, region)
+        SELECT {distinct}
+            staged.name,
+            staged.description,
+            staged.geom,
+            now(),
+            staged.region
+        FROM place_import AS staged
+        ORDER BY {order}
+        {on_conflict}
+        RETURNING xmax = 0 AS inserted
+    )
+    SELECT
+        count(*) FILTER (WHERE inserted),
+        count(*) FILTER (WHERE NOT inserted)
+    FROM merged
+"""
+
+MERGE_OPTIONS = {
+    OnConflict.ERROR: {
+        "distinct": "",
+        "order": "staged.line",
+        "on_conflict": "",
+    },
+    OnConflict.SKIP: {
+        "distinct": "DISTINCT ON (staged.geom)",
+        "order": "staged.geom, staged.line",
+        "on_conflict": f"{CONSTRAINT_CONFLICT_TARGET} DO NOTHING",
+    },
+    OnConflict.UPDATE: {
+        "distinct": "DISTINCT ON (staged.geom)",
+        "order": "staged.geom, staged.line DESC",
+        "on_conflict": (
+            f"{CONSTRAINT_CONFLICT_TARGET} DO UPDATE SET "
+            "name = EXCLUDED.name, description = EXCLUDED.description, "
+            "updated_at = EXCLUDED.updated_at"
+        ),
+    },
+}
+
+
+class PlaceImportError(Exception):
+    pass
+
+
+class RowError(ValueError):
+    pass
+
+
+@dataclass
+class ImportReport:
+    total: int = 0
+    imported: int = 0
+    updated: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+    rejects: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        if not self.elapsed:
+            return 0.0
+        return self.total / self.elapsed
+
+    def reject(self, line: int, message: str) -> None:
+        self.rejected += 1
+        if len(self.rejects) < settings.PLACE_IMPORT_MAX_REJECTS:
+            self.rejects.append({"line": line, "error": message})
+
+    def as_dict(self) -> dict:
+        return {
+            "total": self.total,
+            "imported": self.imported,
+            "updated": self.updated,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "rejects": self.rejects,
+            "elapsed": round(self.elapsed, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+
+def detect_format(filename: str) -> str:
+    file_format = FORMAT_SUFFIXES.get(Path(filename).suffix.lower())
+    if file_format is None:
+        raise PlaceImportError(
+            f"Cannot detect the format of {filename}, "
+            f"use one of: {', '.join(FORMATS)}."
+        )
+    return file_format
+
+
+def _chunks(stream):
+    while chunk := stream.read(CHUNK_SIZE):
+        yield chunk
+
+
+def _lines(chunks):
+    pending = ""
+    for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split("\n")
+        yield from lines
+    if pending:
+        yield pending
+
+
+def _parse_json(text: str):
+    try:
+        return json.loads(text)
+    except ValueError as error:
+        raise RowError(f"Invalid JSON: {error}.")
+
+
+def _feature_record(feature) -> dict:
+    if not isinstance(feature, dict) or feature.get("type") != "Feature":
+        raise RowError("Expected a GeoJSON Feature.")
+    geometry = feature.get("geometry") or {}
+    if geometry.get("type") != "Point":
+        raise RowError("Only Point geometries can be imported.")
+    coordinates = geometry.get("coordinates") or []
+    if len(coordinates) < 2:
+        raise RowError("Point coordinates are missing.")
+    properties = feature.get("properties") or {}
+    return {
+        "name": properties.get("name"),
+        "description": properties.get("description"),
+        "longitude": coordinates[0],
+        "latitude": coordinates[1],
+        "srid": settings.DEFAULT_SRID,
+    }
+
+
+def read_ndjson(stream):
+    for line_number, line in enumerate(_lines(_chunks(stream)), start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, _parse_json(line)
+        except RowError as error:
+            yield line_number, error
+
+
+def read_csv(stream):
+    reader = csv.DictReader(stream)
+    for record in reader:
+        yield reader.line_num, record
+
+
+def _iter_feature_collection(text: str, chunks):
+    # Decodes the "features" array one item at a time, so a
+    # FeatureCollection never has to be loaded into memory as a whole.
+    decoder = json.JSONDecoder()
+    position = FEATURES_ARRAY.search(text).end()
+    exhausted = False
+    while True:
+        while position < len(text) and text[position] in " \t\r\n,":
+            position += 1
+        if position < len(text) and text[position] == "]":
+            return
+        try:
+            feature, position = decoder.raw_decode(text, position)
+        except ValueError:
+            if exhausted or len(text) - position > MAX_FEATURE_SIZE:
+                raise PlaceImportError("Malformed GeoJSON FeatureCollection.")
+            chunk = next(chunks, "")
+            exhausted = not chunk
+            text = text[position:] + chunk
+            position = 0
+            continue
+        yield feature
+
+
+def read_geojson(stream):
+    chunks = _chunks(stream)
+    head = ""
+    while len(head) < CHUNK_SIZE and (chunk := next(chunks, "")):
+        head += chunk
+    if FEATURES_ARRAY.search(head):
+        features = _iter_feature_collection(head, chunks)
+        for number, feature in enumerate(features, start=1):
+            try:
+                yield number, _feature_record(feature)
+            except RowError as error:
+                yield number, error
+        return
+
+    # GeoJSON text sequence (RFC 8142) or newline-delimited features.
+    lines = _lines(_prepend(head, chunks))
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip().lstrip("\x1e")
+        if not line:
+            continue
+        try:
+            yield line_number, _feature_record(_parse_json(line))
+        except RowError as error:
+            yield line_number, error
+
+
+def _prepend(head, chunks):
+    yield head
+    yield from chunks
+
+
+READERS = {
+    "ndjson": read_ndjson,
+    "geojson": read_geojson,
+    "csv": read_csv,
+}
+
+
+def _coordinate(record: dict, key: str) -> float:
+    value = record.get(key)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise RowError(f"Invalid {key}.")
+
+
+def _validate(record) -> tuple:
+    if isinstance(record, Exception):
+        raise record
+    if not isinstance(record, dict):
+        raise RowError("Expected an object.")
+    name = record.get("name")
+    description = record.get("description")
+    if not isinstance(name, str) or not name.strip():
+        raise RowError("Name is required.")
+    if len(name) > Place._meta.get_field("name").max_length:
+        raise RowError("Name is too long.")
+    if not isinstance(description, str):
+        raise RowError("Description is required.")
+    # PostgreSQL text cannot hold NUL characters, which would fail the
+    # COPY of the whole batch.
+    if "\x00" in name or "\x00" in description:
+        raise RowError("Name and description cannot contain NUL characters.")
+    srid = record.get("srid") or settings.DEFAULT_SRID
+    try:
+        srid = int(srid)
+    except (TypeError, ValueError):
+        raise RowError("Invalid SRID.")
+    if not is_valid_srid(srid):
+        raise RowError("Invalid SRID.")
+    return (
+        name,
+        description,
+        _coordinate(record, "longitude"),
+        _coordinate(record, "latitude"),
+        srid,
+    )
+
+
+def _transform_group(longitudes: list, latitudes: list, srid: int) -> list:
+    try:
+        return list(zip(*transform_coordinates(longitudes, latitudes, srid)))
+    except GDALException:
+        pass
+    # Some point cannot be transformed, find it one by one.
+    coordinates = []
+    for longitude, latitude in zip(longitudes, latitudes):
+        try:
+            point = to_default_srid(longitude, latitude, srid)
+            coordinates.append((point.x, point.y))
+        except GDALException:
+            coordinates.append(None)
+    return coordinates
+
+
+def _transform_batch(batch: list, report: ImportReport) -> list:
+    """Move a batch of ``(line, name, description, longitude, latitude,
+    srid)`` rows to DEFAULT_SRID with one transform per SRID, rejecting
+    rows that end up out of range."""
+    by_srid = {}
+    for index, row in enumerate(batch):
+        by_srid.setdefault(row[5], []).append(index)
+    coordinates = [None] * len(batch)
+    for srid, indexes in by_srid.items():
+        transformed = _transform_group(
+            [batch[index][3] for index in indexes],
+            [batch[index][4] for index in indexes],
+            srid,
+        )
+        for index, point in zip(indexes, transformed):
+            coordinates[index] = point
+
+    rows = []
+    for (line, name, description, *_), point in zip(batch, coordinates):
+        if point is None:
+            report.reject(line, "Coordinates cannot be transformed.")
+            continue
+        longitude, latitude = point
+        if not -90 <= latitude <= 90:
+            report.reject(line, "Latitude is incorrect.")
+            continue
+        if not -180 <= longitude <= 180:
+            report.reject(line, "Longitude is incorrect.")
+            continue
+        rows.append(
+            (line, name, description, *snap_coordinates(longitude, latitude))
+        )
+    return rows
+
+
+def _copy_batch(cursor, batch: list) -> None:
+    with cursor.copy(COPY_STAGING_TABLE_SQL) as copy:
+        for line, name, description, longitude, latitude in batch:
+            copy.write_row(
+                (
+                    line,
+                    name,
+                    description,
+                    f"SRID={settings.DEFAULT_SRID};"
+                    f"POINT({longitude!r} {latitude!r})",
+                    place_region(longitude, latitude),
+                )
+            )
+
+
+def import_places(
+    stream,
+    file_format: str,
+    batch_size: int = None,
+    on_conflict: str = OnConflict.SKIP,
+) -> ImportReport:
+    if file_format not in READERS:
+        raise PlaceImportError(
+            f"Unknown format {file_format}, "
+            f"use one of: {', '.join(FORMATS)}."
+        )
+    if on_conflict not in MERGE_OPTIONS:
+        raise PlaceImportError(
+            f"Unknown conflict mode {on_conflict}, "
+            f"use one of: {', '.join(OnConflict.values)}."
+        )
+    batch_size = batch_size or settings.PLACE_IMPORT_BATCH_SIZE
+    report = ImportReport()
+    started = time.perf_counter()
+    alias = router.db_for_write(Place)
+
+    try:
+        with transaction.atomic(using=alias):
+            with connections[alias].cursor() as cursor:
+                cursor.execute(
+                    CREATE_STAGING_TABLE_SQL.format(srid=settings.DEFAULT_SRID)
+                )
+                batch = []
+                for line, record in READERS[file_format](stream):
+                    report.total += 1
+                    try:
+                        batch.append((line, *_validate(record)))
+                    except RowError as error:
+                        report.reject(line, str(error))
+                        continue
+                    if len(batch) >= batch_size:
+                        _copy_batch(cursor, _transform_batch(batch, report))
+                        batch = []
+                if batch:
+                    _copy_batch(cursor, _transform_batch(batch, report))
+
+                cursor.execute(
+                    MERGE_STAGING_TABLE_SQL.format(
+                        table=Place._meta.db_table,
+                        **MERGE_OPTIONS[on_conflict],
+                    )
+                )
+                report.imported, report.updated = cursor.fetchone()
+    except IntegrityError:
+        raise PlaceImportError(DUPLICATE_COORDINATES_MESSAGE)
+    places_bulk_changed.send(sender=Place, using=alias)
+
+    report.rejects.sort(key=lambda reject: reject["line"])
+    report.duplicates = (
+        report.total - report.rejected - report.imported - report.updated
+    )
+    report.elapsed = time.perf_counter() - started
+    return report
@@ -0,0 +1,176 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections
+
+from geo_service.models import DUPLICATE_COORDINATES_MESSAGE, OnConflict, Place
+from geo_service.queries import place_at
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "geo:ingest"
+
+
+class IngestQueueFull(Exception):
+    pass
+
+
+class IngestQueue:
+    """Creates accepted now and written later, many per INSERT.
+
+    Places wait in a bounded in-process queue of PLACE_INGEST_QUEUE_SIZE
+    and a worker thread writes them with ``Place.objects.upsert`` once
+    PLACE_INGEST_BATCH_SIZE are waiting or the oldest has waited
+    PLACE_INGEST_FLUSH_MS milliseconds. The status of every acknowledgement
+    is kept in the PLACE_INGEST_CACHE_ALIAS cache, which has to be shared
+    by all processes for clients to poll any of them.
+
+    Places still queued when the process exits are written on the way
+    out, unless it is killed.
+    """
+
+    def __init__(self, worker: bool = True):
+        self._worker = worker
+        self._queue = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[settings.PLACE_INGEST_CACHE_ALIAS]
+
+    @property
+    def queue(self) -> queue.Queue:
+        with self._lock:
+            if self._queue is None:
+                self._queue = queue.Queue(settings.PLACE_INGEST_QUEUE_SIZE)
+            if self._worker and self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="place-ingest", daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.drain)
+            return self._queue
+
+    def submit(self, place: Place, on_conflict: str) -> str:
+        """Queue ``place`` and return its acknowledgement id."""
+        ack = uuid.uuid4().hex
+        self._set_status(ack, {"status": "queued"})
+        try:
+            self.queue.put_nowait((ack, place, on_conflict))
+        except queue.Full:
+            self.cache.delete(f"{KEY_PREFIX}:{ack}")
+            raise IngestQueueFull
+        return ack
+
+    def status(self, ack: str):
+        return self.cache.get(f"{KEY_PREFIX}:{ack}")
+
+    def drain(self) -> None:
+        """Write everything queued so far in the calling thread."""
+        while batch := self._take(block=False):
+            self.write(batch)
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take(block=True)
+            try:
+                self.write(batch)
+            except Exception:
+                # Even failing to record the failure must not stop the
+                # thread, or the queue would only fill up.
+                logger.exception(
+                    "Could not write %d queued places.", len(batch)
+                )
+
+    def _take(self, block: bool) -> list:
+        try:
+            batch = [self.queue.get(block=block)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + settings.PLACE_INGEST_FLUSH_MS / 1000
+        while len(batch) < settings.PLACE_INGEST_BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            try:
+                if block and timeout > 0:
+                    batch.append(self.queue.get(timeout=timeout))
+                else:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def write(self, batch: list) -> None:
+        close_old_connections()
+        try:
+            for on_conflict in OnConflict.values:
+                items = [item for item in batch if item[2] == on_conflict]
+                if items:
+                    self._write(items, on_conflict)
+        except Exception as error:
+            logger.exception("Could not write %d queued places.", len(batch))
+            for ack, _, _ in batch:
+                if self.status(ack) == {"status": "queued"}:
+                    self._set_status(
+                        ack, {"status": "failed", "error": str(error)}
+                    )
+        finally:
+            close_old_connections()
+
+    def _write(self, items: list, on_conflict: str) -> None:
+        places = [place for _, place, _ in items]
+        if on_conflict != OnConflict.UPDATE:
+            # One after another, the first of several places at the same
+            # coordinates would be created and the others refused or
+            # skipped, so only the first goes into the INSERT.
+            first = {}
+            for place in places:
+                place.snap_geom()
+                first.setdefault(place.geom.coords, place)
+            places = [*first.values()]
+        written = Place.objects.upsert(
+            places,
+            OnConflict.UPDATE
+            if on_conflict == OnConflict.UPDATE
+            else OnConflict.SKIP,
+        )
+        written = {place.geom.coords: place.pk for place in written}
+        for ack, place, _ in items:
+            pk = written.get(place.geom.coords)
+            if pk is not None and (
+                on_conflict == OnConflict.UPDATE or place.pk is not None
+            ):
+                self._set_status(ack, {"status": "written", "place_id": pk})
+            elif on_conflict == OnConflict.ERROR:
+                self._set_status(
+                    ack,
+                    {
+                        "status": "failed",
+                        "error": DUPLICATE_COORDINATES_MESSAGE,
+                    },
+                )
+            else:
+                existing = place_at(place.geom.x, place.geom.y)
+                self._set_status(
+                    ack,
+                    {
+                        "status": "written",
+                        "place_id": existing.pk if existing else None,
+                    },
+                )
+
+    def _set_status(self, ack: str, status: dict) -> None:
+        self.cache.set(
+            f"{KEY_PREFIX}:{ack}",
+            status,
+            timeout=settings.PLACE_INGEST_STATUS_TIMEOUT,
+        )
+
+
+ingest_queue = IngestQueue()
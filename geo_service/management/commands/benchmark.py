@@ -0,0 +1,95 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from geo_service.benchmark import SCENARIOS, LoadRunner, compare
+
+
+def scenario_weights(value: str) -> dict:
+    weights = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in SCENARIOS:
+            raise ValueError(name)
+        weights[name] = float(weight or 1)
+    return weights
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test a running geo API and report throughput and latency "
+        "percentiles as JSON, or compare two reports with --compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--base-url", default="http://127.0.0.1:8000/api/geo/"
+        )
+        parser.add_argument(
+            "--scenarios",
+            type=scenario_weights,
+            default="nearest=8,list=1,create=1,update=1",
+            help="Comma separated scenarios with optional weights, from: "
+            f"{', '.join(SCENARIOS)}.",
+        )
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument(
+            "--duration", type=float, default=30.0, help="Seconds."
+        )
+        parser.add_argument(
+            "--requests", type=int, help="Stop after this many requests."
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("-k", type=int, help="k for nearest lookups.")
+        parser.add_argument("--output", help="Write the report here.")
+        parser.add_argument(
+            "--compare",
+            nargs=2,
+            metavar=("BASELINE", "CURRENT"),
+            help="Compare two reports instead of running a benchmark.",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.1,
+            help="Relative change counted as a regression.",
+        )
+
+    def handle(self, *args, **options):
+        if options["compare"]:
+            self.compare(*options["compare"], options["threshold"])
+            return
+        report = LoadRunner(
+            options["base_url"],
+            options["scenarios"],
+            concurrency=options["concurrency"],
+            duration=options["duration"],
+            requests=options["requests"],
+            seed=options["seed"],
+            k=options["k"],
+        ).run()
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                file.write(output + "\n")
+        self.stdout.write(output)
+
+    def compare(self, baseline: str, current: str, threshold: float):
+        try:
+            with open(baseline, encoding="utf-8") as file:
+                baseline = json.load(file)
+            with open(current, encoding="utf-8") as file:
+                current = json.load(file)
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+        rows = compare(baseline, current, threshold)
+        for scenario, metric, old, new, change, regressed in rows:
+            line = (
+                f"{scenario:8} {metric:10} {old:>10} -> {new:>10} "
+                f"({change:+.1%})"
+            )
+            self.stdout.write(self.style.ERROR(line) if regressed else line)
+        regressions = sum(row[-1] for row in rows)
+        if regressions:
+            raise CommandError(f"{regressions} regressions found.")
+        self.stdout.write(self.style.SUCCESS("No regressions found."))
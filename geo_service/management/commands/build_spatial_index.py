@@ -0,0 +1,43 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from geo_service.spatial_engine import spatial_engine
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the in-memory spatial index and report its size, build time "
+        "and lookup throughput."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lookups",
+            type=int,
+            default=10_000,
+            help="Number of random nearest point lookups to time.",
+        )
+
+    def handle(self, *args, **options):
+        if not spatial_engine.rebuild():
+            raise CommandError("Building the spatial index failed.")
+        stats = spatial_engine.stats()
+        self.stdout.write(
+            f"Indexed {stats['places']} places in "
+            f"{stats['build_time']:.3f}s, "
+            f"{stats['nbytes'] / 1024 / 1024:.1f} MiB."
+        )
+
+        index = spatial_engine.index
+        lookups = options["lookups"]
+        started = time.perf_counter()
+        for _ in range(lookups):
+            index.nearest(random.uniform(-180, 180), random.uniform(-90, 90))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{lookups / elapsed:.0f} lookups/s on a single thread."
+            )
+        )
@@ -0,0 +1,33 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from geo_service.exports import (
+    EXPORT_FORMATS,
+    PlaceExportError,
+    export_places,
+)
+
+
+class Command(BaseCommand):
+    help = "Export all places with PostgreSQL COPY."
+
+    def add_arguments(self, parser):
+        parser.add_argument("format", choices=EXPORT_FORMATS)
+        parser.add_argument(
+            "path", nargs="?", default="-", help="Output file, - for stdout."
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        try:
+            if path == "-":
+                export_places(options["format"], sys.stdout.buffer)
+                sys.stdout.buffer.flush()
+            else:
+                with open(path, "wb") as file:
+                    export_places(options["format"], file)
+        except (OSError, PlaceExportError) as error:
+            raise CommandError(error)
+        if path != "-":
+            self.stderr.write(self.style.SUCCESS(f"Exported to {path}."))
@@ -0,0 +1,93 @@
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.core.management.base import BaseCommand, CommandError
+
+from geo_service.benchmark import NDJSONStream, PlaceGenerator
+from geo_service.importers import PlaceImportError, import_places
+from geo_service.models import OnConflict, Place
+from geo_service.queries import is_postgis
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a reproducible clustered dataset of places for "
+        "benchmarks, import it or write it as NDJSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("count", type=int, help="Number of places.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--clusters", type=int, default=1000)
+        parser.add_argument(
+            "--output",
+            help="Write NDJSON to this file instead of importing.",
+        )
+        parser.add_argument("--batch-size", type=int)
+
+    def handle(self, *args, **options):
+        generator = PlaceGenerator(options["seed"], options["clusters"])
+        places = generator.places(options["count"])
+        stream = NDJSONStream(places)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                while chunk := stream.read(1024 * 1024):
+                    file.write(chunk)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Wrote {options['count']} places to "
+                    f"{options['output']}."
+                )
+            )
+            return
+        if not is_postgis(write=True):
+            self._upsert(places, options["batch_size"])
+            return
+        try:
+            report = import_places(
+                stream, "ndjson", batch_size=options["batch_size"]
+            )
+        except PlaceImportError as error:
+            raise CommandError(error)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {report.imported} of {report.total} generated "
+                f"places ({report.duplicates} duplicates) in "
+                f"{report.elapsed:.2f}s, {report.rows_per_second:.0f} rows/s."
+            )
+        )
+
+    def _upsert(self, places, batch_size):
+        # SpatiaLite has no COPY, places are inserted in batches instead.
+        batch_size = batch_size or settings.PLACE_IMPORT_BATCH_SIZE
+        started = time.perf_counter()
+        total = imported = 0
+        while batch := list(islice(places, batch_size)):
+            total += len(batch)
+            imported += len(
+                Place.objects.upsert(
+                    [
+                        Place(
+                            name=place["name"],
+                            description=place["description"],
+                            geom=Point(
+                                place["longitude"],
+                                place["latitude"],
+                                srid=settings.DEFAULT_SRID,
+                            ),
+                        )
+                        for place in batch
+                    ],
+                    on_conflict=OnConflict.SKIP,
+                )
+            )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Inserted {imported} of {total} generated places "
+                f"({total - imported} duplicates) in {elapsed:.2f}s, "
+                f"{total / elapsed if elapsed else 0:.0f} rows/s."
+            )
+        )
@@ -0,0 +1,60 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from geo_service.importers import (
+    FORMATS,
+    PlaceImportError,
+    detect_format,
+    import_places,
+)
+from geo_service.models import OnConflict
+
+
+class Command(BaseCommand):
+    help = "Bulk import places from an NDJSON, GeoJSON or CSV file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, - for stdin.")
+        parser.add_argument("--format", choices=FORMATS)
+        parser.add_argument("--batch-size", type=int)
+        parser.add_argument(
+            "--on-conflict",
+            choices=OnConflict.values,
+            default=OnConflict.SKIP,
+            help="What to do with rows whose coordinates already exist.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        try:
+            file_format = options["format"] or detect_format(path)
+            if path == "-":
+                report = import_places(
+                    sys.stdin,
+                    file_format,
+                    options["batch_size"],
+                    options["on_conflict"],
+                )
+            else:
+                with open(path, encoding="utf-8", newline="") as stream:
+                    report = import_places(
+                        stream,
+                        file_format,
+                        options["batch_size"],
+                        options["on_conflict"],
+                    )
+        except (OSError, PlaceImportError) as error:
+            raise CommandError(error)
+
+        for reject in report.rejects:
+            self.stderr.write(f"line {reject['line']}: {reject['error']}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {report.imported} of {report.total} rows "
+                f"({report.updated} updated, {report.duplicates} "
+                f"duplicates, {report.rejected} "
+                f"rejected) in {report.elapsed:.2f}s, "
+                f"{report.rows_per_second:.0f} rows/s."
+            )
+        )
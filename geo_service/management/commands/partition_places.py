@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from geo_service.partitions import (
+    PARTITIONED_TABLE,
+    UNPARTITIONED_TABLE,
+    PartitionError,
+    copy_rows,
+    create_partitioned_table,
+    is_partitioned,
+    swap_tables,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert the places table into one hash partitioned by region "
+        "while it stays in use."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--partitions", type=int, default=16)
+        parser.add_argument("--batch-size", type=int, default=50_000)
+        parser.add_argument(
+            "--no-swap",
+            action="store_true",
+            help="Stop after copying, with writes still mirrored.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            if is_partitioned():
+                raise CommandError("The places table is partitioned already.")
+            if create_partitioned_table(options["partitions"]):
+                self.stdout.write(
+                    f"Created {PARTITIONED_TABLE} with "
+                    f"{options['partitions']} partitions, mirroring writes."
+                )
+            else:
+                self.stdout.write(f"Resuming into {PARTITIONED_TABLE}.")
+            for copied, total in copy_rows(options["batch_size"]):
+                self.stdout.write(f"Copied ids {copied}/{total}.")
+            if options["no_swap"]:
+                return
+            swap_tables()
+        except PartitionError as error:
+            raise CommandError(error)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"The places table is partitioned, the old one is kept as "
+                f"{UNPARTITIONED_TABLE}. Set PLACE_PARTITIONED=1."
+            )
+        )
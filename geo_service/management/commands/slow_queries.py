@@ -0,0 +1,48 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from geo_service.slow_queries import slow_query_log, summarize
+
+
+class Command(BaseCommand):
+    help = (
+        "Summarize the slow queries kept by the slow query log, flagging "
+        "sequential scans of the places table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dump",
+            action="store_true",
+            help="Print the kept entries with their plans as JSON.",
+        )
+        parser.add_argument(
+            "--clear", action="store_true", help="Forget the kept entries."
+        )
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            slow_query_log.clear()
+            self.stdout.write(self.style.SUCCESS("Slow query log cleared."))
+            return
+        entries = slow_query_log.entries()
+        if options["dump"]:
+            self.stdout.write(json.dumps(entries, indent=2))
+            return
+        if not entries:
+            self.stdout.write("No slow queries kept.")
+            return
+        for group in summarize(entries):
+            line = (
+                f"{group['view']}: {group['count']} slow, "
+                f"mean {group['mean_ms']} ms, max {group['max_ms']} ms, "
+                f"{group['explained']} explained, "
+                f"{group['seq_scans']} with a sequential scan"
+            )
+            self.stdout.write(
+                self.style.ERROR(line) if group["seq_scans"] else line
+            )
+            self.stdout.write(f"  {' '.join(group['sql'].split())}")
+            for scan in group["scans"]:
+                self.stdout.write(f"  {scan}")
@@ -0,0 +1,176 @@
+import functools
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+REQUEST_DURATION = Histogram(
+    "geo_request_duration_seconds",
+    "Time to answer a request, by view.",
+    ["view", "method"],
+)
+REQUESTS = Counter(
+    "geo_requests",
+    "Answered requests, by view and status code.",
+    ["view", "method", "status"],
+)
+SQL_QUERIES = Histogram(
+    "geo_request_sql_queries",
+    "SQL queries run while answering a request.",
+    ["view"],
+    buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100, float("inf")),
+)
+SQL_DURATION = Histogram(
+    "geo_request_sql_duration_seconds",
+    "Time spent in SQL while answering a request.",
+    ["view"],
+)
+TRANSFORM_DURATION = Histogram(
+    "geo_request_transform_duration_seconds",
+    "Time spent in GDAL coordinate transforms while answering a request.",
+    ["view"],
+)
+SERIALIZATION_DURATION = Histogram(
+    "geo_request_serialization_duration_seconds",
+    "Time spent building and rendering the response body.",
+    ["view"],
+)
+
+# Every worker builds its own spatial index: memory adds up over the live
+# workers, while they all index the same places.
+SPATIAL_INDEX_BYTES = Gauge(
+    "geo_spatial_index_bytes",
+    "Memory held by the in-memory spatial index.",
+    multiprocess_mode="livesum",
+)
+SPATIAL_INDEX_PLACES = Gauge(
+    "geo_spatial_index_places",
+    "Places in the in-memory spatial index when it was last built.",
+    multiprocess_mode="livemax",
+)
+SPATIAL_INDEX_BUILD_DURATION = Gauge(
+    "geo_spatial_index_build_duration_seconds",
+    "Time the last build of the in-memory spatial index took.",
+    multiprocess_mode="livemax",
+)
+
+# Any other method a client sends is counted as "other", so that it cannot
+# add label values without bound.
+METHODS = frozenset(
+    ["GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"]
+)
+
+STAGES = {
+    "sql": SQL_DURATION,
+    "transform": TRANSFORM_DURATION,
+    "serialization": SERIALIZATION_DURATION,
+}
+
+_current = ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    """Query count and time per stage of the request being answered."""
+
+    __slots__ = ("queries", *STAGES)
+
+    def __init__(self):
+        self.queries = 0
+        for stage in STAGES:
+            setattr(self, stage, 0.0)
+
+    def add(self, stage: str, elapsed: float) -> None:
+        setattr(self, stage, getattr(self, stage) + elapsed)
+
+    def observe(self, view: str, method: str, status: int, elapsed: float):
+        if method not in METHODS:
+            method = "other"
+        duration, requests, queries, stages = _children(view, method, status)
+        duration.observe(elapsed)
+        requests.inc()
+        queries.observe(self.queries)
+        for stage, histogram in stages:
+            histogram.observe(getattr(self, stage))
+
+
+# Looking up labels takes as long as observing, and there are few views,
+# methods and status codes.
+@functools.lru_cache(maxsize=1024)
+def _children(view: str, method: str, status: int) -> tuple:
+    return (
+        REQUEST_DURATION.labels(view, method),
+        REQUESTS.labels(view, method, status),
+        SQL_QUERIES.labels(view),
+        tuple(
+            (stage, histogram.labels(view))
+            for stage, histogram in STAGES.items()
+        ),
+    )
+
+
+def start_request():
+    """Collect metrics for the current context until ``finish_request``
+    is called with the returned token."""
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def finish_request(token) -> None:
+    _current.reset(token)
+
+
+def current_metrics():
+    return _current.get()
+
+
+@contextmanager
+def measure(stage: str):
+    """Add the time spent in the block to ``stage`` of the current
+    request, if there is one."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add(stage, time.perf_counter() - started)
+
+
+def count_query(execute, sql, params, many, context):
+    """Execute wrapper counting and timing the queries of a request."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    metrics.queries += 1
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add("sql", time.perf_counter() - started)
+
+
+def exposition() -> tuple:
+    """Metrics in the Prometheus text format and their content type.
+
+    With several worker processes, prometheus_client keeps the samples in
+    PROMETHEUS_MULTIPROC_DIR and they are merged here.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
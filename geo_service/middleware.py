@@ -0,0 +1,118 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from geo_service import routers
+
+from geo_service.metrics import (
+    current_metrics,
+    finish_request,
+    start_request,
+)
+
+
+class MetricsMiddleware:
+    """Record latency, SQL, transform and serialization time per view.
+
+    Responses rendered lazily, like DRF's, are rendered inside the
+    handler, so their rendering counts as serialization.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        metrics, token = start_request()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            finish_request(token)
+        self._observe(request, response, metrics, started)
+        return response
+
+    async def __acall__(self, request):
+        metrics, token = start_request()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            finish_request(token)
+        self._observe(request, response, metrics, started)
+        return response
+
+    def process_template_response(self, request, response):
+        # Called right before the response is rendered.
+        metrics = current_metrics()
+        if metrics is not None:
+            started = time.perf_counter()
+            response.add_post_render_callback(
+                lambda _: metrics.add(
+                    "serialization", time.perf_counter() - started
+                )
+            )
+        return response
+
+    @staticmethod
+    def _observe(request, response, metrics, started) -> None:
+        match = request.resolver_match
+        metrics.observe(
+            match.view_name if match else "unresolved",
+            request.method,
+            response.status_code,
+            time.perf_counter() - started,
+        )
+
+
+class ReplicaPinningMiddleware:
+    """Keep the reads of a client on the primary database for
+    DB_REPLICA_STICKY_SECONDS after it wrote, remembered in a cookie."""
+
+    cookie_name = "geo_primary"
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        pin, token = routers.start_request(self.cookie_name in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.finish_request(token)
+        return self._remember(pin, response)
+
+    async def __acall__(self, request):
+        pin, token = routers.start_request(self.cookie_name in request.COOKIES)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.finish_request(token)
+        return self._remember(pin, response)
+
+    def _remember(self, pin, response):
+        if pin.wrote and settings.DB_REPLICAS:
+            response.set_cookie(
+                self.cookie_name,
+                "1",
+                max_age=settings.DB_REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
@@ -0,0 +1,27 @@
+from django.db import migrations
+
+from geo_service.operations import PostgreSQLRunSQL
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction. SpatiaLite
+    # answers nearest point queries from the R*Tree index of 0001 instead.
+    atomic = False
+
+    dependencies = [
+        ("geo_service", "0001_initial"),
+    ]
+
+    operations = [
+        PostgreSQLRunSQL(
+            sql=(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS "
+                "geo_service_place_geog_gist "
+                "ON geo_service_place USING GIST ((geom::geography));"
+            ),
+            reverse_sql=(
+                "DROP INDEX CONCURRENTLY IF EXISTS "
+                "geo_service_place_geog_gist;"
+            ),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 4.2.1 on 2026-10-18 12:12
+
+from django.db import migrations, models
+
+REPORTED_DUPLICATES = 20
+
+DUPLICATES_SQL = """
+    SELECT ST_X(geom), ST_Y(geom), {ids}
+    FROM geo_service_place
+    GROUP BY geom
+    HAVING count(*) > 1
+    ORDER BY min(id)
+    LIMIT {limit}
+"""
+
+DUPLICATES_COUNT_SQL = """
+    SELECT count(*) FROM (
+        SELECT 1 FROM geo_service_place GROUP BY geom HAVING count(*) > 1
+    ) duplicates
+"""
+
+
+def check_duplicates(apps, schema_editor):
+    # Creates used to check for a place at the coordinates before inserting,
+    # which two requests could both pass. Which of the duplicates to keep
+    # is left to the operator rather than decided here.
+    connection = schema_editor.connection
+    ids = (
+        "string_agg(id::text, ', ' ORDER BY id)"
+        if connection.vendor == "postgresql"
+        else "group_concat(id, ', ')"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(DUPLICATES_COUNT_SQL)
+        (count,) = cursor.fetchone()
+        if not count:
+            return
+        cursor.execute(
+            DUPLICATES_SQL.format(ids=ids, limit=REPORTED_DUPLICATES)
+        )
+        rows = cursor.fetchall()
+    report = "\n".join(
+        f"  ({longitude}, {latitude}): places {place_ids}"
+        for longitude, latitude, place_ids in rows
+    )
+    more = (
+        f"\n  ... and {count - len(rows)} more." if count > len(rows) else ""
+    )
+    raise RuntimeError(
+        f"{count} coordinates are shared by several places, delete or move "
+        "all but one place at each before migrating again:\n"
+        f"{report}{more}"
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("geo_service", "0002_place_geom_geography_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="place",
+            constraint=models.UniqueConstraint(
+                fields=("geom",), name="unique_place_geom"
+            ),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+from geo_service.operations import PostgreSQLRunSQL
+
+
+class Migration(migrations.Migration):
+    # The column is generated by PostgreSQL, so every write path keeps it
+    # up to date without the model knowing about it. The 'simple'
+    # configuration neither stems nor drops stop words, which suits place
+    # names in any language.
+    atomic = False
+
+    dependencies = [
+        ("geo_service", "0003_place_unique_geom"),
+    ]
+
+    operations = [
+        PostgreSQLRunSQL(
+            sql=(
+                "ALTER TABLE geo_service_place "
+                "ADD COLUMN IF NOT EXISTS search_vector tsvector "
+                "GENERATED ALWAYS AS ("
+                "setweight(to_tsvector('simple', name), 'A') || "
+                "setweight(to_tsvector('simple', description), 'B')"
+                ") STORED;"
+            ),
+            reverse_sql=(
+                "ALTER TABLE geo_service_place "
+                "DROP COLUMN IF EXISTS search_vector;"
+            ),
+        ),
+        PostgreSQLRunSQL(
+            sql=(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS "
+                "geo_service_place_search_gin "
+                "ON geo_service_place USING GIN (search_vector);"
+            ),
+            reverse_sql=(
+                "DROP INDEX CONCURRENTLY IF EXISTS "
+                "geo_service_place_search_gin;"
+            ),
+        ),
+    ]
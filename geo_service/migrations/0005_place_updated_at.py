@@ -0,0 +1,21 @@
+# Generated by Django 4.2.1 on 2026-10-18 12:12
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("geo_service", "0004_place_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="place",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.1 on 2026-10-18 12:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Existing rows keep an empty region until the partition_places
+    # command fills it in batches, which plain tables never need.
+    dependencies = [
+        ("geo_service", "0005_place_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="place",
+            name="region",
+            field=models.CharField(default="", editable=False, max_length=2),
+            preserve_default=False,
+        ),
+    ]
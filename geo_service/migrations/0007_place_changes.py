@@ -0,0 +1,161 @@
+from django.db import migrations
+
+from geo_service.operations import PostgreSQLRunSQL
+
+CHANGE_INDEX = "geo_service_place_change"
+
+CHANGE_INDEX_COLUMNS = "(change_xid, change_seq, id)"
+
+PARTITIONS_SQL = """
+    SELECT inhrelid::regclass::text
+    FROM pg_inherits
+    JOIN pg_partitioned_table ON partrelid = inhparent
+    WHERE inhparent = 'geo_service_place'::regclass
+"""
+
+
+def _partitions(cursor) -> list:
+    """Partitions of geo_service_place, none if partition_places has not
+    converted it."""
+    cursor.execute(PARTITIONS_SQL)
+    return [row[0] for row in cursor.fetchall()]
+
+
+def create_change_index(apps, schema_editor):
+    # PostgreSQL cannot build the index of a partitioned table
+    # concurrently, so it is built for each partition and attached to an
+    # index on the parent alone.
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        partitions = _partitions(cursor)
+        if not partitions:
+            cursor.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {CHANGE_INDEX} "
+                f"ON geo_service_place {CHANGE_INDEX_COLUMNS}"
+            )
+            return
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {CHANGE_INDEX} "
+            f"ON ONLY geo_service_place {CHANGE_INDEX_COLUMNS}"
+        )
+        for partition in partitions:
+            cursor.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {partition}_change "
+                f"ON {partition} {CHANGE_INDEX_COLUMNS}"
+            )
+            cursor.execute(
+                f"ALTER INDEX {CHANGE_INDEX} "
+                f"ATTACH PARTITION {partition}_change"
+            )
+
+
+def drop_change_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        concurrently = "" if _partitions(cursor) else "CONCURRENTLY "
+        cursor.execute(f"DROP INDEX {concurrently}IF EXISTS {CHANGE_INDEX}")
+
+
+class Migration(migrations.Migration):
+    # Every write stamps the place with its transaction id and the next
+    # value of the change sequence, and every delete leaves a tombstone,
+    # by default values and triggers so that no write path can miss them.
+    # The columns start at 0, which needs no rewrite of the table; the
+    # sequence is not owned by the column so that it survives
+    # partition_places swapping tables. On a table partition_places has
+    # converted, the column defaults and row triggers of the parent apply
+    # to its partitions as well.
+    atomic = False
+
+    dependencies = [
+        ("geo_service", "0006_place_region"),
+    ]
+
+    operations = [
+        PostgreSQLRunSQL(
+            sql=[
+                "CREATE SEQUENCE IF NOT EXISTS geo_service_place_change_seq;",
+                "ALTER TABLE geo_service_place "
+                "ADD COLUMN IF NOT EXISTS change_xid bigint NOT NULL "
+                "DEFAULT 0, "
+                "ADD COLUMN IF NOT EXISTS change_seq bigint NOT NULL "
+                "DEFAULT 0;",
+                "ALTER TABLE geo_service_place "
+                "ALTER COLUMN change_xid SET DEFAULT txid_current(), "
+                "ALTER COLUMN change_seq "
+                "SET DEFAULT nextval('geo_service_place_change_seq');",
+                """
+                CREATE TABLE IF NOT EXISTS geo_service_place_tombstone (
+                    place_id bigint PRIMARY KEY,
+                    deleted_at timestamp with time zone NOT NULL
+                        DEFAULT now(),
+                    change_xid bigint NOT NULL DEFAULT txid_current(),
+                    change_seq bigint NOT NULL
+                        DEFAULT nextval('geo_service_place_change_seq')
+                );
+                """,
+                "CREATE INDEX IF NOT EXISTS geo_service_place_tombstone_change "
+                "ON geo_service_place_tombstone "
+                "(change_xid, change_seq, place_id);",
+                """
+                CREATE OR REPLACE FUNCTION geo_service_place_changed()
+                RETURNS trigger LANGUAGE plpgsql AS $$
+                BEGIN
+                    NEW.change_xid := txid_current();
+                    NEW.change_seq := nextval('geo_service_place_change_seq');
+                    RETURN NEW;
+                END
+                $$;
+                """,
+                # An update moving a place to another partition deletes it
+                # from the old one, so only places that are gone for good
+                # leave a tombstone.
+                """
+                CREATE OR REPLACE FUNCTION geo_service_place_deleted()
+                RETURNS trigger LANGUAGE plpgsql AS $$
+                DECLARE
+                    kept boolean;
+                BEGIN
+                    EXECUTE 'SELECT EXISTS (SELECT 1 FROM geo_service_place WHERE id = $1)'
+                        INTO kept USING OLD.id;
+                    IF NOT kept THEN
+                        INSERT INTO geo_service_place_tombstone (place_id)
+                        VALUES (OLD.id) ON CONFLICT (place_id) DO NOTHING;
+                    END IF;
+                    RETURN NULL;
+                END
+                $$;
+                """,
+                "DROP TRIGGER IF EXISTS geo_service_place_changed "
+                "ON geo_service_place;",
+                "CREATE TRIGGER geo_service_place_changed "
+                "BEFORE UPDATE ON geo_service_place FOR EACH ROW "
+                "EXECUTE FUNCTION geo_service_place_changed();",
+                "DROP TRIGGER IF EXISTS geo_service_place_deleted "
+                "ON geo_service_place;",
+                "CREATE TRIGGER geo_service_place_deleted "
+                "AFTER DELETE ON geo_service_place FOR EACH ROW "
+                "EXECUTE FUNCTION geo_service_place_deleted();",
+            ],
+            reverse_sql=[
+                "DROP TRIGGER IF EXISTS geo_service_place_deleted "
+                "ON geo_service_place;",
+                "DROP TRIGGER IF EXISTS geo_service_place_changed "
+                "ON geo_service_place;",
+                "DROP FUNCTION IF EXISTS geo_service_place_deleted();",
+                "DROP FUNCTION IF EXISTS geo_service_place_changed();",
+                "DROP TABLE IF EXISTS geo_service_place_tombstone;",
+                "ALTER TABLE geo_service_place "
+                "DROP COLUMN IF EXISTS change_seq, "
+                "DROP COLUMN IF EXISTS change_xid;",
+                "DROP SEQUENCE IF EXISTS geo_service_place_change_seq;",
+            ],
+        ),
+        migrations.RunPython(
+            create_change_index, reverse_code=drop_change_index
+        ),
+    ]
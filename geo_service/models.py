@@ -1,18 +1,263 @@
+import re
+
+from django.conf import settings
 from django.contrib.gis.db import models
+from django.contrib.gis.geos import Point
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from rest_framework.exceptions import ValidationError
 
+from geo_service import geohash
+from geo_service.signals import places_bulk_changed
+
+DUPLICATE_COORDINATES_MESSAGE = (
+    "A place with the same coordinates already exists."
+)
+
+UPSERT_BATCH_SIZE = 1000
+
+# Every place belongs to the geohash cell of this precision containing it,
+# the key a partitioned table is split on (see geo_service.partitions).
+# Cells of precision 2 span 11.25 by 5.625 degrees.
+REGION_PRECISION = 2
+
+# On PostgreSQL the constraint is named rather than its columns listed, so
+# the target fits both the plain table's constraint on geom and the
+# partitioned table's on geom and region. SQLite only takes columns.
+CONSTRAINT_CONFLICT_TARGET = "ON CONFLICT ON CONSTRAINT unique_place_geom"
+COLUMN_CONFLICT_TARGET = "ON CONFLICT (geom)"
+
+# A violation names the constraint on the plain table and the index of
+# the partition on a partitioned one. SQLite names the column.
+UNIQUE_GEOM_CONSTRAINT = re.compile(
+    r"unique_place_geom|geo_service_place_partitioned_\d+_geom_region_key"
+)
+SQLITE_UNIQUE_GEOM = "UNIQUE constraint failed: geo_service_place.geom"
+
+LIST_DESCRIPTION_WORDS = 10
+
+# The first LIST_DESCRIPTION_WORDS words with the whitespace between them.
+# PostgreSQL splits on no more characters than str.split(), so splitting
+# this head again in Python gives the same words as splitting everything.
+DESCRIPTION_HEAD_PATTERN = (
+    rf"^\s*(\S+(\s+\S+){{0,{LIST_DESCRIPTION_WORDS - 1}}})"
+)
+
+UPSERT_SQL = """
+    INSERT INTO {table} (name, description, geom, updated_at, region)
+    VALUES {values}
+    {conflict_target} DO {action}
+    RETURNING id, ST_X(geom), ST_Y(geom)
+"""
+
+UPSERT_ACTIONS = {
+    "skip": "NOTHING",
+    "update": (
+        "UPDATE SET name = EXCLUDED.name, description = EXCLUDED.description, "
+        "updated_at = EXCLUDED.updated_at"
+    ),
+}
+
+
+class OnConflict(models.TextChoices):
+    ERROR = "error"
+    SKIP = "skip"
+    UPDATE = "update"
+
+
+def is_duplicate_geom(error: IntegrityError) -> bool:
+    """Whether ``error`` comes from the unique constraint on geom."""
+    diag = getattr(error.__cause__, "diag", None)
+    if diag is not None:
+        return bool(
+            UNIQUE_GEOM_CONSTRAINT.fullmatch(diag.constraint_name or "")
+        )
+    return SQLITE_UNIQUE_GEOM in str(error)
+
+
+def place_region(longitude: float, latitude: float) -> str:
+    return geohash.encode(longitude, latitude, REGION_PRECISION)
+
+
+def snap_coordinates(longitude: float, latitude: float) -> tuple:
+    tolerance = settings.PLACE_COORDINATE_TOLERANCE
+    if not tolerance:
+        return longitude, latitude
+    return (
+        round(longitude / tolerance) * tolerance,
+        round(latitude / tolerance) * tolerance,
+    )
+
+
+class PlaceQuerySet(models.QuerySet):
+    def upsert(self, places: list, on_conflict: str = OnConflict.ERROR):
+        self._for_write = True
+        for place in places:
+            place.snap_geom()
+            place.set_region()
+        if on_conflict == OnConflict.ERROR:
+            try:
+                with transaction.atomic(using=self.db):
+                    written = self.bulk_create(places)
+            except IntegrityError as error:
+                if not is_duplicate_geom(error):
+                    raise
+                raise ValidationError(DUPLICATE_COORDINATES_MESSAGE)
+            places_bulk_changed.send(
+                sender=self.model, using=self.db, places=written
+            )
+            return written
+
+        # A single statement must not touch the same row twice, the last
+        # place with given coordinates wins.
+        unique_places = {place.geom.coords: place for place in places}
+        places = list(unique_places.values())
+
+        # Geometries are passed the way the backend writes them for
+        # save(), so the unique constraint sees identical values.
+        connection = connections[self.db]
+        geom_field = self.model._meta.get_field("geom")
+        placeholder = connection.ops.get_geom_placeholder(
+            geom_field, places[0].geom if places else None, None
+        )
+        conflict_target = (
+            CONSTRAINT_CONFLICT_TARGET
+            if connection.vendor == "postgresql"
+            else COLUMN_CONFLICT_TARGET
+        )
+        updated_at = timezone.now()
+        written = []
+        with connection.cursor() as cursor:
+            for start in range(0, len(places), UPSERT_BATCH_SIZE):
+                batch = places[start : start + UPSERT_BATCH_SIZE]
+                cursor.execute(
+                    UPSERT_SQL.format(
+                        table=self.model._meta.db_table,
+                        values=", ".join(
+                            [f"(%s, %s, {placeholder}, %s, %s)"] * len(batch)
+                        ),
+                        conflict_target=conflict_target,
+                        action=UPSERT_ACTIONS[on_conflict],
+                    ),
+                    [
+                        value
+                        for place in batch
+                        for value in (
+                            place.name,
+                            place.description,
+                            geom_field.get_db_prep_value(
+                                place.geom, connection
+                            ),
+                            updated_at,
+                            place.region,
+                        )
+                    ],
+                )
+                for pk, longitude, latitude in cursor.fetchall():
+                    place = unique_places[(longitude, latitude)]
+                    place.pk = pk
+                    place._state.adding = False
+                    place._state.db = self.db
+                    place.updated_at = updated_at
+                    written.append(place)
+        places_bulk_changed.send(
+            sender=self.model, using=self.db, places=written
+        )
+        return written
+
+    def with_coordinates(self):
+        # values() lists annotations after fields in the order they were
+        # added, which here matches the serializer field order.
+        return self.annotate(
+            latitude=models.Func(
+                "geom", function="ST_Y", output_field=models.FloatField()
+            ),
+            longitude=models.Func(
+                "geom", function="ST_X", output_field=models.FloatField()
+            ),
+        )
+
+    def list_values(self):
+        if connections[self.db].vendor == "postgresql":
+            description_head = Coalesce(
+                models.Func(
+                    "description",
+                    models.Value(DESCRIPTION_HEAD_PATTERN),
+                    function="substring",
+                    output_field=models.TextField(),
+                ),
+                models.Value(""),
+                output_field=models.TextField(),
+            )
+        else:
+            # SQLite has no regular expressions, the whole description is
+            # read and shortened in Python.
+            description_head = models.F("description")
+        return (
+            self.with_coordinates()
+            .annotate(description_head=description_head)
+            .values("id", "name", "description_head", "latitude", "longitude")
+        )
+
+    def detail_values(self):
+        return self.with_coordinates().values(
+            "id", "name", "description", "latitude", "longitude"
+        )
+
 
 class Place(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField()
     geom = models.PointField()
+    updated_at = models.DateTimeField(auto_now=True)
+    region = models.CharField(max_length=REGION_PRECISION, editable=False)
 
-    def save(self, *args, **kwargs):
-        if Place.objects.filter(geom=self.geom).exists():
-            raise ValidationError(
-                "A place with the same coordinates already exists."
+    objects = PlaceQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["geom"], name="unique_place_geom"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so that a move can invalidate what the old position
+        # affected as well.
+        instance._loaded_geom = instance.__dict__.get("geom")
+        return instance
+
+    def snap_geom(self) -> None:
+        if settings.PLACE_COORDINATE_TOLERANCE:
+            self.geom = Point(
+                *snap_coordinates(self.geom.x, self.geom.y),
+                srid=self.geom.srid,
             )
-        super().save(*args, **kwargs)
+
+    def set_region(self) -> None:
+        self.region = place_region(self.geom.x, self.geom.y)
+
+    def save(self, *args, **kwargs):
+        self.snap_geom()
+        self.set_region()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            # auto_now only applies to the fields that are written.
+            update_fields = {*update_fields, "updated_at"}
+            if "geom" in update_fields:
+                update_fields.add("region")
+            kwargs["update_fields"] = update_fields
+        using = kwargs.get("using") or router.db_for_write(
+            Place, instance=self
+        )
+        try:
+            with transaction.atomic(using=using):
+                super().save(*args, **kwargs)
+        except IntegrityError as error:
+            if not is_duplicate_geom(error):
+                raise
+            raise ValidationError(DUPLICATE_COORDINATES_MESSAGE)
 
     def __str__(self) -> str:
         return self.name
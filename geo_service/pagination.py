@@ -0,0 +1,59 @@
+import base64
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+class PlaceCursorPagination(CursorPagination):
+    """Cursor pagination on id, with cursors from ``encode_cursor`` that
+    the async list reads and writes as well."""
+
+    ordering = "id"
+    page_size = settings.PLACE_LIST_PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = settings.PLACE_LIST_MAX_PAGE_SIZE
+
+    def encode_cursor(self, cursor: Cursor) -> str:
+        return replace_query_param(
+            self.base_url,
+            self.cursor_query_param,
+            encode_cursor([cursor.position, cursor.offset, cursor.reverse]),
+        )
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            position, offset, reverse = decode_cursor(encoded)
+            if position is not None:
+                position = str(int(position))
+            if not isinstance(offset, int) or offset < 0:
+                raise ValueError("Invalid cursor.")
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        return Cursor(
+            offset=min(offset, self.offset_cutoff),
+            reverse=bool(reverse),
+            position=position,
+        )
+
+
+def encode_cursor(values: list) -> str:
+    """Opaque cursor for a keyset of JSON values."""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> list:
+    """Values of a cursor from ``encode_cursor``, ValueError if it is not
+    one."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (TypeError, ValueError):
+        raise ValueError("Invalid cursor.")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor.")
+    return values
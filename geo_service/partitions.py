@@ -0,0 +1,258 @@
+from django.conf import settings
+from django.db import connections, router, transaction
+
+from geo_service import geohash
+from geo_service.models import REGION_PRECISION, Place
+
+PLACE_TABLE = Place._meta.db_table
+PARTITIONED_TABLE = f"{PLACE_TABLE}_partitioned"
+UNPARTITIONED_TABLE = f"{PLACE_TABLE}_unpartitioned"
+
+# Stamped by the database for the change feed (migration 0007).
+CHANGE_COLUMNS = ["change_xid", "change_seq"]
+
+COLUMNS = [
+    field.column for field in Place._meta.concrete_fields
+] + CHANGE_COLUMNS
+
+# Above this many regions a query is not limited to them, since it would
+# visit most partitions anyway.
+MAX_PRUNED_REGIONS = 64
+
+# Envelopes are widened by this many degrees, so a place lying exactly on
+# a cell edge is found whichever side ST_GeoHash or Python put it on.
+REGION_MARGIN = 1e-9
+
+REGION_CLAUSE = "region = ANY(%(regions)s)"
+
+
+def regions(envelopes: list):
+    """Sorted regions of the ``(min_longitude, min_latitude,
+    max_longitude, max_latitude)`` envelopes, or None when queries should
+    not be limited to regions.
+
+    Only a partitioned table (PLACE_PARTITIONED) has a region on every row.
+    """
+    if not settings.PLACE_PARTITIONED:
+        return None
+    cells = set()
+    for min_longitude, min_latitude, max_longitude, max_latitude in envelopes:
+        cells |= geohash.covering(
+            max(min_longitude - REGION_MARGIN, -180.0),
+            max(min_latitude - REGION_MARGIN, -90.0),
+            min(max_longitude + REGION_MARGIN, 180.0),
+            min(max_latitude + REGION_MARGIN, 90.0),
+            REGION_PRECISION,
+        )
+        if len(cells) > MAX_PRUNED_REGIONS:
+            return None
+    return sorted(cells)
+
+
+# Rows of the plain table written before migration 0006 have no region yet.
+REGION_SQL = (
+    "coalesce(nullif({row}region, ''), "
+    f"ST_GeoHash({{row}}geom, {REGION_PRECISION}))"
+)
+
+CREATE_TABLE_SQL = [
+    """
+    CREATE TABLE {new} (LIKE {table} INCLUDING DEFAULTS INCLUDING GENERATED)
+    PARTITION BY HASH (region)
+    """,
+    "ALTER TABLE {new} ADD CONSTRAINT {new}_pkey PRIMARY KEY (id, region)",
+    # Renamed to unique_place_geom by the swap. A place's region follows
+    # from its geom, so this is as strict as the constraint on geom alone.
+    "ALTER TABLE {new} ADD CONSTRAINT {new}_unique_geom "
+    "UNIQUE (geom, region)",
+    "CREATE INDEX {new}_geom_gist ON {new} USING GIST (geom)",
+    "CREATE INDEX {new}_geog_gist ON {new} USING GIST ((geom::geography))",
+    "CREATE INDEX {new}_search_gin ON {new} USING GIN (search_vector)",
+    "CREATE INDEX {new}_change ON {new} (change_xid, change_seq, id)",
+]
+
+CREATE_PARTITION_SQL = """
+    CREATE TABLE {new}_{remainder} PARTITION OF {new}
+    FOR VALUES WITH (MODULUS {modulus}, REMAINDER {remainder})
+"""
+
+# Mirrors every write to the plain table while rows are copied.
+SYNC_TRIGGER_SQL = [
+    """
+    CREATE OR REPLACE FUNCTION {new}_sync() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            DELETE FROM {new}
+            WHERE id = OLD.id AND region = {old_region};
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO {new} ({columns}) VALUES ({new_values});
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    "DROP TRIGGER IF EXISTS {new}_sync ON {table}",
+    """
+    CREATE TRIGGER {new}_sync AFTER INSERT OR UPDATE OR DELETE ON {table}
+    FOR EACH ROW EXECUTE FUNCTION {new}_sync()
+    """,
+]
+
+ID_RANGE_SQL = "SELECT min(id), max(id) FROM {table}"
+
+# FOR SHARE holds off updates and deletes of the batch until it is copied,
+# after which the trigger mirrors them. Rows the trigger already copied are
+# newer and kept.
+COPY_BATCH_SQL = """
+    INSERT INTO {new} ({columns})
+    SELECT {values}
+    FROM {table}
+    WHERE id >= %(start)s AND id < %(stop)s
+    FOR SHARE
+    ON CONFLICT DO NOTHING
+"""
+
+SWAP_SQL = [
+    "LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE",
+    "DROP TRIGGER {new}_sync ON {table}",
+    "DROP FUNCTION {new}_sync()",
+    "DROP TRIGGER IF EXISTS {table}_changed ON {table}",
+    "DROP TRIGGER IF EXISTS {table}_deleted ON {table}",
+    "ALTER TABLE {table} RENAME TO {old}",
+    "ALTER TABLE {old} RENAME CONSTRAINT unique_place_geom "
+    "TO {old}_unique_geom",
+    "ALTER INDEX IF EXISTS {table}_geog_gist RENAME TO {old}_geog_gist",
+    "ALTER INDEX IF EXISTS {table}_search_gin RENAME TO {old}_search_gin",
+    "ALTER INDEX IF EXISTS {table}_change RENAME TO {old}_change",
+    "ALTER TABLE {new} RENAME TO {table}",
+    "ALTER TABLE {table} RENAME CONSTRAINT {new}_unique_geom "
+    "TO unique_place_geom",
+    "ALTER INDEX {new}_geog_gist RENAME TO {table}_geog_gist",
+    "ALTER INDEX {new}_search_gin RENAME TO {table}_search_gin",
+    "ALTER INDEX {new}_change RENAME TO {table}_change",
+    # Only now, as the sync trigger mirrors updates as a delete and an
+    # insert.
+    "CREATE TRIGGER {table}_changed BEFORE UPDATE ON {table} "
+    "FOR EACH ROW EXECUTE FUNCTION {table}_changed()",
+    "CREATE TRIGGER {table}_deleted AFTER DELETE ON {table} "
+    "FOR EACH ROW EXECUTE FUNCTION {table}_deleted()",
+    # The identity sequence of id belongs to the old table, and partitioned
+    # tables only have identity columns from PostgreSQL 17 on.
+    "CREATE SEQUENCE {table}_region_id_seq OWNED BY {table}.id",
+    "SELECT setval('{table}_region_id_seq', coalesce(max(id), 0) + 1, "
+    "false) FROM {table}",
+    "ALTER TABLE {table} ALTER COLUMN id "
+    "SET DEFAULT nextval('{table}_region_id_seq')",
+]
+
+TABLE_EXISTS_SQL = "SELECT to_regclass(%s) IS NOT NULL"
+
+IS_PARTITIONED_SQL = """
+    SELECT EXISTS (
+        SELECT 1 FROM pg_partitioned_table
+        WHERE partrelid = to_regclass(%s)
+    )
+"""
+
+
+class PartitionError(Exception):
+    pass
+
+
+def _format(sql: str, **kwargs) -> str:
+    return sql.format(
+        table=PLACE_TABLE,
+        new=PARTITIONED_TABLE,
+        old=UNPARTITIONED_TABLE,
+        **kwargs,
+    )
+
+
+def _connection():
+    connection = connections[router.db_for_write(Place)]
+    if connection.vendor != "postgresql":
+        raise PartitionError(
+            "Partitioning needs the PostGIS database backend."
+        )
+    return connection
+
+
+def is_partitioned() -> bool:
+    with _connection().cursor() as cursor:
+        cursor.execute(IS_PARTITIONED_SQL, [PLACE_TABLE])
+        return cursor.fetchone()[0]
+
+
+def create_partitioned_table(partitions: int) -> bool:
+    """Create the empty partitioned table with its indexes and start
+    mirroring writes into it. False when it already exists."""
+    connection = _connection()
+    with transaction.atomic(using=connection.alias):
+        with connection.cursor() as cursor:
+            cursor.execute(TABLE_EXISTS_SQL, [PARTITIONED_TABLE])
+            if cursor.fetchone()[0]:
+                return False
+            for sql in CREATE_TABLE_SQL:
+                cursor.execute(_format(sql))
+            for remainder in range(partitions):
+                cursor.execute(
+                    _format(
+                        CREATE_PARTITION_SQL,
+                        modulus=partitions,
+                        remainder=remainder,
+                    )
+                )
+            for sql in SYNC_TRIGGER_SQL:
+                cursor.execute(
+                    _format(
+                        sql,
+                        columns=", ".join(COLUMNS),
+                        old_region=REGION_SQL.format(row="OLD."),
+                        new_values=", ".join(
+                            REGION_SQL.format(row="NEW.")
+                            if column == "region"
+                            else f"NEW.{column}"
+                            for column in COLUMNS
+                        ),
+                    )
+                )
+    return True
+
+
+def copy_rows(batch_size: int):
+    """Copy the plain table into the partitioned one, one transaction per
+    ``batch_size`` ids. Yields the number of ids covered so far and in
+    total."""
+    connection = _connection()
+    with connection.cursor() as cursor:
+        cursor.execute(_format(ID_RANGE_SQL))
+        min_id, max_id = cursor.fetchone()
+    if min_id is None:
+        return
+    sql = _format(
+        COPY_BATCH_SQL,
+        columns=", ".join(COLUMNS),
+        values=", ".join(
+            REGION_SQL.format(row="") if column == "region" else column
+            for column in COLUMNS
+        ),
+    )
+    for start in range(min_id, max_id + 1, batch_size):
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    sql, {"start": start, "stop": start + batch_size}
+                )
+        yield min(start + batch_size, max_id + 1) - min_id, max_id + 1 - min_id
+
+
+def swap_tables() -> None:
+    """Put the partitioned table in place of the plain one, which is kept
+    as UNPARTITIONED_TABLE until it is dropped by hand."""
+    connection = _connection()
+    with transaction.atomic(using=connection.alias):
+        with connection.cursor() as cursor:
+            for sql in SWAP_SQL:
+                cursor.execute(_format(sql))
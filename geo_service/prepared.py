@@ -0,0 +1,54 @@
+import re
+
+from django.conf import settings
+
+_PARAMETER = re.compile(r"%\((\w+)\)s")
+
+
+class PreparedStatement:
+    """A query in ``%(name)s`` style run as a server-side prepared
+    statement.
+
+    The statement is prepared with PREPARE the first time it runs in a
+    database session and run with EXECUTE afterwards, so PostgreSQL parses
+    and plans it once per session instead of once per call. Without
+    DB_PREPARED_STATEMENTS the query is executed as is.
+    """
+
+    def __init__(self, name: str, sql: str, types: dict):
+        self.name = name
+        self.sql = sql
+        self.parameters = list(types)
+        positions = {
+            parameter: position
+            for position, parameter in enumerate(self.parameters, start=1)
+        }
+        self.prepare_sql = "PREPARE {name} ({types}) AS {sql}".format(
+            name=name,
+            types=", ".join(types.values()),
+            sql=_PARAMETER.sub(
+                lambda match: f"${positions[match.group(1)]}", sql
+            ),
+        )
+        self.execute_sql = "EXECUTE {name} ({parameters})".format(
+            name=name,
+            parameters=", ".join(
+                f"%({parameter})s" for parameter in self.parameters
+            ),
+        )
+
+    def execute(self, cursor, params: dict) -> None:
+        connection = cursor.db
+        if not settings.DB_PREPARED_STATEMENTS or (
+            connection.vendor != "postgresql"
+        ):
+            cursor.execute(self.sql, params)
+            return
+        prepared = connection.__dict__.setdefault("prepared_statements", set())
+        if self.name not in prepared:
+            cursor.execute(self.prepare_sql)
+            prepared.add(self.name)
+        cursor.execute(
+            self.execute_sql,
+            {parameter: params[parameter] for parameter in self.parameters},
+        )
@@ -0,0 +1,722 @@
+import math
+
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.contrib.gis.measure import Distance as DistanceMeasure
+from django.db import connections, router
+
+from geo_service.models import DESCRIPTION_HEAD_PATTERN, Place
+from geo_service.partitions import REGION_CLAUSE, regions
+from geo_service.prepared import PreparedStatement
+
+PLACE_TABLE = Place._meta.db_table
+
+# The GiST index on ``geom::geography`` (migration 0002) serves both the
+# ``<->`` KNN ordering and ``ST_DWithin``, so the query walks the index
+# instead of computing a distance for every row. The inner query picks the
+# k candidates in index order, the outer one ranks them by exact distance.
+NEAREST_PLACES_SQL = """
+    SELECT id, name, description, longitude, latitude, distance
+    FROM (
+        SELECT
+            id,
+            name,
+            description,
+            ST_X(geom) AS longitude,
+            ST_Y(geom) AS latitude,
+            ST_Distance(geom::geography, point.geog) AS distance
+        FROM {table},
+            (
+                SELECT ST_SetSRID(
+                    ST_MakePoint(%(longitude)s, %(latitude)s), {srid}
+                )::geography AS geog
+            ) AS point
+        {where}
+        ORDER BY geom::geography <-> point.geog
+        LIMIT %(k)s
+    ) AS knn
+    ORDER BY distance, id
+"""
+
+WITHIN_DISTANCE_CLAUSE = (
+    "WHERE ST_DWithin(geom::geography, point.geog, %(max_distance)s)"
+)
+
+
+# SpatiaLite keeps the R*Tree of ``geom`` behind the SpatialIndex virtual
+# table. It is searched with a frame around the point, the candidates are
+# ranked by exact distance on the ellipsoid.
+SPATIALITE_NEAREST_PLACES_SQL = """
+    SELECT
+        id,
+        name,
+        description,
+        ST_X(geom) AS longitude,
+        ST_Y(geom) AS latitude,
+        ST_Distance(
+            geom, MakePoint(%(longitude)s, %(latitude)s, {srid}), 1
+        ) AS distance
+    FROM {table}
+    WHERE ROWID IN (
+        SELECT ROWID FROM SpatialIndex
+        WHERE f_table_name = '{table}'
+            AND f_geometry_column = 'geom'
+            AND search_frame = BuildMbr(
+                %(min_longitude)s,
+                %(min_latitude)s,
+                %(max_longitude)s,
+                %(max_latitude)s,
+                {srid}
+            )
+    )
+    ORDER BY distance, id
+    LIMIT %(k)s
+"""
+
+# Fewer meters than any degree of latitude, or of longitude at the equator,
+# has on the WGS84 ellipsoid, so frames err on the large side.
+METERS_PER_DEGREE = 110_574
+
+# Longer than any geodesic on the WGS84 ellipsoid, so ST_DWithin keeps its
+# index condition without filtering anything out, and a frame of this
+# radius covers the whole world.
+UNBOUNDED_DISTANCE = 21_000_000
+
+WORLD_FRAME = (-180.0, -90.0, 180.0, 90.0)
+
+
+def is_postgis(write: bool = False) -> bool:
+    alias = router.db_for_write(Place) if write else router.db_for_read(Place)
+    return connections[alias].vendor == "postgresql"
+
+
+def _read_cursor():
+    return connections[router.db_for_read(Place)].cursor()
+
+
+def search_frame(longitude: float, latitude: float, radius: float) -> tuple:
+    """``(min_longitude, min_latitude, max_longitude, max_latitude)`` of a
+    frame holding every point within ``radius`` meters of the point.
+
+    Frames crossing a pole or the antimeridian span all longitudes.
+    """
+    if radius >= UNBOUNDED_DISTANCE:
+        return WORLD_FRAME
+    delta = radius / METERS_PER_DEGREE
+    min_latitude = latitude - delta
+    max_latitude = latitude + delta
+    if min_latitude <= -90 or max_latitude >= 90:
+        return -180.0, max(min_latitude, -90.0), 180.0, min(max_latitude, 90.0)
+    # Degrees of longitude are shortest on the parallel nearest a pole.
+    delta /= math.cos(math.radians(max(-min_latitude, max_latitude)))
+    min_longitude = longitude - delta
+    max_longitude = longitude + delta
+    if min_longitude < -180 or max_longitude > 180:
+        return -180.0, min_latitude, 180.0, max_latitude
+    return min_longitude, min_latitude, max_longitude, max_latitude
+
+
+def _spatialite_nearest_places(
+    cursor, point: Point, k: int, max_distance: float = None
+) -> list:
+    sql = SPATIALITE_NEAREST_PLACES_SQL.format(
+        table=PLACE_TABLE, srid=settings.DEFAULT_SRID
+    )
+    radius = max_distance
+    if radius is None:
+        radius = settings.SPATIALITE_NEAREST_RADIUS
+    while True:
+        frame = search_frame(point.x, point.y, radius)
+        cursor.execute(
+            sql,
+            {
+                "longitude": point.x,
+                "latitude": point.y,
+                **dict(zip(ENVELOPE_KEYS, frame)),
+                "k": k,
+            },
+        )
+        rows = cursor.fetchall()
+        if max_distance is not None:
+            # Everything within max_distance is in the frame.
+            return [row for row in rows if row[-1] <= max_distance]
+        # Places outside the frame are farther than radius, so the k found
+        # are the nearest once the last of them is within it.
+        if (len(rows) == k and rows[-1][-1] <= radius) or (
+            frame == WORLD_FRAME
+        ):
+            return rows
+        radius *= 4
+
+
+def _place_from_row(
+    id, name, description, longitude, latitude, distance=None
+) -> Place:
+    place = Place(
+        id=id,
+        name=name,
+        description=description,
+        geom=Point(longitude, latitude, srid=settings.DEFAULT_SRID),
+    )
+    if distance is not None:
+        place.distance = DistanceMeasure(m=distance)
+    return place
+
+
+# Keyed by whether there is a maximum distance and whether the query is
+# limited to the regions within it.
+NEAREST_PLACES_STATEMENTS = {
+    (within, pruned): PreparedStatement(
+        "geo_nearest_places"
+        + ("_within" if within else "")
+        + ("_pruned" if pruned else ""),
+        NEAREST_PLACES_SQL.format(
+            table=PLACE_TABLE,
+            srid=settings.DEFAULT_SRID,
+            where=(WITHIN_DISTANCE_CLAUSE if within else "")
+            + (f" AND {REGION_CLAUSE}" if pruned else ""),
+        ),
+        {
+            "longitude": "float8",
+            "latitude": "float8",
+            **({"max_distance": "float8"} if within else {}),
+            **({"regions": "text[]"} if pruned else {}),
+            "k": "int",
+        },
+    )
+    for within, pruned in ((False, False), (True, False), (True, True))
+}
+
+
+def nearest_places(
+    point: Point, k: int = 1, max_distance: float = None
+) -> list:
+    params = {
+        "longitude": point.x,
+        "latitude": point.y,
+        "max_distance": max_distance,
+        "k": k,
+    }
+    with _read_cursor() as cursor:
+        if cursor.db.vendor != "postgresql":
+            rows = _spatialite_nearest_places(cursor, point, k, max_distance)
+        else:
+            if max_distance is not None:
+                params["regions"] = regions(
+                    [search_frame(point.x, point.y, max_distance)]
+                )
+            pruned = params.get("regions") is not None
+            NEAREST_PLACES_STATEMENTS[
+                max_distance is not None, pruned
+            ].execute(cursor, params)
+            rows = cursor.fetchall()
+        return [_place_from_row(*row) for row in rows]
+
+
+PLACE_SQL = """
+    SELECT
+        id,
+        name,
+        description,
+        ST_Y(geom) AS latitude,
+        ST_X(geom) AS longitude
+    FROM {table}
+    WHERE id = %(id)s
+"""
+
+PLACE_STATEMENT = PreparedStatement(
+    "geo_place", PLACE_SQL.format(table=PLACE_TABLE), {"id": "bigint"}
+)
+
+
+def place_detail(pk: int):
+    """Detail representation of the place, or None when there is none."""
+    with _read_cursor() as cursor:
+        PLACE_STATEMENT.execute(cursor, {"id": pk})
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    return dict(
+        zip(("id", "name", "description", "latitude", "longitude"), row)
+    )
+
+
+# The place a create with on_conflict=skip ran into. Read from the database
+# that was written to.
+PLACE_AT_SQL = """
+    SELECT id, name, description, ST_X(geom), ST_Y(geom)
+    FROM {table}
+    WHERE geom = ST_SetSRID(
+        ST_MakePoint(%(longitude)s, %(latitude)s), {srid}
+    )
+"""
+
+PLACE_AT_STATEMENT = PreparedStatement(
+    "geo_place_at",
+    PLACE_AT_SQL.format(table=PLACE_TABLE, srid=settings.DEFAULT_SRID),
+    {"longitude": "float8", "latitude": "float8"},
+)
+
+
+# SpatiaLite compares geometry blobs with ``=``, so the point is built with
+# the same GeomFromText Django writes it with.
+SPATIALITE_PLACE_AT_SQL = """
+    SELECT id, name, description, ST_X(geom), ST_Y(geom)
+    FROM {table}
+    WHERE geom = GeomFromText(%(wkt)s, {srid})
+"""
+
+
+def place_at(longitude: float, latitude: float):
+    with connections[router.db_for_write(Place)].cursor() as cursor:
+        if cursor.db.vendor != "postgresql":
+            cursor.execute(
+                SPATIALITE_PLACE_AT_SQL.format(
+                    table=PLACE_TABLE, srid=settings.DEFAULT_SRID
+                ),
+                {"wkt": Point(longitude, latitude).wkt},
+            )
+        else:
+            PLACE_AT_STATEMENT.execute(
+                cursor, {"longitude": longitude, "latitude": latitude}
+            )
+        row = cursor.fetchone()
+    return _place_from_row(*row) if row is not None else None
+
+
+# One round trip for the whole batch: the query points are unnested from
+# arrays and every one of them runs the same index-assisted KNN lookup
+# through a LATERAL join.
+NEAREST_PLACES_BATCH_SQL = """
+    SELECT
+        query.position,
+        nearest.id,
+        nearest.name,
+        nearest.description,
+        nearest.longitude,
+        nearest.latitude,
+        nearest.distance
+    FROM unnest(
+        %(longitudes)s::float8[],
+        %(latitudes)s::float8[],
+        %(max_distances)s::float8[]
+    ) WITH ORDINALITY AS query(longitude, latitude, max_distance, position)
+    CROSS JOIN LATERAL (
+        SELECT ST_SetSRID(
+            ST_MakePoint(query.longitude, query.latitude), {srid}
+        )::geography AS geog
+    ) AS point
+    CROSS JOIN LATERAL (
+        SELECT
+            id,
+            name,
+            description,
+            ST_X(geom) AS longitude,
+            ST_Y(geom) AS latitude,
+            ST_Distance(geom::geography, point.geog) AS distance
+        FROM {table}
+        WHERE ST_DWithin(
+            geom::geography,
+            point.geog,
+            coalesce(query.max_distance, {unbounded_distance})
+        )
+        ORDER BY geom::geography <-> point.geog
+        LIMIT 1
+    ) AS nearest
+    ORDER BY query.position
+"""
+
+
+def nearest_places_batch(queries: list) -> list:
+    if not is_postgis():
+        # SpatiaLite runs in process, a lookup per point costs no round
+        # trip.
+        return [
+            next(
+                iter(
+                    nearest_places(
+                        Point(longitude, latitude, srid=settings.DEFAULT_SRID),
+                        max_distance=max_distance,
+                    )
+                ),
+                None,
+            )
+            for longitude, latitude, max_distance in queries
+        ]
+    sql = NEAREST_PLACES_BATCH_SQL.format(
+        table=PLACE_TABLE,
+        srid=settings.DEFAULT_SRID,
+        unbounded_distance=UNBOUNDED_DISTANCE,
+    )
+    params = {
+        "longitudes": [longitude for longitude, _, _ in queries],
+        "latitudes": [latitude for _, latitude, _ in queries],
+        "max_distances": [max_distance for _, _, max_distance in queries],
+    }
+    places = [None] * len(queries)
+    with _read_cursor() as cursor:
+        cursor.execute(sql, params)
+        for position, *row in cursor.fetchall():
+            places[position - 1] = _place_from_row(*row)
+    return places
+
+
+# ST_DWithin on geography answers from the GiST index, so only the places
+# inside the radius get an exact distance; they are sorted and the page
+# after the (distance, id) keyset is cut from them.
+PLACES_WITHIN_SQL = """
+    SELECT id, name, description, latitude, longitude, distance
+    FROM (
+        SELECT
+            id,
+            name,
+            description,
+            ST_Y(geom) AS latitude,
+            ST_X(geom) AS longitude,
+            ST_Distance(geom::geography, point.geog) AS distance
+        FROM {table},
+            (
+                SELECT ST_SetSRID(
+                    ST_MakePoint(%(longitude)s, %(latitude)s), {srid}
+                )::geography AS geog
+            ) AS point
+        WHERE ST_DWithin(geom::geography, point.geog, %(distance)s)
+            {regions}
+    ) AS within
+    WHERE (distance, id) > (%(after_distance)s, %(after_id)s)
+    ORDER BY distance, id
+    LIMIT %(limit)s
+"""
+
+# The R*Tree frame of the radius, refined by exact distance.
+SPATIALITE_PLACES_WITHIN_SQL = """
+    SELECT id, name, description, latitude, longitude, distance
+    FROM (
+        SELECT
+            id,
+            name,
+            description,
+            ST_Y(geom) AS latitude,
+            ST_X(geom) AS longitude,
+            ST_Distance(
+                geom, MakePoint(%(longitude)s, %(latitude)s, {srid}), 1
+            ) AS distance
+        FROM {table}
+        WHERE ROWID IN (
+            SELECT ROWID FROM SpatialIndex
+            WHERE f_table_name = '{table}'
+                AND f_geometry_column = 'geom'
+                AND search_frame = BuildMbr(
+                    %(min_longitude)s,
+                    %(min_latitude)s,
+                    %(max_longitude)s,
+                    %(max_latitude)s,
+                    {srid}
+                )
+        )
+    ) AS within
+    WHERE distance <= %(distance)s
+        AND (distance, id) > (%(after_distance)s, %(after_id)s)
+    ORDER BY distance, id
+    LIMIT %(limit)s
+"""
+
+
+def places_within(
+    longitude: float,
+    latitude: float,
+    distance: float,
+    after: tuple = (-1.0, 0),
+    limit: int = 100,
+) -> list:
+    """Places within ``distance`` meters of the point ordered by distance
+    and id, starting after the ``(distance, id)`` keyset ``after``."""
+    params = {
+        "longitude": longitude,
+        "latitude": latitude,
+        "distance": distance,
+        "after_distance": after[0],
+        "after_id": after[1],
+        "limit": limit,
+    }
+    with _read_cursor() as cursor:
+        frame = search_frame(longitude, latitude, distance)
+        if cursor.db.vendor == "postgresql":
+            params["regions"] = regions([frame])
+            sql = PLACES_WITHIN_SQL.format(
+                table=PLACE_TABLE,
+                srid=settings.DEFAULT_SRID,
+                regions=(
+                    f"AND {REGION_CLAUSE}"
+                    if params["regions"] is not None
+                    else ""
+                ),
+            )
+        else:
+            params.update(zip(ENVELOPE_KEYS, frame))
+            sql = SPATIALITE_PLACES_WITHIN_SQL.format(
+                table=PLACE_TABLE, srid=settings.DEFAULT_SRID
+            )
+        cursor.execute(sql, params)
+        return _fetch_dicts(cursor)
+
+
+# ``search_vector`` is a generated column with a GIN index, see migration
+# 0004. Near a point the rank is scaled down with the distance, and a
+# radius is answered by the geography GiST index; the planner can combine
+# both indexes.
+SEARCH_PLACES_SQL = """
+    SELECT id, name, description, latitude, longitude, distance, rank
+    FROM (
+        SELECT
+            id,
+            name,
+            description,
+            ST_Y(geom) AS latitude,
+            ST_X(geom) AS longitude,
+            {distance} AS distance,
+            ts_rank_cd(search_vector, query.tsquery, 32) AS rank
+        FROM {table},
+            websearch_to_tsquery('simple', %(q)s) AS query(tsquery){point}
+        WHERE search_vector @@ query.tsquery{within}
+    ) AS matches
+    ORDER BY {score} DESC, id
+    LIMIT %(limit)s
+"""
+
+SEARCH_POINT_SQL = """,
+            (
+                SELECT ST_SetSRID(
+                    ST_MakePoint(%(longitude)s, %(latitude)s), {srid}
+                )::geography AS geog
+            ) AS point"""
+
+SEARCH_WITHIN_SQL = (
+    "\n            AND ST_DWithin(geom::geography, point.geog, %(distance)s)"
+)
+
+SEARCH_REGIONS_SQL = f"\n            AND {REGION_CLAUSE}"
+
+
+def search_places(
+    q: str,
+    point: tuple = None,
+    distance: float = None,
+    limit: int = 20,
+) -> list:
+    """Places matching the web search style query ``q``, most relevant
+    first.
+
+    With a ``(longitude, latitude)`` point the text rank is scaled by
+    PLACE_SEARCH_DISTANCE_SCALE / (PLACE_SEARCH_DISTANCE_SCALE + distance)
+    and ``distance`` in meters, if given, limits the results to a radius.
+    """
+    params = {"q": q, "limit": limit}
+    if point is None:
+        sql = SEARCH_PLACES_SQL.format(
+            table=PLACE_TABLE,
+            distance="NULL::float",
+            point="",
+            within="",
+            score="rank",
+        )
+    else:
+        params.update(
+            longitude=point[0],
+            latitude=point[1],
+            distance=distance,
+            scale=settings.PLACE_SEARCH_DISTANCE_SCALE,
+            regions=None,
+        )
+        if distance is not None:
+            params["regions"] = regions(
+                [search_frame(point[0], point[1], distance)]
+            )
+        sql = SEARCH_PLACES_SQL.format(
+            table=PLACE_TABLE,
+            distance="ST_Distance(geom::geography, point.geog)",
+            point=SEARCH_POINT_SQL.format(srid=settings.DEFAULT_SRID),
+            within=(SEARCH_WITHIN_SQL if distance is not None else "")
+            + (SEARCH_REGIONS_SQL if params["regions"] is not None else ""),
+            score="rank * %(scale)s / (%(scale)s + distance)",
+        )
+    with _read_cursor() as cursor:
+        cursor.execute(sql, params)
+        return _fetch_dicts(cursor)
+
+
+PLACE_COORDINATES_SQL = "SELECT id, ST_X(geom), ST_Y(geom) FROM {table}"
+
+
+def iter_place_coordinates(chunk_size: int = 10_000, using: str = None):
+    connection = connections[using or router.db_for_read(Place)]
+    with connection.cursor() as cursor:
+        cursor.execute(PLACE_COORDINATES_SQL.format(table=PLACE_TABLE))
+        while rows := cursor.fetchmany(chunk_size):
+            yield from rows
+
+
+TOMBSTONE_TABLE = f"{PLACE_TABLE}_tombstone"
+
+# Changes are ordered by the transaction that wrote them, then by the
+# change sequence, and end before the oldest transaction still running:
+# sequence values are taken before commit, so a later commit may still
+# bring changes below the last one seen, but never below that horizon.
+PLACE_CHANGES_SQL = """
+    WITH horizon AS (
+        SELECT txid_snapshot_xmin(txid_current_snapshot()) AS xmin
+    )
+    SELECT * FROM (
+        (
+            SELECT
+                change_xid,
+                change_seq AS seq,
+                'upsert' AS op,
+                id,
+                name,
+                description,
+                ST_Y(geom) AS latitude,
+                ST_X(geom) AS longitude,
+                updated_at
+            FROM {table}
+            WHERE (change_xid, change_seq, id) > (%(xid)s, %(seq)s, %(id)s)
+                AND change_xid < (SELECT xmin FROM horizon)
+            ORDER BY change_xid, change_seq, id
+            LIMIT %(limit)s
+        )
+        UNION ALL
+        (
+            SELECT
+                change_xid,
+                change_seq,
+                'delete',
+                place_id,
+                NULL,
+                NULL,
+                NULL,
+                NULL,
+                deleted_at
+            FROM {tombstones}
+            WHERE (change_xid, change_seq, place_id)
+                    > (%(xid)s, %(seq)s, %(id)s)
+                AND change_xid < (SELECT xmin FROM horizon)
+            ORDER BY change_xid, change_seq, place_id
+            LIMIT %(limit)s
+        )
+    ) AS changes
+    ORDER BY change_xid, seq, id
+    LIMIT %(limit)s
+"""
+
+
+def place_changes(after: tuple = (0, 0, 0), limit: int = 1000) -> list:
+    """Creates and updates (op ``upsert``) and deletes (op ``delete``) of
+    places in the order they were made, starting after the
+    ``(change_xid, seq, id)`` keyset ``after``.
+
+    Only the latest change of a place is kept, so a place changed again
+    moves to the end.
+    """
+    with _read_cursor() as cursor:
+        cursor.execute(
+            PLACE_CHANGES_SQL.format(
+                table=PLACE_TABLE, tombstones=TOMBSTONE_TABLE
+            ),
+            {
+                "xid": after[0],
+                "seq": after[1],
+                "id": after[2],
+                "limit": limit,
+            },
+        )
+        return _fetch_dicts(cursor)
+
+
+# ``&&`` compares bounding boxes only, which for points is exact, and is
+# answered by the GiST index on ``geom``.
+BBOX_CLAUSE = (
+    "geom && ST_MakeEnvelope("
+    "%(min_longitude{n})s, %(min_latitude{n})s, "
+    "%(max_longitude{n})s, %(max_latitude{n})s, {srid})"
+)
+
+ENVELOPE_KEYS = (
+    "min_longitude",
+    "min_latitude",
+    "max_longitude",
+    "max_latitude",
+)
+
+COUNT_IN_BBOX_SQL = """
+    SELECT count(*)
+    FROM (SELECT 1 FROM {table} WHERE {where} LIMIT %(limit)s) AS limited
+"""
+
+PLACES_IN_BBOX_SQL = """
+    SELECT
+        id,
+        name,
+        coalesce(substring(description, %(pattern)s), '') AS description_head,
+        ST_Y(geom) AS latitude,
+        ST_X(geom) AS longitude
+    FROM {table}
+    WHERE {where}
+    ORDER BY id
+"""
+
+CLUSTERS_IN_BBOX_SQL = """
+    SELECT
+        count(*) AS count,
+        avg(ST_Y(geom)) AS latitude,
+        avg(ST_X(geom)) AS longitude,
+        CASE WHEN count(*) = 1 THEN min(id) END AS id
+    FROM {table}
+    WHERE {where}
+    GROUP BY ST_SnapToGrid(geom, %(cell_size)s)
+    ORDER BY count DESC, latitude, longitude
+"""
+
+
+def _bbox_where(envelopes: list) -> tuple:
+    clauses = []
+    params = {}
+    for n, envelope in enumerate(envelopes):
+        clauses.append(BBOX_CLAUSE.format(n=n, srid=settings.DEFAULT_SRID))
+        params.update(zip((f"{key}{n}" for key in ENVELOPE_KEYS), envelope))
+    where = f"({' OR '.join(clauses)})"
+    params["regions"] = regions(envelopes)
+    if params["regions"] is not None:
+        where += f" AND {REGION_CLAUSE}"
+    return where, params
+
+
+def _fetch_dicts(cursor) -> list:
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def places_in_bbox(envelopes: list, max_places: int, cell_size: float):
+    """Places inside any of the ``(min_longitude, min_latitude,
+    max_longitude, max_latitude)`` envelopes as ``(clustered, rows)``.
+
+    When more than ``max_places`` fall inside, the rows are clusters of a
+    ``cell_size`` degrees grid instead of places.
+    """
+    where, params = _bbox_where(envelopes)
+    with _read_cursor() as cursor:
+        cursor.execute(
+            COUNT_IN_BBOX_SQL.format(table=PLACE_TABLE, where=where),
+            {**params, "limit": max_places + 1},
+        )
+        (count,) = cursor.fetchone()
+        if count <= max_places:
+            cursor.execute(
+                PLACES_IN_BBOX_SQL.format(table=PLACE_TABLE, where=where),
+                {**params, "pattern": DESCRIPTION_HEAD_PATTERN},
+            )
+            return False, _fetch_dicts(cursor)
+        cursor.execute(
+            CLUSTERS_IN_BBOX_SQL.format(table=PLACE_TABLE, where=where),
+            {**params, "cell_size": cell_size},
+        )
+        return True, _fetch_dicts(cursor)
@@ -0,0 +1,118 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from geo_service.cache import nearest_point_cache
+from geo_service.conditional import dataset_version
+from geo_service.metrics import count_query
+from geo_service.models import Place
+from geo_service.routers import lag_repeater
+from geo_service.signals import places_bulk_changed
+from geo_service.spatial_engine import spatial_engine
+from geo_service.tiles import tile_cache
+
+
+def _coordinates(geom) -> tuple:
+    if geom.srid not in (None, 4326):
+        geom = geom.transform(4326, clone=True)
+    return geom.x, geom.y
+
+
+@receiver(post_save, sender=Place)
+def place_saved(sender, instance, using, created, **kwargs):
+    pk = instance.pk
+    longitude, latitude = _coordinates(instance.geom)
+    loaded_geom = getattr(instance, "_loaded_geom", None)
+    old_position = _coordinates(loaded_geom) if loaded_geom else None
+    instance._loaded_geom = instance.geom
+
+    def invalidate_caches():
+        if nearest_point_cache.enabled:
+            nearest_point_cache.invalidate(longitude, latitude)
+            if old_position is not None:
+                nearest_point_cache.invalidate(*old_position)
+            elif not created:
+                nearest_point_cache.invalidate_all()
+        if tile_cache.enabled:
+            tile_cache.invalidate(longitude, latitude)
+            if old_position is not None:
+                tile_cache.invalidate(*old_position)
+            elif not created:
+                tile_cache.clear()
+
+    def invalidate():
+        dataset_version.bump()
+        spatial_engine.update(pk, longitude, latitude)
+        invalidate_caches()
+        lag_repeater.repeat(invalidate_caches)
+
+    transaction.on_commit(invalidate, using=using)
+
+
+@receiver(post_delete, sender=Place)
+def place_deleted(sender, instance, using, **kwargs):
+    pk = instance.pk
+    longitude, latitude = _coordinates(instance.geom)
+
+    def invalidate_caches():
+        if nearest_point_cache.enabled:
+            nearest_point_cache.invalidate(longitude, latitude)
+        if tile_cache.enabled:
+            tile_cache.invalidate(longitude, latitude)
+
+    def invalidate():
+        dataset_version.bump()
+        spatial_engine.delete(pk)
+        invalidate_caches()
+        lag_repeater.repeat(invalidate_caches)
+
+    transaction.on_commit(invalidate, using=using)
+
+
+@receiver(places_bulk_changed, sender=Place)
+def places_bulk_changed_received(sender, using, places=None, **kwargs):
+    # An upsert never moves a place, its conflicts are on the coordinates.
+    positions = (
+        None
+        if places is None
+        else [(place.pk, *_coordinates(place.geom)) for place in places]
+    )
+
+    def invalidate_caches():
+        if positions is None:
+            if nearest_point_cache.enabled:
+                nearest_point_cache.invalidate_all()
+            if tile_cache.enabled:
+                tile_cache.clear()
+            return
+        points = [position[1:] for position in positions]
+        if nearest_point_cache.enabled:
+            nearest_point_cache.invalidate_many(points)
+        if tile_cache.enabled:
+            tile_cache.invalidate_many(points)
+
+    def invalidate():
+        dataset_version.bump()
+        if positions is None:
+            spatial_engine.invalidate()
+        else:
+            for pk, longitude, latitude in positions:
+                spatial_engine.update(pk, longitude, latitude)
+        invalidate_caches()
+        lag_repeater.repeat(invalidate_caches)
+
+    transaction.on_commit(invalidate, using=using)
+
+
+@receiver(connection_created)
+def forget_prepared_statements(sender, connection, **kwargs):
+    # Prepared statements live only as long as the server session.
+    connection.prepared_statements = set()
+
+
+@receiver(connection_created)
+def count_queries(sender, connection, **kwargs):
+    # Installed once per connection wrapper, which outlives reconnects.
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
@@ -0,0 +1,108 @@
+import logging
+import queue
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_pin = ContextVar("replica_pin", default=None)
+
+
+class ReplicaPin:
+    """Whether the reads of the current request must see the primary."""
+
+    __slots__ = ("pinned", "wrote")
+
+    def __init__(self, pinned: bool = False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def start_request(pinned: bool):
+    """Route the reads of the current context until ``finish_request``
+    is called with the returned token."""
+    pin = ReplicaPin(pinned)
+    return pin, _pin.set(pin)
+
+
+def finish_request(token) -> None:
+    _pin.reset(token)
+
+
+class ReplicaRouter:
+    """Send writes of geo_service models to ``default`` and reads to a
+    random one of DB_REPLICAS.
+
+    Once the current request has written, and for DB_REPLICA_STICKY_SECONDS
+    after any request of the same client wrote, reads stay on ``default``
+    so the client reads its own writes despite replication lag. Other
+    apps, like sessions and auth, always use ``default``.
+    """
+
+    app_label = "geo_service"
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != self.app_label or not settings.DB_REPLICAS:
+            return None
+        pin = _pin.get()
+        if pin is not None and (pin.pinned or pin.wrote):
+            return "default"
+        return random.choice(settings.DB_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label != self.app_label:
+            return None
+        pin = _pin.get()
+        if pin is not None:
+            pin.wrote = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DB_REPLICAS
+
+
+class LagRepeater:
+    """Runs callbacks a second time DB_REPLICA_STICKY_SECONDS later.
+
+    Meant for cache invalidations after a write: until the replicas have
+    the write, a cache miss can fill the cache again from one that has
+    not. Callbacks run in order in one daemon thread, as they all wait
+    the same time.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def repeat(self, callback) -> None:
+        if not settings.DB_REPLICAS:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="replica-lag", daemon=True
+                )
+                self._thread.start()
+        due = time.monotonic() + settings.DB_REPLICA_STICKY_SECONDS
+        self._queue.put((due, callback))
+
+    def _run(self) -> None:
+        while True:
+            due, callback = self._queue.get()
+            time.sleep(max(due - time.monotonic(), 0))
+            try:
+                callback()
+            except Exception:
+                logger.exception("Repeating %r failed.", callback)
+
+
+lag_repeater = LagRepeater()
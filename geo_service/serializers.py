@@ -1,9 +1,30 @@
-from django.contrib.gis import gdal
+from django.conf import settings
 from rest_framework import serializers
 from django.contrib.gis.geos import Point
-from django.conf import settings
 
-from geo_service.models import Place
+from geo_service.metrics import measure
+from geo_service.models import LIST_DESCRIPTION_WORDS, OnConflict, Place
+from geo_service.pagination import decode_cursor
+from geo_service.queries import place_at
+from geo_service.transforms import is_valid_srid, to_default_srid
+
+MAX_ZOOM = 22
+
+
+def shorten_description(description: str) -> str:
+    return " ".join(description.split()[:LIST_DESCRIPTION_WORDS])
+
+
+def place_list_row(row: dict) -> dict:
+    """Representation of a ``Place.objects.list_values()`` row, the same
+    as :class:`PlaceListSerializer` gives for the place."""
+    return {
+        "id": row["id"],
+        "name": row["name"],
+        "description": shorten_description(row["description_head"]),
+        "latitude": row["latitude"],
+        "longitude": row["longitude"],
+    }
 
 
 class PlaceSerializer(serializers.ModelSerializer):
@@ -15,10 +36,12 @@ class PlaceSerializer(serializers.ModelSerializer):
         model = Place
         fields = ("id", "name", "description", "latitude", "longitude", "srid")
 
+    def to_representation(self, instance):
+        with measure("serialization"):
+            return super().to_representation(instance)
+
     def validate_srid(self, srid):
-        try:
-            gdal.SpatialReference(srid)
-        except Exception:
+        if not is_valid_srid(srid):
             raise serializers.ValidationError("Invalid SRID.")
 
         return srid
@@ -35,31 +58,36 @@ class PlaceSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Latitude is incorrect.")
         if point.x < -180 or point.y > 180:
             raise serializers.ValidationError("Longitude is incorrect.")
+        # Kept for create and update, which would transform it again.
+        attrs["geom"]["point"] = point
         return attrs
 
     @staticmethod
     def _create_point(longitude: float, latitude: float, srid: int) -> Point:
-        point = Point(x=longitude, y=latitude, srid=srid)
-        if srid != settings.DEFAULT_SRID:
-            point.transform(settings.DEFAULT_SRID)
-        return point
+        return to_default_srid(longitude, latitude, srid)
 
 
 class PlaceCreateSerializer(PlaceSerializer):
+    on_conflict = serializers.ChoiceField(
+        choices=OnConflict.choices, default=OnConflict.ERROR, write_only=True
+    )
+
+    class Meta(PlaceSerializer.Meta):
+        fields = PlaceSerializer.Meta.fields + ("on_conflict",)
+
     def create(self, validated_data):
         name = validated_data.get("name")
         description = validated_data.get("description")
-        latitude = validated_data.get("geom").get("y")
-        longitude = validated_data.get("geom").get("x")
-        srid = validated_data.get("geom").get("srid")
-        place = Place.objects.create(
-            name=name,
-            description=description,
-            geom=self._create_point(
-                longitude=longitude, latitude=latitude, srid=srid
-            ),
-        )
-        return place
+        point = validated_data.get("geom").get("point")
+        on_conflict = validated_data.get("on_conflict")
+        place = Place(name=name, description=description, geom=point)
+        if on_conflict == OnConflict.ERROR:
+            place.save()
+            return place
+        written = Place.objects.upsert([place], on_conflict=on_conflict)
+        if not written:
+            return place_at(place.geom.x, place.geom.y)
+        return written[0]
 
 
 class PlaceListSerializer(PlaceSerializer):
@@ -67,8 +95,7 @@ class PlaceListSerializer(PlaceSerializer):
 
     @staticmethod
     def get_description(obj):
-        words = obj.description.split()
-        return " ".join(words[:10])
+        return shorten_description(obj.description)
 
 
 class PlaceDetailSerializer(PlaceSerializer):
@@ -78,9 +105,7 @@ class PlaceDetailSerializer(PlaceSerializer):
         longitude = geom.get("x")
         srid = geom.get("srid")
         if all([latitude, longitude, srid]):
-            instance.geom = self._create_point(
-                longitude=longitude, latitude=latitude, srid=srid
-            )
+            instance.geom = geom["point"]
         return super().update(instance, validated_data)
 
 
@@ -95,3 +120,120 @@ class NearestPointSerializer(PlaceSerializer):
         if hasattr(obj, "distance"):
             return obj.distance.m
         return None
+
+
+class NearestPointQuerySerializer(serializers.Serializer):
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+    distance = serializers.IntegerField(
+        min_value=0, required=False, allow_null=True
+    )
+
+
+class RadiusQuerySerializer(serializers.Serializer):
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+    distance = serializers.FloatField(
+        min_value=0, help_text="Radius in meters."
+    )
+    page_size = serializers.IntegerField(
+        min_value=1,
+        max_value=settings.PLACE_RADIUS_MAX_PAGE_SIZE,
+        default=settings.PLACE_RADIUS_PAGE_SIZE,
+    )
+    cursor = serializers.CharField(
+        required=False, help_text="The cursor of the next page."
+    )
+
+    def validate_cursor(self, cursor):
+        # The distance and id of the last place so far and the number of
+        # places returned before.
+        try:
+            distance, pk, returned = decode_cursor(cursor)
+            return float(distance), int(pk), int(returned)
+        except (TypeError, ValueError):
+            raise serializers.ValidationError("Invalid cursor.")
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(
+        max_length=200,
+        help_text='Words to look for in names and descriptions; "quoted '
+        'phrases", OR and -excluded words are understood.',
+    )
+    latitude = serializers.FloatField(
+        min_value=-90, max_value=90, required=False
+    )
+    longitude = serializers.FloatField(
+        min_value=-180, max_value=180, required=False
+    )
+    distance = serializers.FloatField(
+        min_value=0,
+        required=False,
+        help_text="Radius in meters around latitude and longitude.",
+    )
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=settings.PLACE_SEARCH_MAX_LIMIT,
+        default=settings.PLACE_SEARCH_LIMIT,
+    )
+
+    def validate(self, data):
+        if ("latitude" in data) != ("longitude" in data):
+            raise serializers.ValidationError(
+                "You have to provide both latitude and longitude."
+            )
+        if "distance" in data and "latitude" not in data:
+            raise serializers.ValidationError(
+                "You have to provide latitude and longitude with distance."
+            )
+        return data
+
+
+class ChangesQuerySerializer(serializers.Serializer):
+    since = serializers.CharField(
+        required=False,
+        help_text="The cursor returned with the last changes; all changes "
+        "without it.",
+    )
+    page_size = serializers.IntegerField(
+        min_value=1,
+        max_value=settings.PLACE_CHANGES_MAX_PAGE_SIZE,
+        default=settings.PLACE_CHANGES_PAGE_SIZE,
+    )
+
+    def validate_since(self, since):
+        # The transaction id, change sequence and id of the last change.
+        try:
+            xid, seq, pk = decode_cursor(since)
+            return int(xid), int(seq), int(pk)
+        except (TypeError, ValueError):
+            raise serializers.ValidationError("Invalid cursor.")
+
+
+class BBoxQuerySerializer(serializers.Serializer):
+    bbox = serializers.CharField(
+        help_text="min_longitude,min_latitude,max_longitude,max_latitude; "
+        "a min_longitude above max_longitude crosses the antimeridian."
+    )
+    zoom = serializers.IntegerField(
+        min_value=0, max_value=MAX_ZOOM, required=False, allow_null=True
+    )
+
+    def validate_bbox(self, bbox):
+        try:
+            min_longitude, min_latitude, max_longitude, max_latitude = (
+                float(value) for value in bbox.split(",")
+            )
+        except ValueError:
+            raise serializers.ValidationError(
+                "bbox must be min_longitude,min_latitude,"
+                "max_longitude,max_latitude."
+            )
+        if not (
+            -180 <= min_longitude <= 180
+            and -180 <= max_longitude <= 180
+            and -90 <= min_latitude <= max_latitude <= 90
+        ):
+            raise serializers.ValidationError("bbox is out of range.")
+        return min_longitude, min_latitude, max_longitude, max_latitude
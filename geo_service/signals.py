@@ -0,0 +1,7 @@
+from django.dispatch import Signal
+
+# Sent after writes that bypass Model.save and Model.delete (COPY imports,
+# upserts), so per-row post_save/post_delete receivers never saw them.
+# Upserts pass the places they wrote as ``places``; without it anything may
+# have changed.
+places_bulk_changed = Signal()
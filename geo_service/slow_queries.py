@@ -0,0 +1,219 @@
+import json
+import logging
+import random
+import re
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError, connections, transaction
+
+from geo_service.models import Place
+from geo_service.partitions import PARTITIONED_TABLE
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "geo:slow_queries"
+COUNTER_KEY = f"{KEY_PREFIX}:count"
+
+PLACE_TABLE = Place._meta.db_table
+
+# Once partition_places has run, a scan of the places table is one of its
+# partitions, which keep the names they were created with.
+PLACE_RELATION = re.compile(
+    rf"{re.escape(PLACE_TABLE)}|{re.escape(PARTITIONED_TABLE)}_\d+"
+)
+
+EXPLAIN_SQL = "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}"
+
+# ANALYZE runs the statement again, which is only harmless for reads. The
+# prepared statements are all SELECTs.
+EXPLAINABLE = re.compile(r"\s*(SELECT|EXECUTE)\b", re.IGNORECASE)
+
+
+def plan_nodes(plan: list):
+    """All nodes of an ``EXPLAIN (FORMAT JSON)`` plan, depth first."""
+    nodes = [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        yield node
+        nodes.extend(reversed(node.get("Plans", [])))
+
+
+def place_scans(plan: list) -> list:
+    """``(node type, index name)`` of every scan of the places table or
+    of one of its partitions."""
+    return [
+        (node["Node Type"], node.get("Index Name"))
+        for node in plan_nodes(plan)
+        if PLACE_RELATION.fullmatch(node.get("Relation Name", ""))
+    ]
+
+
+def _jsonable(params):
+    return json.loads(json.dumps(params, default=str))
+
+
+class SlowQueryLog:
+    """Queries slower than SLOW_QUERY_THRESHOLD milliseconds.
+
+    Every slow query is logged and kept in a ring of SLOW_QUERY_LOG_SIZE
+    entries in the SLOW_QUERY_LOG_CACHE_ALIAS cache, where the
+    ``slow_queries`` command reads them. A SLOW_QUERY_EXPLAIN_RATE share
+    of them is run again under ``EXPLAIN (ANALYZE, BUFFERS)`` and kept
+    with its plan.
+    """
+
+    def __init__(self):
+        self._random = random.Random()
+        self._local = threading.local()
+
+    @property
+    def enabled(self) -> bool:
+        return settings.SLOW_QUERY_THRESHOLD is not None
+
+    @property
+    def cache(self):
+        return caches[settings.SLOW_QUERY_LOG_CACHE_ALIAS]
+
+    @contextmanager
+    def capture(self, view: str):
+        """Watch the queries run on any database inside the block."""
+        if not self.enabled:
+            yield
+            return
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(self._wrapper(view))
+                )
+            yield
+
+    def _wrapper(self, view: str):
+        def wrapper(execute, sql, params, many, context):
+            if getattr(self._local, "explaining", False):
+                return execute(sql, params, many, context)
+            started = time.perf_counter()
+            result = execute(sql, params, many, context)
+            duration = (time.perf_counter() - started) * 1000
+            if duration >= settings.SLOW_QUERY_THRESHOLD and not many:
+                self.record(context["connection"], view, sql, params, duration)
+            return result
+
+        return wrapper
+
+    def record(self, connection, view, sql, params, duration) -> None:
+        plan = None
+        if (
+            connection.vendor == "postgresql"
+            and EXPLAINABLE.match(sql)
+            and self._random.random() < settings.SLOW_QUERY_EXPLAIN_RATE
+        ):
+            plan = self.explain(connection, sql, params)
+        scans = place_scans(plan) if plan else []
+        logger.warning(
+            "Slow query in %s took %.1f ms: %s %r%s",
+            view,
+            duration,
+            sql,
+            params,
+            "".join(f"\n  {node} {index or ''}" for node, index in scans),
+        )
+        self.append(
+            {
+                "time": time.time(),
+                "view": view,
+                "sql": sql,
+                "params": _jsonable(params),
+                "duration_ms": round(duration, 3),
+                "plan": plan,
+            }
+        )
+
+    def explain(self, connection, sql, params):
+        # The savepoint keeps a failing EXPLAIN from breaking the
+        # transaction. Neither of them is logged as a slow query.
+        self._local.explaining = True
+        try:
+            with transaction.atomic(using=connection.alias):
+                with connection.cursor() as cursor:
+                    cursor.execute(EXPLAIN_SQL.format(sql=sql), params)
+                    (plan,) = cursor.fetchone()
+        except DatabaseError:
+            logger.exception("Could not explain a slow query.")
+            return None
+        finally:
+            self._local.explaining = False
+        return json.loads(plan) if isinstance(plan, str) else plan
+
+    def append(self, entry: dict) -> None:
+        self.cache.add(COUNTER_KEY, 0, timeout=None)
+        try:
+            position = self.cache.incr(COUNTER_KEY)
+        except ValueError:
+            # The counter was evicted in between.
+            self.cache.set(COUNTER_KEY, 1, timeout=None)
+            position = 1
+        slot = (position - 1) % settings.SLOW_QUERY_LOG_SIZE
+        self.cache.set(f"{KEY_PREFIX}:{slot}", entry, timeout=None)
+
+    def entries(self) -> list:
+        """Kept entries, oldest first."""
+        keys = [
+            f"{KEY_PREFIX}:{slot}"
+            for slot in range(settings.SLOW_QUERY_LOG_SIZE)
+        ]
+        return sorted(
+            self.cache.get_many(keys).values(), key=lambda e: e["time"]
+        )
+
+    def clear(self) -> None:
+        self.cache.delete_many(
+            [COUNTER_KEY]
+            + [
+                f"{KEY_PREFIX}:{slot}"
+                for slot in range(settings.SLOW_QUERY_LOG_SIZE)
+            ]
+        )
+
+
+def summarize(entries: list) -> list:
+    """Entries grouped by view and statement, slowest first."""
+    groups = {}
+    for entry in entries:
+        group = groups.setdefault(
+            (entry["view"], entry["sql"]),
+            {
+                "view": entry["view"],
+                "sql": entry["sql"],
+                "count": 0,
+                "explained": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "seq_scans": 0,
+                "scans": set(),
+            },
+        )
+        group["count"] += 1
+        group["total_ms"] += entry["duration_ms"]
+        group["max_ms"] = max(group["max_ms"], entry["duration_ms"])
+        if entry["plan"] is None:
+            continue
+        group["explained"] += 1
+        scans = place_scans(entry["plan"])
+        if any(node == "Seq Scan" for node, _ in scans):
+            group["seq_scans"] += 1
+        group["scans"].update(
+            f"{node} using {index}" if index else node for node, index in scans
+        )
+    summary = []
+    for group in groups.values():
+        group["mean_ms"] = round(group.pop("total_ms") / group["count"], 3)
+        group["scans"] = sorted(group["scans"])
+        summary.append(group)
+    return sorted(summary, key=lambda group: -group["mean_ms"])
+
+
+slow_query_log = SlowQueryLog()
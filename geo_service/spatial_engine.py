@@ -0,0 +1,245 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.gis.measure import Distance as DistanceMeasure
+from django.db import connections, router
+
+from geo_service.metrics import (
+    SPATIAL_INDEX_BUILD_DURATION,
+    SPATIAL_INDEX_BYTES,
+    SPATIAL_INDEX_PLACES,
+)
+from geo_service.models import Place
+from geo_service.queries import iter_place_coordinates
+from geo_service.spatial_index import (
+    SPHEROID_MAX_RATIO,
+    SPHEROID_MIN_RATIO,
+    SpatialIndex,
+    spheroid_distance,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class SpatialIndexEngine:
+    """Process-wide :class:`SpatialIndex` of all places.
+
+    The index is built in a background thread and patched from model
+    signals. Until it is built, and whenever it may be out of date, it
+    reports itself as not ready and callers use the SQL path instead.
+
+    The index only holds ids and coordinates, so a lookup still loads the
+    places it found by primary key from the database the index was built
+    from, one query per lookup instead of a spatial search. Distances are
+    measured on the spheroid and radius queries filtered on it, like the
+    SQL path does. A place found in the index but gone from the database
+    is patched out and the lookup answered by SQL.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = None
+        self._stale = True
+        self._generation = 0
+        self._pending = None
+        self._alias = None
+        self.build_time = None
+        self.built_at = None
+
+    @property
+    def index(self):
+        return self._index
+
+    @property
+    def enabled(self) -> bool:
+        return settings.SPATIAL_INDEX_ENGINE
+
+    def is_ready(self) -> bool:
+        if not self.enabled:
+            return False
+        if (
+            self._index is None
+            or self._stale
+            or time.monotonic() - self.built_at
+            > settings.SPATIAL_INDEX_MAX_AGE
+        ):
+            self.rebuild_in_background()
+            return False
+        return True
+
+    def rebuild_in_background(self) -> None:
+        with self._lock:
+            if self._pending is not None:
+                return
+            self._pending = []
+        threading.Thread(target=self._rebuild_in_thread, daemon=True).start()
+
+    def _rebuild_in_thread(self) -> None:
+        try:
+            self.rebuild()
+        finally:
+            connections.close_all()
+
+    def rebuild(self) -> bool:
+        """Build the index now, False if that failed."""
+        with self._lock:
+            if self._pending is None:
+                self._pending = []
+            generation = self._generation
+        started = time.perf_counter()
+        # From the primary: a replica could be older than the patches
+        # recorded from here on.
+        alias = router.db_for_write(Place)
+        try:
+            index = SpatialIndex(iter_place_coordinates(using=alias))
+        except Exception:
+            logger.exception("Building the spatial index failed.")
+            with self._lock:
+                self._pending = None
+            return False
+
+        with self._lock:
+            # Changes committed while the snapshot was being read.
+            for patch in self._pending:
+                patch(index)
+            self._pending = None
+            self._index = index
+            self._alias = alias
+            self._stale = generation != self._generation
+            self.build_time = time.perf_counter() - started
+            self.built_at = time.monotonic()
+        logger.info(
+            "Spatial index built: %d places, %d bytes, %.3fs.",
+            len(index),
+            index.nbytes,
+            self.build_time,
+        )
+        SPATIAL_INDEX_PLACES.set(len(index))
+        SPATIAL_INDEX_BYTES.set(index.nbytes)
+        SPATIAL_INDEX_BUILD_DURATION.set(self.build_time)
+        return True
+
+    def _patch(self, patch) -> None:
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(patch)
+            if self._index is not None:
+                patch(self._index)
+                if self._index.patches > settings.SPATIAL_INDEX_MAX_PATCHES:
+                    self._stale = True
+
+    def update(self, pk: int, longitude: float, latitude: float) -> None:
+        self._patch(lambda index: index.update(pk, longitude, latitude))
+
+    def delete(self, pk: int) -> None:
+        self._patch(lambda index: index.delete(pk))
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._stale = True
+
+    def _load(self, pks: list):
+        places = Place.objects.using(self._alias).in_bulk(pks)
+        if len(places) == len(pks):
+            return places
+        # Deleted by another process, whose signals this one never got.
+        for pk in set(pks) - places.keys():
+            self.delete(pk)
+        return None
+
+    def nearest_places(self, point, k: int = 1, max_distance: float = None):
+        """Like :func:`~geo_service.queries.nearest_places`, or None when
+        the SQL path has to answer."""
+        limit = k
+        while True:
+            found = self._index.nearest(
+                point.x,
+                point.y,
+                limit,
+                max_distance / SPHEROID_MIN_RATIO
+                if max_distance is not None
+                else None,
+            )
+            places = self._load([pk for pk, _ in found])
+            if places is None:
+                return None
+            nearest = []
+            for pk, _ in found:
+                place = places[pk]
+                distance = spheroid_distance(
+                    point.x, point.y, place.geom.x, place.geom.y
+                )
+                if max_distance is None or distance <= max_distance:
+                    place.distance = DistanceMeasure(m=distance)
+                    nearest.append(place)
+            if len(nearest) >= k or len(found) < limit:
+                return nearest[:k]
+            # Some were only within the distance on the sphere.
+            limit *= 2
+
+    def places_within(
+        self,
+        longitude: float,
+        latitude: float,
+        distance: float,
+        after: tuple = (-1.0, 0),
+        limit: int = 100,
+    ):
+        """Like :func:`~geo_service.queries.places_within`, or None when
+        the SQL path has to answer."""
+        # Nearest first on the sphere, which bounds the distance on the
+        # spheroid, so only about a page of places is loaded.
+        found = [
+            (pk, sphere_distance)
+            for pk, sphere_distance in self._index.within(
+                longitude, latitude, distance / SPHEROID_MIN_RATIO
+            )
+            if sphere_distance * SPHEROID_MAX_RATIO >= after[0]
+        ]
+        rows = []
+        for start in range(0, len(found), limit):
+            if (
+                len(rows) >= limit
+                and found[start][1] * SPHEROID_MIN_RATIO
+                > rows[limit - 1]["distance"]
+            ):
+                break
+            batch = [pk for pk, _ in found[start : start + limit]]
+            places = self._load(batch)
+            if places is None:
+                return None
+            for pk in batch:
+                place = places[pk]
+                place_distance = spheroid_distance(
+                    longitude, latitude, place.geom.x, place.geom.y
+                )
+                if place_distance <= distance and (place_distance, pk) > after:
+                    rows.append(
+                        {
+                            "id": pk,
+                            "name": place.name,
+                            "description": place.description,
+                            "latitude": place.geom.y,
+                            "longitude": place.geom.x,
+                            "distance": place_distance,
+                        }
+                    )
+            rows.sort(key=lambda row: (row["distance"], row["id"]))
+        return rows[:limit]
+
+    def stats(self) -> dict:
+        index = self._index
+        return {
+            "enabled": self.enabled,
+            "ready": index is not None and not self._stale,
+            "places": len(index) if index is not None else 0,
+            "patches": index.patches if index is not None else 0,
+            "nbytes": index.nbytes if index is not None else 0,
+            "build_time": self.build_time,
+        }
+
+
+spatial_engine = SpatialIndexEngine()
@@ -0,0 +1,312 @@
+import heapq
+import math
+from array import array
+
+EARTH_RADIUS = 6_371_008.8
+
+# WGS84, which PostGIS measures geography distances on.
+SPHEROID_A = 6_378_137.0
+SPHEROID_F = 1 / 298.257223563
+SPHEROID_B = SPHEROID_A * (1 - SPHEROID_F)
+
+# Bounds of the ratio between the distance on the spheroid and on the
+# sphere of EARTH_RADIUS, with some room for rounding.
+SPHEROID_MIN_RATIO = 0.994
+SPHEROID_MAX_RATIO = 1.005
+
+# Below this size a subtree is scanned linearly, which is cheaper in Python
+# than descending further.
+LEAF_SIZE = 8
+
+
+def to_unit_vector(longitude: float, latitude: float) -> tuple:
+    longitude = math.radians(longitude)
+    latitude = math.radians(latitude)
+    cos_latitude = math.cos(latitude)
+    return (
+        cos_latitude * math.cos(longitude),
+        cos_latitude * math.sin(longitude),
+        math.sin(latitude),
+    )
+
+
+def chord_to_distance(chord: float) -> float:
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, chord / 2))
+
+
+def distance_to_chord(distance: float) -> float:
+    return 2 * math.sin(min(distance / EARTH_RADIUS, math.pi) / 2)
+
+
+def spheroid_distance(
+    longitude1: float, latitude1: float, longitude2: float, latitude2: float
+) -> float:
+    """Geodesic distance in meters on WGS84, as ``ST_Distance`` measures
+    geography, by Vincenty's inverse formula.
+
+    Nearly antipodal points, where the iteration does not converge, get
+    their great-circle distance.
+    """
+    a, b, f = SPHEROID_A, SPHEROID_B, SPHEROID_F
+    u1 = math.atan((1 - f) * math.tan(math.radians(latitude1)))
+    u2 = math.atan((1 - f) * math.tan(math.radians(latitude2)))
+    sin_u1, cos_u1 = math.sin(u1), math.cos(u1)
+    sin_u2, cos_u2 = math.sin(u2), math.cos(u2)
+    delta = math.radians(longitude2 - longitude1)
+    lam = delta
+    for _ in range(100):
+        sin_lam, cos_lam = math.sin(lam), math.cos(lam)
+        sin_sigma = math.hypot(
+            cos_u2 * sin_lam, cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam
+        )
+        if sin_sigma == 0:
+            return 0.0
+        cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lam
+        sigma = math.atan2(sin_sigma, cos_sigma)
+        sin_alpha = cos_u1 * cos_u2 * sin_lam / sin_sigma
+        cos2_alpha = 1 - sin_alpha * sin_alpha
+        cos_2sigma_m = (
+            cos_sigma - 2 * sin_u1 * sin_u2 / cos2_alpha if cos2_alpha else 0.0
+        )
+        c = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+        previous = lam
+        lam = delta + (1 - c) * f * sin_alpha * (
+            sigma
+            + c
+            * sin_sigma
+            * (
+                cos_2sigma_m
+                + c * cos_sigma * (2 * cos_2sigma_m * cos_2sigma_m - 1)
+            )
+        )
+        if abs(lam - previous) < 1e-12:
+            break
+    else:
+        return chord_to_distance(
+            math.dist(
+                to_unit_vector(longitude1, latitude1),
+                to_unit_vector(longitude2, latitude2),
+            )
+        )
+    u_sq = cos2_alpha * (a * a - b * b) / (b * b)
+    big_a = 1 + u_sq / 16384 * (
+        4096 + u_sq * (-768 + u_sq * (320 - 175 * u_sq))
+    )
+    big_b = u_sq / 1024 * (256 + u_sq * (-128 + u_sq * (74 - 47 * u_sq)))
+    delta_sigma = (
+        big_b
+        * sin_sigma
+        * (
+            cos_2sigma_m
+            + big_b
+            / 4
+            * (
+                cos_sigma * (2 * cos_2sigma_m * cos_2sigma_m - 1)
+                - big_b
+                / 6
+                * cos_2sigma_m
+                * (4 * sin_sigma * sin_sigma - 3)
+                * (4 * cos_2sigma_m * cos_2sigma_m - 3)
+            )
+        )
+    )
+    return b * big_a * (sigma - delta_sigma)
+
+
+class KDTree:
+    """Static 3-d tree over unit-sphere coordinates.
+
+    The points are stored in flat arrays ordered so that the tree is
+    implicit: the node of the range ``[lo, hi)`` is its middle element,
+    split on the axis ``depth % 3``. Straight-line (chord) distances on the
+    unit sphere rank points exactly like great-circle distances.
+    """
+
+    def __init__(self, ids, xs, ys, zs):
+        order = list(range(len(ids)))
+        coordinates = (xs, ys, zs)
+        stack = [(0, len(order), 0)]
+        while stack:
+            lo, hi, depth = stack.pop()
+            if hi - lo <= LEAF_SIZE:
+                continue
+            order[lo:hi] = sorted(
+                order[lo:hi], key=coordinates[depth % 3].__getitem__
+            )
+            mid = (lo + hi) // 2
+            stack.append((lo, mid, depth + 1))
+            stack.append((mid + 1, hi, depth + 1))
+
+        self.ids = array("q", (ids[i] for i in order))
+        self.xs = array("d", (xs[i] for i in order))
+        self.ys = array("d", (ys[i] for i in order))
+        self.zs = array("d", (zs[i] for i in order))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            column.itemsize * len(column)
+            for column in (self.ids, self.xs, self.ys, self.zs)
+        )
+
+    def _search(self, point: tuple, limit: float, visit):
+        # ``visit`` receives (squared chord, position) of every candidate
+        # closer than the current limit and returns the new limit.
+        ids, xs, ys, zs = self.ids, self.xs, self.ys, self.zs
+        coordinates = (xs, ys, zs)
+        x, y, z = point
+        stack = [(0, len(ids), 0, 0.0)]
+        while stack:
+            lo, hi, depth, bound = stack.pop()
+            if bound > limit:
+                continue
+            if hi - lo <= LEAF_SIZE:
+                for position in range(lo, hi):
+                    dx = xs[position] - x
+                    dy = ys[position] - y
+                    dz = zs[position] - z
+                    chord2 = dx * dx + dy * dy + dz * dz
+                    if chord2 <= limit:
+                        limit = visit(chord2, position)
+                continue
+            mid = (lo + hi) // 2
+            dx = xs[mid] - x
+            dy = ys[mid] - y
+            dz = zs[mid] - z
+            chord2 = dx * dx + dy * dy + dz * dz
+            if chord2 <= limit:
+                limit = visit(chord2, mid)
+            diff = point[depth % 3] - coordinates[depth % 3][mid]
+            if diff < 0:
+                near, far = (lo, mid), (mid + 1, hi)
+            else:
+                near, far = (mid + 1, hi), (lo, mid)
+            stack.append((*far, depth + 1, diff * diff))
+            stack.append((*near, depth + 1, bound))
+
+    def nearest(
+        self, point: tuple, k: int, max_chord: float, skip=frozenset()
+    ) -> list:
+        """The ``k`` nearest points within ``max_chord``, leaving out the
+        ids in ``skip`` as they are met, so they never take the place of
+        one of the k."""
+        heap = []
+        limit = max_chord * max_chord
+
+        def visit(chord2, position):
+            pk = self.ids[position]
+            if pk not in skip:
+                item = (-chord2, -pk)
+                if len(heap) < k:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+            return -heap[0][0] if len(heap) == k else limit
+
+        self._search(point, limit, visit)
+        return [(-pk, math.sqrt(-chord2)) for chord2, pk in heap]
+
+    def within(self, point: tuple, max_chord: float, skip=frozenset()) -> list:
+        found = []
+        limit = max_chord * max_chord
+
+        def visit(chord2, position):
+            pk = self.ids[position]
+            if pk not in skip:
+                found.append((pk, math.sqrt(chord2)))
+            return limit
+
+        self._search(point, limit, visit)
+        return found
+
+
+class SpatialIndex:
+    """Nearest and radius queries over places, answered in memory.
+
+    A :class:`KDTree` holds the snapshot the index was built from. Later
+    changes are patched into a small overlay: moved or deleted ids are
+    skipped while the tree is searched and new positions are scanned
+    linearly, on every query, so the owner rebuilds after a few hundred
+    patches.
+    """
+
+    def __init__(self, rows):
+        ids, xs, ys, zs = array("q"), array("d"), array("d"), array("d")
+        for pk, longitude, latitude in rows:
+            x, y, z = to_unit_vector(longitude, latitude)
+            ids.append(pk)
+            xs.append(x)
+            ys.append(y)
+            zs.append(z)
+        self.tree = KDTree(ids, xs, ys, zs)
+        self.masked = set()
+        self.overlay = {}
+
+    def __len__(self) -> int:
+        return len(self.tree) - len(self.masked) + len(self.overlay)
+
+    @property
+    def patches(self) -> int:
+        return len(self.masked) + len(self.overlay)
+
+    @property
+    def nbytes(self) -> int:
+        return self.tree.nbytes + 64 * self.patches
+
+    def update(self, pk: int, longitude: float, latitude: float) -> None:
+        self.masked.add(pk)
+        self.overlay[pk] = to_unit_vector(longitude, latitude)
+
+    def delete(self, pk: int) -> None:
+        self.masked.add(pk)
+        self.overlay.pop(pk, None)
+
+    def _overlay_chords(self, point: tuple):
+        x, y, z = point
+        for pk, (px, py, pz) in self.overlay.items():
+            yield pk, math.sqrt((px - x) ** 2 + (py - y) ** 2 + (pz - z) ** 2)
+
+    def nearest(
+        self,
+        longitude: float,
+        latitude: float,
+        k: int = 1,
+        max_distance: float = None,
+    ) -> list:
+        point = to_unit_vector(longitude, latitude)
+        max_chord = (
+            distance_to_chord(max_distance) if max_distance is not None else 2
+        )
+        found = [
+            (chord, pk)
+            for pk, chord in self.tree.nearest(
+                point, k, max_chord, self.masked
+            )
+        ]
+        found.extend(
+            (chord, pk)
+            for pk, chord in self._overlay_chords(point)
+            if chord <= max_chord
+        )
+        return [
+            (pk, chord_to_distance(chord)) for chord, pk in sorted(found)[:k]
+        ]
+
+    def within(
+        self, longitude: float, latitude: float, distance: float
+    ) -> list:
+        point = to_unit_vector(longitude, latitude)
+        max_chord = distance_to_chord(distance)
+        found = [
+            (chord, pk)
+            for pk, chord in self.tree.within(point, max_chord, self.masked)
+        ]
+        found.extend(
+            (chord, pk)
+            for pk, chord in self._overlay_chords(point)
+            if chord <= max_chord
+        )
+        return [(pk, chord_to_distance(chord)) for chord, pk in sorted(found)]
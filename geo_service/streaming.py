@@ -0,0 +1,70 @@
+import json
+
+from django.conf import settings
+
+from geo_service.serializers import place_list_row
+
+# Rows are written out in pieces of roughly this many bytes.
+STREAM_BUFFER_SIZE = 64 * 1024
+
+
+def _rows(queryset):
+    # ``iterator`` reads through a server-side cursor on PostgreSQL, so only
+    # one chunk of places is held in memory at a time.
+    for row in queryset.list_values().iterator(
+        chunk_size=settings.PLACE_STREAM_CHUNK_SIZE
+    ):
+        yield place_list_row(row)
+
+
+def _buffered(pieces):
+    buffer = []
+    length = 0
+    for piece in pieces:
+        piece = piece.encode()
+        buffer.append(piece)
+        length += len(piece)
+        if length >= STREAM_BUFFER_SIZE:
+            yield b"".join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def _feature(row: dict) -> dict:
+    return {
+        "type": "Feature",
+        "id": row["id"],
+        "geometry": {
+            "type": "Point",
+            "coordinates": [row["longitude"], row["latitude"]],
+        },
+        "properties": {
+            key: value
+            for key, value in row.items()
+            if key not in ("id", "latitude", "longitude")
+        },
+    }
+
+
+def stream_ndjson(queryset):
+    return _buffered(json.dumps(row) + "\n" for row in _rows(queryset))
+
+
+def stream_geojson(queryset):
+    def pieces():
+        yield '{"type": "FeatureCollection", "features": ['
+        separator = ""
+        for row in _rows(queryset):
+            yield separator + json.dumps(_feature(row))
+            separator = ", "
+        yield "]}\n"
+
+    return _buffered(pieces())
+
+
+STREAM_FORMATS = {
+    "ndjson": ("application/x-ndjson", stream_ndjson),
+    "geojson": ("application/geo+json", stream_geojson),
+}
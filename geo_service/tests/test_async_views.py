@@ -0,0 +1,102 @@
+from urllib.parse import parse_qs, urlparse
+
+from django.contrib.gis.geos import Point
+from django.test import TransactionTestCase
+from django.urls import reverse
+from rest_framework import status
+
+from geo_service import db
+from geo_service.db import close_async_pools
+from geo_service.models import Place
+
+
+class AsyncViewsTestCase(TransactionTestCase):
+    # The async views read through their own connection pool, so the data
+    # has to be committed.
+    def setUp(self):
+        self.place1 = Place.objects.create(
+            name="Place 1",
+            description="Description 1",
+            geom=Point(49.5883, 34.5514),
+        )
+        self.place2 = Place.objects.create(
+            name="Place 2",
+            description="Description 2",
+            geom=Point(49.5870, 34.5514),
+        )
+
+    async def get(self, url, params=None):
+        try:
+            return await self.async_client.get(url, params or {})
+        finally:
+            await close_async_pools()
+
+    async def test_get_nearest_point(self):
+        url = reverse("geoservice-async:place-get-nearest-point")
+        params = {"latitude": 49.5863, "longitude": 34.5514}
+        response = await self.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["name"], self.place2.name)
+
+    async def test_get_nearest_point_with_invalid_data(self):
+        url = reverse("geoservice-async:place-get-nearest-point")
+        response = await self.get(url, {"latitude": "a", "longitude": "b"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_retrieve_matches_sync_view(self):
+        url = reverse("geoservice-async:place-detail", args=[self.place1.id])
+        response = await self.get(url)
+        sync_response = await self.async_client.get(
+            reverse("geoservice:place-detail", args=[self.place1.id])
+        )
+        self.assertEqual(response.content, sync_response.content)
+
+    async def test_list(self):
+        url = reverse("geoservice-async:place-list")
+        response = await self.get(url, {"page_size": 1})
+        self.assertEqual(
+            [place["id"] for place in response.json()["results"]],
+            [self.place1.id],
+        )
+        response = await self.get(response.json()["next"])
+        self.assertEqual(
+            [place["id"] for place in response.json()["results"]],
+            [self.place2.id],
+        )
+        self.assertIsNone(response.json()["next"])
+        response = await self.get(response.json()["previous"])
+        self.assertEqual(
+            [place["id"] for place in response.json()["results"]],
+            [self.place1.id],
+        )
+
+    async def test_list_cursors_work_on_the_sync_list(self):
+        url = reverse("geoservice-async:place-list")
+        response = await self.get(url, {"page_size": 1})
+        sync_url = reverse("geoservice:place-list")
+        sync_response = await self.async_client.get(sync_url, {"page_size": 1})
+        self.assertEqual(
+            response.json()["results"], sync_response.json()["results"]
+        )
+        cursor = parse_qs(urlparse(response.json()["next"]).query)["cursor"]
+        sync_cursor = parse_qs(urlparse(sync_response.json()["next"]).query)[
+            "cursor"
+        ]
+        self.assertEqual(cursor, sync_cursor)
+        sync_response = await self.async_client.get(
+            sync_url, {"page_size": 1, "cursor": cursor[0]}
+        )
+        self.assertEqual(
+            [place["id"] for place in sync_response.json()["results"]],
+            [self.place2.id],
+        )
+
+    async def test_pools_only_on_a_server_loop(self):
+        url = reverse("geoservice-async:place-detail", args=[self.place1.id])
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(db._pools, {})
+
+        db.pool_connections()
+        await self.get(url)
+        self.assertEqual(db._pools, {})
@@ -0,0 +1,51 @@
+import json
+
+from django.test import SimpleTestCase
+
+from geo_service.benchmark import (
+    NDJSONStream,
+    PlaceGenerator,
+    compare,
+    percentile,
+    summarize,
+)
+
+
+class PlaceGeneratorTests(SimpleTestCase):
+    def test_is_reproducible(self):
+        first = list(PlaceGenerator(seed=1).places(100))
+        second = list(PlaceGenerator(seed=1).places(100))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, list(PlaceGenerator(seed=2).places(100)))
+
+    def test_coordinates_are_valid(self):
+        for place in PlaceGenerator(seed=1, clusters=10).places(1000):
+            self.assertTrue(-180 <= place["longitude"] <= 180)
+            self.assertTrue(-90 <= place["latitude"] <= 90)
+
+    def test_ndjson_stream(self):
+        places = list(PlaceGenerator(seed=1).places(10))
+        stream = NDJSONStream(iter(places))
+        text = "".join(iter(lambda: stream.read(7), ""))
+        self.assertEqual(
+            [json.loads(line) for line in text.splitlines()], places
+        )
+
+
+class ReportTests(SimpleTestCase):
+    def test_percentile(self):
+        values = [1.0, 2.0, 3.0, 4.0, 5.0]
+        self.assertEqual(percentile(values, 0.5), 3.0)
+        self.assertEqual(percentile(values, 0.95), 4.8)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    def test_compare_flags_regressions(self):
+        baseline = {"scenarios": {"nearest": summarize([0.01] * 10, 0, 1)}}
+        current = {"scenarios": {"nearest": summarize([0.02] * 5, 0, 1)}}
+        regressed = {
+            metric
+            for _, metric, *_, flag in compare(baseline, current)
+            if flag
+        }
+        self.assertEqual(regressed, {"throughput", "p50", "p95", "p99"})
+        self.assertFalse(any(row[-1] for row in compare(baseline, baseline)))
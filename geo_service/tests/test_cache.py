@@ -0,0 +1,98 @@
+from django.conf import settings
+from django.contrib.gis.db.models.functions import Distance
+from django.contrib.gis.geos import Point
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from geo_service import geohash
+from geo_service.cache import LRUCacheBackend, nearest_point_cache
+from geo_service.models import Place
+
+
+class GeohashTests(SimpleTestCase):
+    def test_encode(self):
+        self.assertEqual(geohash.encode(-5.6, 42.6, 5), "ezs42")
+        self.assertEqual(geohash.encode(10.40744, 57.64911, 11), "u4pruydqqvj")
+
+    def test_center_is_inside_cell(self):
+        cell = geohash.encode(24.7097, 48.9226, 7)
+        self.assertEqual(geohash.encode(*geohash.center(cell), 7), cell)
+
+    def test_covering(self):
+        cells = geohash.covering(34.0, 49.0, 35.0, 50.0, 4)
+        self.assertIn(geohash.encode(34.5514, 49.5883, 4), cells)
+        self.assertNotIn(geohash.encode(24.7097, 48.9226, 4), cells)
+
+
+class LRUCacheBackendTests(SimpleTestCase):
+    def test_evicts_least_recently_used(self):
+        backend = LRUCacheBackend(max_entries=2, timeout=60)
+        backend.set_many({"a": 1, "b": 2})
+        backend.get_many(["a"])
+        backend.set_many({"c": 3})
+        self.assertEqual(backend.get_many(["a", "b", "c"]), {"a": 1, "c": 3})
+
+    def test_add_keeps_existing_value(self):
+        backend = LRUCacheBackend(max_entries=2, timeout=60)
+        backend.add("a", 1)
+        backend.add("a", 2)
+        self.assertEqual(backend.get_many(["a"]), {"a": 1})
+
+    def test_entries_expire(self):
+        backend = LRUCacheBackend(max_entries=2, timeout=0)
+        backend.set_many({"a": 1})
+        self.assertEqual(backend.get_many(["a"]), {})
+
+
+@override_settings(NEAREST_POINT_CACHE_BACKEND="lru")
+class NearestPointCacheTests(APITestCase):
+    def setUp(self):
+        self.place = Place.objects.create(
+            name="Place 1",
+            description="Description 1",
+            geom=Point(34.5514, 49.5883),
+        )
+        self.url = reverse("geoservice:place-get-nearest-point")
+        self.params = {"latitude": 49.5863, "longitude": 34.5514}
+        nearest_point_cache.invalidate_all()
+
+    def test_repeated_lookup_is_cached(self):
+        miss = self.client.get(self.url, self.params)
+        self.assertEqual(miss["X-Cache"], "MISS")
+        hit = self.client.get(self.url, self.params)
+        self.assertEqual(hit["X-Cache"], "HIT")
+        self.assertEqual(hit.data["name"], self.place.name)
+        self.assertEqual(hit.content, miss.content)
+
+    def test_write_nearby_invalidates(self):
+        self.client.get(self.url, self.params)
+        with self.captureOnCommitCallbacks(execute=True):
+            place = Place.objects.create(
+                name="Place 2",
+                description="Description 2",
+                geom=Point(34.5514, 49.5864),
+            )
+        response = self.client.get(self.url, self.params)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["name"], place.name)
+
+    def test_hit_is_measured_from_the_point_looked_up(self):
+        self.client.get(self.url, self.params)
+        cell = geohash.encode(
+            self.params["longitude"],
+            self.params["latitude"],
+            settings.NEAREST_POINT_CACHE_PRECISION,
+        )
+        longitude, latitude = geohash.center(cell)
+        response = self.client.get(
+            self.url, {"latitude": latitude, "longitude": longitude}
+        )
+        self.assertEqual(response["X-Cache"], "HIT")
+        expected = Place.objects.annotate(
+            distance=Distance("geom", Point(longitude, latitude, srid=4326))
+        ).get(pk=self.place.pk)
+        self.assertAlmostEqual(
+            response.data["distance"], expected.distance.m, delta=0.001
+        )
@@ -0,0 +1,82 @@
+import csv
+import io
+import json
+import tempfile
+
+from django.contrib.gis.geos import Point
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from geo_service.exports import PGCOPY_HEADER, PGCOPY_TRAILER
+from geo_service.models import Place
+
+
+def export_url(export_format):
+    return reverse("geoservice:place-export", args=[export_format])
+
+
+@override_settings(PLACE_EXPORT_CHUNK_SIZE=1)
+class ExportTests(TestCase):
+    def setUp(self):
+        self.places = [
+            Place.objects.create(
+                name=f"Place {number}",
+                description='Say "hi",\nthen \\ leave',
+                geom=Point(34.5514 + number, 49.5883, srid=4326),
+            )
+            for number in range(3)
+        ]
+
+    def content(self, export_format):
+        response = self.client.get(export_url(export_format))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b"".join(response.streaming_content)
+
+    def test_csv(self):
+        rows = list(csv.DictReader(io.StringIO(self.content("csv").decode())))
+        self.assertEqual(
+            [int(row["id"]) for row in rows],
+            [place.id for place in self.places],
+        )
+        self.assertEqual(rows[0]["description"], self.places[0].description)
+        self.assertEqual(float(rows[1]["longitude"]), 35.5514)
+
+    def test_csv_over_sparse_ids(self):
+        self.places[1].delete()
+        rows = list(csv.DictReader(io.StringIO(self.content("csv").decode())))
+        self.assertEqual(
+            [int(row["id"]) for row in rows],
+            [self.places[0].id, self.places[2].id],
+        )
+
+    def test_geojson_sequence(self):
+        records = self.content("geojsonseq").decode().split("\x1e")
+        self.assertEqual(records[0], "")
+        features = [json.loads(record) for record in records[1:]]
+        self.assertEqual(len(features), 3)
+        self.assertEqual(
+            features[0]["properties"]["description"],
+            self.places[0].description,
+        )
+        self.assertEqual(
+            features[2]["geometry"]["coordinates"], [36.5514, 49.5883]
+        )
+
+    def test_pgcopy_is_framed_once(self):
+        content = self.content("pgcopy")
+        self.assertTrue(content.startswith(PGCOPY_HEADER))
+        self.assertTrue(content.endswith(PGCOPY_TRAILER))
+        self.assertEqual(content.count(PGCOPY_HEADER), 1)
+
+    def test_unknown_format(self):
+        response = self.client.get(export_url("xml"))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile(suffix=".csv") as file:
+            call_command(
+                "export_places", "csv", file.name, stderr=io.StringIO()
+            )
+            self.assertEqual(len(file.read().decode().splitlines()), 1 + 3 * 2)
@@ -0,0 +1,134 @@
+import io
+import json
+
+from django.contrib.gis.geos import Point
+from django.db.backends.postgresql.psycopg_any import is_psycopg3
+from django.test import SimpleTestCase, TestCase
+
+from geo_service.importers import (
+    PlaceImportError,
+    RowError,
+    detect_format,
+    import_places,
+    read_geojson,
+)
+from geo_service.models import Place
+
+
+def feature(longitude, latitude, name="Place"):
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [longitude, latitude]},
+        "properties": {"name": name, "description": "Description"},
+    }
+
+
+class ReaderTests(SimpleTestCase):
+    def test_detect_format(self):
+        self.assertEqual(detect_format("places.jsonl"), "ndjson")
+        self.assertEqual(detect_format("places.geojson"), "geojson")
+        self.assertEqual(detect_format("places.CSV"), "csv")
+        with self.assertRaises(PlaceImportError):
+            detect_format("places.xml")
+
+    def test_read_geojson_feature_collection(self):
+        collection = {
+            "type": "FeatureCollection",
+            "features": [feature(34.5514, 49.5883), {"type": "Point"}],
+        }
+        rows = list(read_geojson(io.StringIO(json.dumps(collection))))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0][1]["longitude"], 34.5514)
+        self.assertEqual(rows[0][1]["latitude"], 49.5883)
+        self.assertIsInstance(rows[1][1], RowError)
+
+    def test_read_geojson_text_sequence(self):
+        stream = io.StringIO(
+            "\x1e" + json.dumps(feature(34.5514, 49.5883)) + "\n"
+        )
+        rows = list(read_geojson(stream))
+        self.assertEqual(rows[0][1]["name"], "Place")
+
+
+class ImportPlacesTests(TestCase):
+    def test_import_ndjson(self):
+        Place.objects.create(
+            name="Existing",
+            description="Existing place",
+            geom=Point(34.5514, 49.5883),
+        )
+        stream = io.StringIO(
+            "\n".join(
+                [
+                    json.dumps(
+                        {
+                            "name": "Poltava",
+                            "description": "Poltava",
+                            "latitude": 49.5883,
+                            "longitude": 34.5514,
+                        }
+                    ),
+                    json.dumps(
+                        {
+                            "name": "Ivano-Frankivsk",
+                            "description": "Ivano-Frankivsk",
+                            "latitude": 48.9226,
+                            "longitude": 24.7097,
+                        }
+                    ),
+                    json.dumps({"name": "No coordinates"}),
+                ]
+            )
+        )
+        report = import_places(stream, "ndjson")
+        self.assertEqual(report.total, 3)
+        self.assertEqual(report.imported, 1)
+        self.assertEqual(report.duplicates, 1)
+        self.assertEqual(report.rejected, 1)
+        self.assertEqual(report.rejects[0]["line"], 3)
+        self.assertTrue(Place.objects.filter(name="Ivano-Frankivsk").exists())
+
+    def test_nul_characters_are_rejected_per_row(self):
+        stream = io.StringIO(
+            "\n".join(
+                json.dumps(
+                    {
+                        "name": name,
+                        "description": "Description",
+                        "latitude": 49.5883,
+                        "longitude": longitude,
+                    }
+                )
+                for name, longitude in [
+                    ("Pol\x00tava", 34.5514),
+                    ("Lviv", 24.0),
+                ]
+            )
+        )
+        report = import_places(stream, "ndjson")
+        self.assertEqual(report.imported, 1)
+        self.assertEqual(report.rejected, 1)
+        self.assertEqual(report.rejects[0]["line"], 1)
+
+    def test_copy_through_the_database_driver(self):
+        # psycopg 3 is the driver Django loads, and its COPY has to keep
+        # what text format COPY escapes.
+        self.assertTrue(is_psycopg3)
+        name = "Tab\tnew\nline \\N back\\slash"
+        stream = io.StringIO(
+            json.dumps(
+                {
+                    "name": name,
+                    "description": "Ünïcode\r\n",
+                    "latitude": 49.5883,
+                    "longitude": 34.5514,
+                }
+            )
+        )
+        report = import_places(stream, "ndjson")
+        self.assertEqual(report.imported, 1)
+        place = Place.objects.get()
+        self.assertEqual(place.name, name)
+        self.assertEqual(place.description, "Ünïcode\r\n")
+        self.assertAlmostEqual(place.geom.x, 34.5514, places=6)
+        self.assertAlmostEqual(place.geom.y, 49.5883, places=6)
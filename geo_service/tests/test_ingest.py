@@ -0,0 +1,73 @@
+from unittest import mock
+
+from django.contrib.gis.geos import Point
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from geo_service.ingest import IngestQueue, IngestQueueFull
+from geo_service.models import DUPLICATE_COORDINATES_MESSAGE, Place
+
+
+class IngestQueueTests(TestCase):
+    def setUp(self):
+        self.queue = IngestQueue(worker=False)
+        self.existing = Place.objects.create(
+            name="Existing", description="", geom=Point(30.5, 50.4)
+        )
+
+    def submit(self, name, longitude, latitude, on_conflict="error"):
+        place = Place(
+            name=name, description="", geom=Point(longitude, latitude)
+        )
+        return self.queue.submit(place, on_conflict)
+
+    def test_drain_writes_a_batch(self):
+        first = self.submit("First", 24.0, 49.8)
+        second = self.submit("Second", 24.0, 49.8)
+        duplicate = self.submit("Duplicate", 30.5, 50.4)
+        skipped = self.submit("Skipped", 30.5, 50.4, "skip")
+        updated = self.submit("Updated", 30.5, 50.4, "update")
+        self.assertEqual(self.queue.status(first), {"status": "queued"})
+
+        with self.assertNumQueries(4):
+            self.queue.drain()
+
+        place = Place.objects.get(name="First")
+        self.assertEqual(
+            self.queue.status(first),
+            {"status": "written", "place_id": place.id},
+        )
+        for ack in [second, duplicate]:
+            self.assertEqual(
+                self.queue.status(ack),
+                {"status": "failed", "error": DUPLICATE_COORDINATES_MESSAGE},
+            )
+        for ack in [skipped, updated]:
+            self.assertEqual(
+                self.queue.status(ack),
+                {"status": "written", "place_id": self.existing.id},
+            )
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, "Updated")
+
+
+@override_settings(PLACE_INGEST_QUEUE_SIZE=1)
+class IngestQueueFullTests(SimpleTestCase):
+    def test_submit_to_a_full_queue(self):
+        queue = IngestQueue(worker=False)
+        place = Place(name="Place", description="", geom=Point(0, 0))
+        queue.submit(place, "error")
+        with self.assertRaises(IngestQueueFull):
+            queue.submit(place, "error")
+        self.assertEqual(queue.queue.qsize(), 1)
+
+    def test_failed_batch_is_reported(self):
+        queue = IngestQueue(worker=False)
+        place = Place(name="Place", description="", geom=Point(0, 0))
+        ack = queue.submit(place, "error")
+        with mock.patch.object(
+            Place.objects, "upsert", side_effect=KeyError("geom")
+        ):
+            queue.drain()
+        self.assertEqual(
+            queue.status(ack), {"status": "failed", "error": "'geom'"}
+        )
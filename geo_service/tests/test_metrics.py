@@ -0,0 +1,102 @@
+from django.test import SimpleTestCase
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from rest_framework import status
+
+from geo_service.metrics import (
+    RequestMetrics,
+    count_query,
+    current_metrics,
+    finish_request,
+    measure,
+    start_request,
+)
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class RequestMetricsTests(SimpleTestCase):
+    def test_stages_are_collected_during_a_request_only(self):
+        with measure("transform"):
+            pass
+        metrics, token = start_request()
+        try:
+            self.assertIs(current_metrics(), metrics)
+            with measure("transform"):
+                pass
+            result = count_query(
+                lambda *args: "rows", "SELECT 1", None, False, {}
+            )
+        finally:
+            finish_request(token)
+        self.assertIsNone(current_metrics())
+        self.assertEqual(result, "rows")
+        self.assertEqual(metrics.queries, 1)
+        self.assertGreater(metrics.transform, 0)
+        self.assertGreater(metrics.sql, 0)
+
+    def test_unknown_methods_share_a_label(self):
+        before = sample(
+            "geo_request_duration_seconds_count", view="test", method="other"
+        )
+        for method in ["FOO", "BAR"]:
+            RequestMetrics().observe("test", method, 405, 0.0)
+        self.assertEqual(
+            sample(
+                "geo_request_duration_seconds_count",
+                view="test",
+                method="other",
+            ),
+            before + 2,
+        )
+        self.assertEqual(
+            sample(
+                "geo_request_duration_seconds_count", view="test", method="FOO"
+            ),
+            0,
+        )
+
+
+class MetricsEndpointTests(SimpleTestCase):
+    def test_requests_are_exposed_per_view(self):
+        view = "geoservice:place-get-nearest-point"
+        before = sample(
+            "geo_request_duration_seconds_count", view=view, method="GET"
+        )
+        serialization = sample(
+            "geo_request_serialization_duration_seconds_sum", view=view
+        )
+        self.client.get(reverse(view))
+
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn(b"geo_request_sql_queries_bucket", response.content)
+        self.assertEqual(
+            sample(
+                "geo_request_duration_seconds_count", view=view, method="GET"
+            ),
+            before + 1,
+        )
+        self.assertGreater(
+            sample(
+                "geo_request_serialization_duration_seconds_sum", view=view
+            ),
+            serialization,
+        )
+
+    async def test_async_views_are_measured(self):
+        view = "geoservice-async:place-get-nearest-point"
+        before = sample(
+            "geo_request_duration_seconds_count", view=view, method="GET"
+        )
+        response = await self.async_client.get(reverse(view))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            sample(
+                "geo_request_duration_seconds_count", view=view, method="GET"
+            ),
+            before + 1,
+        )
@@ -1,6 +1,9 @@
 from django.contrib.gis.geos import Point
+from django.db import IntegrityError
 from django.test import TestCase
-from geo_service.models import Place
+from rest_framework.exceptions import ValidationError
+
+from geo_service.models import OnConflict, Place
 
 
 class PlaceModelTests(TestCase):
@@ -11,3 +14,93 @@ class PlaceModelTests(TestCase):
             geom=Point(34.5514, 49.5883),
         )
         self.assertEqual(str(place), "Test Place")
+
+    def test_place_with_same_coordinates(self):
+        Place.objects.create(
+            name="Test Place",
+            description="This is a test place",
+            geom=Point(34.5514, 49.5883),
+        )
+        with self.assertRaises(ValidationError):
+            Place.objects.create(
+                name="Another Place",
+                description="This is another place",
+                geom=Point(34.5514, 49.5883),
+            )
+
+    def test_other_integrity_errors_propagate(self):
+        with self.assertRaises(IntegrityError):
+            Place.objects.create(
+                name=None,
+                description="This is a test place",
+                geom=Point(34.5514, 49.5883),
+            )
+        with self.assertRaises(IntegrityError):
+            Place.objects.upsert(
+                [
+                    Place(
+                        name=None,
+                        description="This is a test place",
+                        geom=Point(34.5514, 49.5883),
+                    )
+                ]
+            )
+
+    def test_upsert_skip(self):
+        existing = Place.objects.create(
+            name="Test Place",
+            description="This is a test place",
+            geom=Point(34.5514, 49.5883),
+        )
+        written = Place.objects.upsert(
+            [
+                Place(
+                    name="Duplicate",
+                    description="Duplicate",
+                    geom=Point(34.5514, 49.5883),
+                ),
+                Place(
+                    name="New Place",
+                    description="New place",
+                    geom=Point(24.7097, 48.9226),
+                ),
+            ],
+            on_conflict=OnConflict.SKIP,
+        )
+        self.assertEqual([place.name for place in written], ["New Place"])
+        existing.refresh_from_db()
+        self.assertEqual(existing.name, "Test Place")
+        self.assertEqual(Place.objects.count(), 2)
+
+    def test_upsert_update(self):
+        existing = Place.objects.create(
+            name="Test Place",
+            description="This is a test place",
+            geom=Point(34.5514, 49.5883),
+        )
+        written = Place.objects.upsert(
+            [
+                Place(
+                    name="Updated Place",
+                    description="Updated description",
+                    geom=Point(34.5514, 49.5883),
+                )
+            ],
+            on_conflict=OnConflict.UPDATE,
+        )
+        self.assertEqual(written[0].pk, existing.pk)
+        existing.refresh_from_db()
+        self.assertEqual(existing.name, "Updated Place")
+        self.assertEqual(Place.objects.count(), 1)
+
+    def test_region_follows_the_geom(self):
+        place = Place.objects.create(
+            name="Test Place",
+            description="This is a test place",
+            geom=Point(34.5514, 49.5883),
+        )
+        self.assertEqual(place.region, "ub")
+        place.geom = Point(-0.1276, 51.5072)
+        place.save(update_fields=["geom"])
+        place.refresh_from_db()
+        self.assertEqual(place.region, "gc")
@@ -0,0 +1,28 @@
+from django.test import SimpleTestCase, override_settings
+
+from geo_service.models import place_region
+from geo_service.partitions import MAX_PRUNED_REGIONS, regions
+from geo_service.queries import search_frame
+
+
+@override_settings(PLACE_PARTITIONED=True)
+class RegionTests(SimpleTestCase):
+    def test_small_frame_stays_in_its_region(self):
+        frame = search_frame(34.5514, 49.5883, 1000)
+        self.assertEqual(regions([frame]), [place_region(34.5514, 49.5883)])
+
+    def test_frame_on_a_cell_edge_takes_both_sides(self):
+        west, east = place_region(-11.26, 50.0), place_region(-11.24, 50.0)
+        self.assertNotEqual(west, east)
+        self.assertEqual(
+            regions([(-11.25, 50.0, -11.25, 50.0)]), sorted({west, east})
+        )
+
+    def test_large_frames_are_not_pruned(self):
+        self.assertIsNone(regions([(-180.0, -90.0, 180.0, 90.0)]))
+        cells = regions([(0.0, 0.0, 40.0, 40.0)])
+        self.assertLessEqual(len(cells), MAX_PRUNED_REGIONS)
+
+    @override_settings(PLACE_PARTITIONED=False)
+    def test_plain_table_is_not_pruned(self):
+        self.assertIsNone(regions([search_frame(34.5514, 49.5883, 1000)]))
@@ -0,0 +1,81 @@
+import math
+from unittest import mock
+
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from geo_service.queries import WORLD_FRAME, search_frame
+from geo_service.spatial_index import EARTH_RADIUS
+
+
+def destination(longitude, latitude, bearing, distance):
+    latitude = math.radians(latitude)
+    bearing = math.radians(bearing)
+    angle = distance / EARTH_RADIUS
+    end_latitude = math.asin(
+        math.sin(latitude) * math.cos(angle)
+        + math.cos(latitude) * math.sin(angle) * math.cos(bearing)
+    )
+    end_longitude = math.radians(longitude) + math.atan2(
+        math.sin(bearing) * math.sin(angle) * math.cos(latitude),
+        math.cos(angle) - math.sin(latitude) * math.sin(end_latitude),
+    )
+    return (
+        (math.degrees(end_longitude) + 180) % 360 - 180,
+        math.degrees(end_latitude),
+    )
+
+
+class SearchFrameTests(SimpleTestCase):
+    def test_frame_holds_points_within_radius(self):
+        for longitude, latitude in [(34.5514, 49.5883), (0, 0), (-70, -75)]:
+            for radius in [100, 10_000, 500_000]:
+                frame = search_frame(longitude, latitude, radius)
+                for bearing in range(0, 360, 15):
+                    x, y = destination(longitude, latitude, bearing, radius)
+                    self.assertTrue(
+                        frame[0] <= x <= frame[2]
+                        and frame[1] <= y <= frame[3],
+                        (longitude, latitude, radius, bearing),
+                    )
+
+    def test_frame_spans_all_longitudes(self):
+        self.assertEqual(search_frame(179.99, 10, 5000)[::2], (-180.0, 180.0))
+        self.assertEqual(search_frame(0, 89.99, 5000)[::2], (-180.0, 180.0))
+        self.assertEqual(search_frame(30, 50, 25_000_000), WORLD_FRAME)
+
+
+@mock.patch("geo_service.views.is_postgis", return_value=False)
+class PostGISOnlyTests(SimpleTestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_bbox(self, is_postgis):
+        response = self.client.get(
+            reverse("geoservice:place-bbox"), {"bbox": "24,48,35,51"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+
+    def test_tile(self, is_postgis):
+        response = self.client.get(
+            reverse("geoservice:place-tile", args=[10, 610, 349])
+        )
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+
+    def test_search(self, is_postgis):
+        response = self.client.get(
+            reverse("geoservice:place-search"), {"q": "place"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+
+    def test_export(self, is_postgis):
+        response = self.client.get(
+            reverse("geoservice:place-export", args=["csv"])
+        )
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+
+    def test_changes(self, is_postgis):
+        response = self.client.get(reverse("geoservice:place-changes"))
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
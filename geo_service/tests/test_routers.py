@@ -0,0 +1,67 @@
+import threading
+
+from django.contrib.sessions.models import Session
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from geo_service.middleware import ReplicaPinningMiddleware
+from geo_service.models import Place
+from geo_service.routers import LagRepeater
+
+REPLICAS = ["replica_0", "replica_1"]
+
+
+@override_settings(DB_REPLICAS=REPLICAS, DB_REPLICA_STICKY_SECONDS=5)
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.read_from = None
+
+    def view(self, write=False):
+        def get_response(request):
+            if write:
+                router.db_for_write(Place)
+            self.read_from = router.db_for_read(Place)
+            return HttpResponse()
+
+        return ReplicaPinningMiddleware(get_response)
+
+    def test_reads_are_spread_over_replicas(self):
+        self.assertEqual(
+            {router.db_for_read(Place) for _ in range(100)}, set(REPLICAS)
+        )
+        self.assertEqual(router.db_for_write(Place), "default")
+        self.assertEqual(router.db_for_read(Session), "default")
+        self.assertFalse(router.allow_migrate("replica_0", "geo_service"))
+
+    def test_reads_after_a_write_stay_on_the_primary(self):
+        response = self.view(write=True)(self.factory.post("/"))
+        self.assertEqual(self.read_from, "default")
+        cookie = response.cookies[ReplicaPinningMiddleware.cookie_name]
+        self.assertEqual(cookie["max-age"], 5)
+
+        request = self.factory.get("/")
+        request.COOKIES[cookie.key] = cookie.value
+        self.view()(request)
+        self.assertEqual(self.read_from, "default")
+
+        response = self.view()(self.factory.get("/"))
+        self.assertIn(self.read_from, REPLICAS)
+        self.assertNotIn(
+            ReplicaPinningMiddleware.cookie_name, response.cookies
+        )
+
+
+class LagRepeaterTests(SimpleTestCase):
+    @override_settings(DB_REPLICAS=REPLICAS, DB_REPLICA_STICKY_SECONDS=0.01)
+    def test_repeats_after_the_sticky_window(self):
+        repeated = threading.Event()
+        LagRepeater().repeat(repeated.set)
+        self.assertTrue(repeated.wait(5))
+
+    @override_settings(DB_REPLICAS=[])
+    def test_nothing_to_repeat_without_replicas(self):
+        repeater = LagRepeater()
+        repeater.repeat(lambda: None)
+        self.assertIsNone(repeater._thread)
@@ -0,0 +1,117 @@
+from django.contrib.gis.geos import Point
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from geo_service.models import Place
+from geo_service.slow_queries import (
+    PLACE_TABLE,
+    SlowQueryLog,
+    place_scans,
+    summarize,
+)
+
+
+class FakeConnection:
+    vendor = "sqlite"
+
+
+def plan(node_type, index=None, relation=PLACE_TABLE):
+    return [
+        {
+            "Plan": {
+                "Node Type": "Limit",
+                "Plans": [
+                    {
+                        "Node Type": node_type,
+                        "Relation Name": relation,
+                        **({"Index Name": index} if index else {}),
+                    }
+                ],
+            }
+        }
+    ]
+
+
+@override_settings(SLOW_QUERY_THRESHOLD=0, SLOW_QUERY_LOG_SIZE=3)
+class SlowQueryLogTests(SimpleTestCase):
+    def setUp(self):
+        self.log = SlowQueryLog()
+        self.log.clear()
+
+    def test_ring_keeps_the_latest_entries(self):
+        wrapper = self.log._wrapper("view")
+        with self.assertLogs("geo_service.slow_queries", "WARNING"):
+            for number in range(5):
+                result = wrapper(
+                    lambda *args: "rows",
+                    "SELECT %s",
+                    [number],
+                    False,
+                    {"connection": FakeConnection()},
+                )
+        self.assertEqual(result, "rows")
+        entries = self.log.entries()
+        self.assertEqual(
+            [entry["params"] for entry in entries], [[2], [3], [4]]
+        )
+        self.assertIsNone(entries[0]["plan"])
+
+    def test_summary_flags_sequential_scans(self):
+        entries = [
+            {
+                "view": "nearest",
+                "sql": "SELECT 1",
+                "duration_ms": duration,
+                "plan": scan_plan,
+            }
+            for duration, scan_plan in [
+                (10.0, plan("Index Scan", "geo_service_place_geog_gist")),
+                (30.0, plan("Seq Scan")),
+                (20.0, None),
+            ]
+        ]
+        self.assertEqual(place_scans(plan("Seq Scan")), [("Seq Scan", None)])
+        self.assertEqual(
+            place_scans(
+                plan("Seq Scan", relation=f"{PLACE_TABLE}_partitioned_3")
+            ),
+            [("Seq Scan", None)],
+        )
+        self.assertEqual(
+            place_scans(plan("Seq Scan", relation=f"{PLACE_TABLE}_tombstone")),
+            [],
+        )
+        (group,) = summarize(entries)
+        self.assertEqual(group["count"], 3)
+        self.assertEqual(group["explained"], 2)
+        self.assertEqual(group["seq_scans"], 1)
+        self.assertEqual(group["mean_ms"], 20.0)
+        self.assertEqual(group["max_ms"], 30.0)
+        self.assertEqual(
+            group["scans"],
+            ["Index Scan using geo_service_place_geog_gist", "Seq Scan"],
+        )
+
+
+@override_settings(SLOW_QUERY_THRESHOLD=0, SLOW_QUERY_EXPLAIN_RATE=1.0)
+class SlowQueryExplainTests(APITestCase):
+    def setUp(self):
+        Place.objects.create(
+            name="Poltava",
+            description="Poltava",
+            geom=Point(34.5514, 49.5883, srid=4326),
+        )
+        call_command("slow_queries", "--clear")
+
+    def test_nearest_point_queries_are_explained(self):
+        with self.assertLogs("geo_service.slow_queries", "WARNING"):
+            self.client.get(
+                reverse("geoservice:place-get-nearest-point"),
+                {"latitude": "49.5", "longitude": "34.5"},
+            )
+        (group,) = summarize(SlowQueryLog().entries())
+        self.assertEqual(group["view"], "geoservice:place-get-nearest-point")
+        self.assertEqual(group["explained"], 1)
+        self.assertTrue(group["scans"])
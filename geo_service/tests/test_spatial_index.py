@@ -0,0 +1,167 @@
+import math
+import random
+from unittest import mock
+
+from django.contrib.gis.db.models.functions import Distance
+from django.contrib.gis.geos import Point
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from geo_service.models import Place
+from geo_service.spatial_index import (
+    EARTH_RADIUS,
+    SpatialIndex,
+    spheroid_distance,
+)
+from geo_service.spatial_engine import spatial_engine
+
+
+def haversine(longitude1, latitude1, longitude2, latitude2):
+    phi1, phi2 = math.radians(latitude1), math.radians(latitude2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(longitude2 - longitude1)
+    a = (
+        math.sin(d_phi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS * math.asin(math.sqrt(a))
+
+
+class SpatialIndexTests(SimpleTestCase):
+    def setUp(self):
+        generator = random.Random(42)
+        self.rows = [
+            (pk, generator.uniform(-180, 180), generator.uniform(-90, 90))
+            for pk in range(1, 2001)
+        ]
+        self.queries = [
+            (generator.uniform(-180, 180), generator.uniform(-90, 90))
+            for _ in range(20)
+        ]
+        self.index = SpatialIndex(self.rows)
+
+    def brute_force(self, longitude, latitude):
+        return sorted(
+            (haversine(longitude, latitude, x, y), pk)
+            for pk, x, y in self.rows
+        )
+
+    def test_nearest_matches_brute_force(self):
+        for longitude, latitude in self.queries:
+            expected = self.brute_force(longitude, latitude)[:3]
+            found = self.index.nearest(longitude, latitude, k=3)
+            self.assertEqual(
+                [pk for pk, _ in found], [pk for _, pk in expected]
+            )
+            self.assertAlmostEqual(found[0][1], expected[0][0], places=3)
+
+    def test_within_matches_brute_force(self):
+        for longitude, latitude in self.queries:
+            expected = [
+                pk
+                for distance, pk in self.brute_force(longitude, latitude)
+                if distance <= 1_000_000
+            ]
+            found = self.index.within(longitude, latitude, 1_000_000)
+            self.assertEqual([pk for pk, _ in found], expected)
+
+    def test_patches(self):
+        self.index.update(10_000, 10.0, 10.0)
+        self.assertEqual(self.index.nearest(10.0, 10.0)[0][0], 10_000)
+        self.index.delete(10_000)
+        self.assertNotEqual(self.index.nearest(10.0, 10.0)[0][0], 10_000)
+        pk, longitude, latitude = self.rows[0]
+        self.index.delete(pk)
+        self.assertNotEqual(self.index.nearest(longitude, latitude)[0][0], pk)
+
+    def test_masked_places_do_not_take_the_place_of_others(self):
+        longitude, latitude = self.queries[0]
+        expected = [pk for _, pk in self.brute_force(longitude, latitude)]
+        for pk in expected[:3]:
+            self.index.delete(pk)
+        found = self.index.nearest(longitude, latitude, k=3)
+        self.assertEqual([pk for pk, _ in found], expected[3:6])
+
+
+@override_settings(SPATIAL_INDEX_ENGINE=True)
+class SpheroidDistanceTests(SimpleTestCase):
+    def test_vincenty_reference(self):
+        # Flinders Peak to Buninyong, from Vincenty's paper.
+        self.assertAlmostEqual(
+            spheroid_distance(
+                144.42486788888889,
+                -37.95103341666667,
+                143.92649552777778,
+                -37.65282113888889,
+            ),
+            54972.271,
+            places=3,
+        )
+
+
+class SpatialIndexEngineTests(APITestCase):
+    def setUp(self):
+        self.place1 = Place.objects.create(
+            name="Place 1",
+            description="Description 1",
+            geom=Point(49.5883, 34.5514),
+        )
+        self.place2 = Place.objects.create(
+            name="Place 2",
+            description="Description 2",
+            geom=Point(49.5870, 34.5514),
+        )
+        spatial_engine.rebuild()
+
+    def tearDown(self):
+        spatial_engine.invalidate()
+
+    def test_get_nearest_point_from_engine(self):
+        self.assertTrue(spatial_engine.is_ready())
+        url = reverse("geoservice:place-get-nearest-point")
+        params = {"latitude": 49.5863, "longitude": 34.5514, "k": 2}
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [place["name"] for place in response.data],
+            [self.place2.name, self.place1.name],
+        )
+
+    def test_radius_from_engine(self):
+        url = reverse("geoservice:place-radius")
+        params = {
+            "latitude": 34.5514,
+            "longitude": 49.5863,
+            "distance": 1000,
+            "page_size": 1,
+        }
+        with mock.patch("geo_service.views.places_within") as sql:
+            first = self.client.get(url, params)
+            second = self.client.get(first.data["next"])
+        sql.assert_not_called()
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [row["id"] for row in first.data["results"]], [self.place2.pk]
+        )
+        self.assertEqual(
+            [row["id"] for row in second.data["results"]], [self.place1.pk]
+        )
+        self.assertAlmostEqual(
+            first.data["results"][0]["distance"],
+            Place.objects.annotate(
+                distance=Distance("geom", Point(49.5863, 34.5514, srid=4326))
+            )
+            .get(pk=self.place2.pk)
+            .distance.m,
+            places=2,
+        )
+
+    def test_place_missing_from_the_database_falls_back(self):
+        Place.objects.filter(pk=self.place1.pk).delete()
+        url = reverse("geoservice:place-get-nearest-point")
+        params = {"latitude": 34.5514, "longitude": 49.5883}
+        response = self.client.get(url, params)
+        self.assertEqual(response.data["name"], self.place2.name)
+        self.assertTrue(spatial_engine.is_ready())
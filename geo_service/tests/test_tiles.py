@@ -0,0 +1,80 @@
+import tempfile
+
+from django.contrib.gis.geos import Point
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from geo_service.models import Place
+from geo_service.tiles import TileCache, tile_position, tiles_containing
+
+
+class TileGridTests(SimpleTestCase):
+    def test_tile_position(self):
+        self.assertEqual(tile_position(0, 0, 0), (0.5, 0.5))
+        x, y = tile_position(34.5514, 49.5883, 10)
+        self.assertEqual((int(x), int(y)), (610, 349))
+
+    def test_tiles_containing(self):
+        self.assertEqual(
+            tiles_containing(34.5514, 49.5883, 10), {(10, 610, 349)}
+        )
+        self.assertEqual(
+            tiles_containing(0, 0, 1),
+            {(1, 0, 0), (1, 0, 1), (1, 1, 0), (1, 1, 1)},
+        )
+
+
+class TileCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(
+            TILE_CACHE_DIR=f"{directory.name}/tiles", TILE_CACHE_MAX_ZOOM=10
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.cache = TileCache()
+
+    def test_invalidate(self):
+        self.cache.set(10, 610, 349, b"tile")
+        self.cache.set(10, 0, 0, b"other")
+        self.assertEqual(self.cache.get(10, 610, 349), b"tile")
+        self.cache.invalidate(34.5514, 49.5883)
+        self.assertIsNone(self.cache.get(10, 610, 349))
+        self.assertEqual(self.cache.get(10, 0, 0), b"other")
+
+    def test_clear(self):
+        self.cache.set(10, 610, 349, b"tile")
+        self.cache.clear()
+        self.assertIsNone(self.cache.get(10, 610, 349))
+
+
+class PlaceTileViewTests(APITestCase):
+    def setUp(self):
+        Place.objects.create(
+            name="Place 1",
+            description="Description 1",
+            geom=Point(34.5514, 49.5883),
+        )
+
+    def test_tile(self):
+        url = reverse("geoservice:place-tile", args=[10, 610, 349])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response["Content-Type"], "application/vnd.mapbox-vector-tile"
+        )
+        self.assertTrue(response.content)
+
+    def test_empty_tile(self):
+        url = reverse("geoservice:place-tile", args=[10, 0, 0])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, b"")
+
+    def test_tile_out_of_range(self):
+        url = reverse("geoservice:place-tile", args=[1, 2, 0])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,29 @@
+from django.contrib.gis.geos import Point
+from django.test import SimpleTestCase
+
+from geo_service.transforms import (
+    is_valid_srid,
+    to_default_srid,
+    transform_coordinates,
+)
+
+
+class TransformTests(SimpleTestCase):
+    def test_is_valid_srid(self):
+        self.assertTrue(is_valid_srid(3857))
+        self.assertFalse(is_valid_srid(999999))
+
+    def test_transform_coordinates_matches_point_transform(self):
+        xs = [3421015.637931, 2753213.2, -1000.0]
+        ys = [5856452.233154, 6256043.5, 2000.0]
+        longitudes, latitudes = transform_coordinates(xs, ys, 3857)
+        for x, y, longitude, latitude in zip(xs, ys, longitudes, latitudes):
+            point = Point(x, y, srid=3857)
+            point.transform(4326)
+            self.assertAlmostEqual(longitude, point.x, places=9)
+            self.assertAlmostEqual(latitude, point.y, places=9)
+
+    def test_to_default_srid(self):
+        point = to_default_srid(3421015.637931, 5856452.233154, 3857)
+        self.assertEqual(point.srid, 4326)
+        self.assertAlmostEqual(point.x, 30.7315063, places=6)
@@ -1,13 +1,25 @@
+import json
+from unittest import mock
+
 from django.contrib.gis.geos import Point
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase, APITransactionTestCase
 
+from geo_service.ingest import IngestQueue
 from geo_service.models import Place
+from geo_service.serializers import PlaceDetailSerializer, PlaceListSerializer
 
 GET_NEAREST_POINT_LINK = (
     "http://127.0.0.1:8000/api/geo/places/get_nearest_point/"
 )
+BATCH_NEAREST_POINT_LINK = (
+    "http://127.0.0.1:8000/api/geo/places/batch_nearest_point/"
+)
 
 
 class PlaceViewSetTestCase(APITestCase):
@@ -83,12 +95,291 @@ class PlaceViewSetTestCase(APITestCase):
         self.assertEqual(response.data["latitude"], self.place3.geom.y)
         self.assertEqual(response.data["longitude"], self.place3.geom.x)
 
+    def test_get_nearest_point_with_k(self):
+        url = GET_NEAREST_POINT_LINK
+        params = {"latitude": 49.5863, "longitude": 34.5514, "k": 2}
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(response.data[0]["name"], self.place3.name)
+        self.assertEqual(response.data[1]["name"], self.place1.name)
+        self.assertLessEqual(
+            response.data[0]["distance"], response.data[1]["distance"]
+        )
+
+    @override_settings(DB_PREPARED_STATEMENTS=True)
+    def test_get_nearest_point_with_prepared_statements(self):
+        url = GET_NEAREST_POINT_LINK
+        params = {"latitude": 49.5863, "longitude": 34.5514}
+        for _ in range(2):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data["name"], self.place3.name)
+        self.assertIn("geo_nearest_places", connection.prepared_statements)
+
+    def test_get_nearest_point_with_invalid_k(self):
+        url = GET_NEAREST_POINT_LINK
+        params = {"latitude": 49.5863, "longitude": 34.5514, "k": 0}
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_nearest_point(self):
+        url = BATCH_NEAREST_POINT_LINK
+        data = [
+            {"latitude": 49.5863, "longitude": 34.5514},
+            {"latitude": 49.5863, "longitude": 34.5514, "distance": 10},
+            {"latitude": 24.7097, "longitude": 48.9226},
+        ]
+        response = self.client.post(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(response.data[0]["name"], self.place3.name)
+        self.assertIsNone(response.data[1])
+        self.assertEqual(response.data[2]["name"], self.place2.name)
+
+    def test_batch_nearest_point_with_too_many_points(self):
+        url = BATCH_NEAREST_POINT_LINK
+        data = [{"latitude": 49.5863, "longitude": 34.5514}] * 1001
+        response = self.client.post(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bbox(self):
+        url = reverse("geoservice:place-bbox")
+        response = self.client.get(url, {"bbox": "49,34,50,35"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data["clustered"])
+        self.assertEqual(
+            [place["id"] for place in response.data["results"]],
+            [self.place1.id, self.place3.id],
+        )
+
+    @override_settings(PLACE_BBOX_MAX_PLACES=1)
+    def test_bbox_clusters(self):
+        url = reverse("geoservice:place-bbox")
+        response = self.client.get(url, {"bbox": "40,20,60,40", "zoom": 5})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data["clustered"])
+        self.assertEqual(
+            [cluster["count"] for cluster in response.data["results"]],
+            [2, 1],
+        )
+        self.assertEqual(response.data["results"][1]["id"], self.place2.id)
+
+    def test_bbox_with_invalid_data(self):
+        url = reverse("geoservice:place-bbox")
+        response = self.client.get(url, {"bbox": "49,34,50"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_radius(self):
+        url = reverse("geoservice:place-radius")
+        params = {"latitude": 34.5514, "longitude": 49.5863, "distance": 1000}
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data["next"])
+        results = response.data["results"]
+        self.assertEqual(
+            [place["id"] for place in results],
+            [self.place3.id, self.place1.id],
+        )
+        self.assertLess(results[0]["distance"], results[1]["distance"])
+        self.assertLessEqual(results[1]["distance"], 1000)
+
+    def test_radius_pages(self):
+        url = reverse("geoservice:place-radius")
+        params = {
+            "latitude": 34.5514,
+            "longitude": 49.5863,
+            "distance": 1000,
+            "page_size": 1,
+        }
+        response = self.client.get(url, params)
+        self.assertEqual(
+            [place["id"] for place in response.data["results"]],
+            [self.place3.id],
+        )
+        response = self.client.get(response.data["next"])
+        self.assertEqual(
+            [place["id"] for place in response.data["results"]],
+            [self.place1.id],
+        )
+        self.assertIsNone(response.data["next"])
+
+    @override_settings(PLACE_RADIUS_MAX_RESULTS=1)
+    def test_radius_result_cap(self):
+        url = reverse("geoservice:place-radius")
+        params = {"latitude": 34.5514, "longitude": 49.5863, "distance": 1000}
+        response = self.client.get(url, params)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertIsNone(response.data["next"])
+
+    def test_radius_with_invalid_data(self):
+        url = reverse("geoservice:place-radius")
+        params = {"latitude": 34.5514, "longitude": 49.5863}
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(
+            url, {**params, "distance": 1000, "cursor": "nonsense"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search(self):
+        url = reverse("geoservice:place-search")
+        response = self.client.get(url, {"q": "description 2"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [place["id"] for place in response.data], [self.place2.id]
+        )
+        self.assertIsNone(response.data[0]["distance"])
+
+    def test_search_near_point(self):
+        url = reverse("geoservice:place-search")
+        params = {"q": "place", "latitude": 34.5514, "longitude": 49.5863}
+        response = self.client.get(url, params)
+        self.assertEqual(
+            [place["id"] for place in response.data],
+            [self.place3.id, self.place1.id, self.place2.id],
+        )
+        response = self.client.get(url, {**params, "distance": 1000})
+        self.assertEqual(
+            [place["id"] for place in response.data],
+            [self.place3.id, self.place1.id],
+        )
+
+    def test_search_with_invalid_data(self):
+        url = reverse("geoservice:place-search")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(url, {"q": "place", "latitude": 34.5})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(url, {"q": "place", "distance": 1000})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_import_places(self):
+        url = reverse("geoservice:place-import-places")
+        upload = SimpleUploadedFile(
+            "places.csv",
+            b"name,description,latitude,longitude\n"
+            b"New Place,New Description,50.476831,35.676254\n",
+        )
+        response = self.client.post(url, {"file": upload})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["imported"], 1)
+        self.assertTrue(Place.objects.filter(name="New Place").exists())
+
     def test_list(self):
         url = reverse("geoservice:place-list")
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         places = Place.objects.all()
-        self.assertEqual(len(response.data), places.count())
+        self.assertEqual(len(response.data["results"]), places.count())
+
+    def test_list_matches_serializer(self):
+        self.place1.description = (
+            "  One two\tthree\n\nfour five six seven eight nine ten eleven "
+        )
+        self.place1.save()
+        url = reverse("geoservice:place-list")
+        response = self.client.get(url)
+        expected = PlaceListSerializer(
+            Place.objects.order_by("id"), many=True
+        ).data
+        self.assertEqual(
+            JSONRenderer().render(response.data["results"]),
+            JSONRenderer().render(expected),
+        )
+
+    def test_retrieve_matches_serializer(self):
+        url = reverse("geoservice:place-detail", args=[self.place1.id])
+        response = self.client.get(url)
+        self.assertEqual(
+            response.content,
+            JSONRenderer().render(PlaceDetailSerializer(self.place1).data),
+        )
+
+    @override_settings(DATASET_ETAGS=True)
+    def test_list_not_modified_until_a_write(self):
+        url = reverse("geoservice:place-list")
+        etag = self.client.get(url)["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        self.assertNotEqual(
+            self.client.get(url, {"page_size": 2})["ETag"], etag
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.place2.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_without_shared_cache_has_no_etag(self):
+        response = self.client.get(reverse("geoservice:place-list"))
+        self.assertNotIn("ETag", response)
+
+    def test_retrieve_not_modified(self):
+        url = reverse("geoservice:place-detail", args=[self.place1.id])
+        response = self.client.get(url)
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.place1.name = "Renamed"
+        self.place1.save(update_fields=["name"])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["name"], "Renamed")
+
+    @override_settings(DATASET_ETAGS=True)
+    def test_get_nearest_point_not_modified(self):
+        params = {"latitude": 49.5863, "longitude": 34.5514}
+        etag = self.client.get(GET_NEAREST_POINT_LINK, params)["ETag"]
+        response = self.client.get(
+            GET_NEAREST_POINT_LINK, params, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_is_paginated_by_cursor(self):
+        url = reverse("geoservice:place-list")
+        response = self.client.get(url, {"page_size": 2})
+        self.assertEqual(
+            [place["id"] for place in response.data["results"]],
+            [self.place1.id, self.place2.id],
+        )
+        response = self.client.get(response.data["next"])
+        self.assertEqual(
+            [place["id"] for place in response.data["results"]],
+            [self.place3.id],
+        )
+        self.assertIsNone(response.data["next"])
+
+    def test_list_stream_ndjson(self):
+        url = reverse("geoservice:place-list")
+        response = self.client.get(url, {"stream": "ndjson"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual(
+            [row["id"] for row in rows],
+            [self.place1.id, self.place2.id, self.place3.id],
+        )
+
+    def test_list_stream_geojson(self):
+        url = reverse("geoservice:place-list")
+        response = self.client.get(url, {"stream": "geojson"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        collection = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(collection["type"], "FeatureCollection")
+        self.assertEqual(len(collection["features"]), 3)
+        self.assertEqual(
+            collection["features"][0]["geometry"]["coordinates"],
+            [self.place1.geom.x, self.place1.geom.y],
+        )
 
     def test_retrieve(self):
         url = reverse("geoservice:place-detail", args=[self.place1.id])
@@ -112,6 +403,34 @@ class PlaceViewSetTestCase(APITestCase):
         response = self.client.post(url, data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
+    @override_settings(PLACE_INGEST_ASYNC=True)
+    def test_create_queued(self):
+        data = {
+            "name": "New Place",
+            "description": "New Description",
+            "latitude": 50.476831,
+            "longitude": 35.676254,
+        }
+        with mock.patch(
+            "geo_service.views.ingest_queue", IngestQueue(worker=False)
+        ) as queue:
+            response = self.client.post(reverse("geoservice:place-list"), data)
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            self.assertEqual(response.data["status"], "queued")
+            self.assertFalse(Place.objects.filter(name="New Place").exists())
+
+            queue.drain()
+            response = self.client.get(response["Location"])
+        place = Place.objects.get(name="New Place")
+        self.assertEqual(
+            response.data,
+            {
+                "id": response.data["id"],
+                "status": "written",
+                "place_id": place.id,
+            },
+        )
+
     def test_update(self):
         url = reverse("geoservice:place-detail", args=[self.place1.id])
 
@@ -152,3 +471,51 @@ class PlaceViewSetTestCase(APITestCase):
         url = reverse("geoservice:place-detail", args=[self.place1.id])
         response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+
+class PlaceChangesTestCase(APITransactionTestCase):
+    # Changes are listed once their transaction has committed, which the
+    # writes of a TestCase never do.
+    def changes(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data["next"], [
+            (change["op"], change["id"]) for change in response.data["results"]
+        ]
+
+    def test_changes(self):
+        place1 = Place.objects.create(
+            name="Place 1", description="", geom=Point(49.5883, 34.5514)
+        )
+        place2 = Place.objects.create(
+            name="Place 2", description="", geom=Point(48.9226, 24.7097)
+        )
+        url = reverse("geoservice:place-changes") + "?page_size=10000"
+        url, changes = self.changes(url)
+        self.assertEqual(
+            changes[-2:], [("upsert", place1.id), ("upsert", place2.id)]
+        )
+        self.assertEqual(self.changes(url), (url, []))
+
+        place1.name = "Place 1 renamed"
+        place1.save()
+        place2.delete()
+        place3 = Place.objects.create(
+            name="Place 3", description="", geom=Point(49.5870, 34.5514)
+        )
+        url, changes = self.changes(url)
+        self.assertEqual(
+            changes,
+            [
+                ("upsert", place1.id),
+                ("delete", place2.id),
+                ("upsert", place3.id),
+            ],
+        )
+        self.assertEqual(self.changes(url)[1], [])
+
+    def test_changes_with_invalid_cursor(self):
+        response = self.client.get(
+            reverse("geoservice:place-changes"), {"since": "nope"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
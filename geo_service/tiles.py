@@ -0,0 +1,146 @@
+import math
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections, router
+
+from geo_service.models import Place
+
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+TILE_LAYER = "places"
+
+# Points are selected through the GiST index on ``geom`` with the tile
+# envelope, widened by the buffer, transformed back to 4326.
+TILE_SQL = """
+    WITH bounds AS (
+        SELECT
+            ST_TileEnvelope(%(z)s, %(x)s, %(y)s) AS tile,
+            ST_Transform(
+                ST_TileEnvelope(
+                    %(z)s, %(x)s, %(y)s, margin => %(margin)s
+                ),
+                {srid}
+            ) AS area
+    ),
+    features AS (
+        SELECT
+            ST_AsMVTGeom(
+                ST_Transform(place.geom, 3857),
+                bounds.tile,
+                {extent},
+                {buffer}
+            ) AS geom,
+            place.id,
+            place.name
+        FROM {table} AS place, bounds
+        WHERE place.geom && bounds.area
+    )
+    SELECT ST_AsMVT(features, '{layer}', {extent}, 'geom', 'id')
+    FROM features
+"""
+
+
+def render_tile(z: int, x: int, y: int) -> bytes:
+    sql = TILE_SQL.format(
+        table=Place._meta.db_table,
+        srid=settings.DEFAULT_SRID,
+        extent=TILE_EXTENT,
+        buffer=TILE_BUFFER,
+        layer=TILE_LAYER,
+    )
+    params = {"z": z, "x": x, "y": y, "margin": TILE_BUFFER / TILE_EXTENT}
+    with connections[router.db_for_read(Place)].cursor() as cursor:
+        cursor.execute(sql, params)
+        (tile,) = cursor.fetchone()
+    return bytes(tile) if tile is not None else b""
+
+
+def tile_position(longitude: float, latitude: float, z: int) -> tuple:
+    """Fractional x and y of the point on the tile grid of zoom ``z``."""
+    latitude = max(min(latitude, 85.0511287798), -85.0511287798)
+    scale = 2**z
+    x = (longitude + 180) / 360 * scale
+    y = (
+        (1 - math.asinh(math.tan(math.radians(latitude))) / math.pi)
+        / 2
+        * scale
+    )
+    return x, y
+
+
+def tiles_containing(longitude: float, latitude: float, z: int) -> set:
+    """Tiles of zoom ``z`` whose buffered area contains the point."""
+    x, y = tile_position(longitude, latitude, z)
+    margin = TILE_BUFFER / TILE_EXTENT
+    last = 2**z - 1
+    return {
+        (z, column % 2**z, row)
+        for column in range(math.floor(x - margin), math.floor(x + margin) + 1)
+        for row in range(
+            max(math.floor(y - margin), 0),
+            min(math.floor(y + margin), last) + 1,
+        )
+    }
+
+
+class TileCache:
+    """Rendered tiles stored as ``<z>/<x>/<y>.mvt`` under TILE_CACHE_DIR.
+
+    Only zooms up to TILE_CACHE_MAX_ZOOM are cached, so a change to a
+    place removes at most a handful of files per cached zoom.
+    """
+
+    @property
+    def enabled(self) -> bool:
+        return bool(settings.TILE_CACHE_DIR)
+
+    @property
+    def root(self) -> Path:
+        return Path(settings.TILE_CACHE_DIR)
+
+    def caches(self, z: int) -> bool:
+        return self.enabled and z <= settings.TILE_CACHE_MAX_ZOOM
+
+    def _path(self, z: int, x: int, y: int) -> Path:
+        return self.root / str(z) / str(x) / f"{y}.mvt"
+
+    def get(self, z: int, x: int, y: int):
+        try:
+            return self._path(z, x, y).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def set(self, z: int, x: int, y: int, tile: bytes) -> None:
+        path = self._path(z, x, y)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Written aside and renamed, so readers never see a partial tile.
+        descriptor, temporary = tempfile.mkstemp(dir=path.parent)
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(tile)
+        os.replace(temporary, path)
+
+    def invalidate(self, longitude: float, latitude: float) -> None:
+        self.invalidate_many([(longitude, latitude)])
+
+    def invalidate_many(self, points: list) -> None:
+        tiles = set()
+        for z in range(settings.TILE_CACHE_MAX_ZOOM + 1):
+            for longitude, latitude in points:
+                tiles |= tiles_containing(longitude, latitude, z)
+        for tile in tiles:
+            self._path(*tile).unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        if not self.root.exists():
+            return
+        # Moved away first, so no stale tile is served while deleting.
+        trash = tempfile.mkdtemp(dir=self.root.parent)
+        os.replace(self.root, Path(trash) / "tiles")
+        shutil.rmtree(trash, ignore_errors=True)
+
+
+tile_cache = TileCache()
@@ -0,0 +1,96 @@
+import functools
+import struct
+import threading
+
+from django.conf import settings
+from django.contrib.gis import gdal
+from django.contrib.gis.geos import Point
+
+from geo_service.metrics import measure
+
+# Points handed to GDAL in one geometry by ``transform_coordinates``.
+TRANSFORM_CHUNK_SIZE = 100_000
+
+_WKB_POINT = struct.Struct("<BIdd")
+_WKB_MULTIPOINT_HEADER = struct.Struct("<BII")
+
+# OGR objects must not be shared between threads.
+_local = threading.local()
+
+
+@functools.lru_cache(maxsize=1024)
+def is_valid_srid(srid: int) -> bool:
+    try:
+        gdal.SpatialReference(srid)
+    except Exception:
+        return False
+    return True
+
+
+@functools.lru_cache(maxsize=1024)
+def _spatial_reference_wkt(srid: int) -> str:
+    return gdal.SpatialReference(srid).wkt
+
+
+def coord_transform(source: int, target: int) -> gdal.CoordTransform:
+    transforms = _local.__dict__.setdefault("transforms", {})
+    transform = transforms.get((source, target))
+    if transform is None:
+        transform = transforms[source, target] = gdal.CoordTransform(
+            gdal.SpatialReference(_spatial_reference_wkt(source)),
+            gdal.SpatialReference(_spatial_reference_wkt(target)),
+        )
+    return transform
+
+
+def to_default_srid(longitude: float, latitude: float, srid: int) -> Point:
+    point = Point(x=longitude, y=latitude, srid=srid)
+    if srid != settings.DEFAULT_SRID:
+        with measure("transform"):
+            point.transform(coord_transform(srid, settings.DEFAULT_SRID))
+        point.srid = settings.DEFAULT_SRID
+    return point
+
+
+def transform_coordinates(xs, ys, source: int, target: int = None) -> tuple:
+    """Transform the points ``zip(xs, ys)`` from ``source`` to ``target``
+    (DEFAULT_SRID by default) and return the new ``(xs, ys)`` lists.
+
+    Every chunk of points goes through GDAL as a single multipoint, so the
+    per-call setup is paid once per chunk instead of once per point.
+    """
+    target = target or settings.DEFAULT_SRID
+    xs, ys = list(xs), list(ys)
+    if source == target:
+        return xs, ys
+    with measure("transform"):
+        return _transform_chunks(xs, ys, coord_transform(source, target))
+
+
+def _transform_chunks(xs: list, ys: list, transform) -> tuple:
+    new_xs, new_ys = [], []
+    for start in range(0, len(xs), TRANSFORM_CHUNK_SIZE):
+        chunk = range(start, min(start + TRANSFORM_CHUNK_SIZE, len(xs)))
+        wkb = _WKB_MULTIPOINT_HEADER.pack(1, 4, len(chunk)) + b"".join(
+            _WKB_POINT.pack(1, 1, xs[index], ys[index]) for index in chunk
+        )
+        geometry = gdal.OGRGeometry(memoryview(wkb))
+        geometry.transform(transform)
+        for x, y in _points_from_wkb(bytes(geometry.wkb)):
+            new_xs.append(x)
+            new_ys.append(y)
+    return new_xs, new_ys
+
+
+def _points_from_wkb(wkb: bytes):
+    order = "<" if wkb[0] == 1 else ">"
+    _, geometry_type, _ = struct.unpack_from(f"{order}BII", wkb)
+    if geometry_type != 4:
+        # Not a plain 2-d multipoint, read it the slow way.
+        yield from (
+            point[:2] for point in gdal.OGRGeometry(memoryview(wkb)).coords
+        )
+        return
+    point = struct.Struct(f"{order}BIdd")
+    for _, _, x, y in point.iter_unpack(wkb[_WKB_MULTIPOINT_HEADER.size :]):
+        yield x, y
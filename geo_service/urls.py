@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework import routers
 
-from geo_service.views import PlaceViewSet
+from geo_service.views import PlaceTileView, PlaceViewSet
 
 
 router = routers.DefaultRouter()
@@ -9,6 +9,11 @@ router.register("places", PlaceViewSet)
 
 urlpatterns = [
     path("", include(router.urls)),
+    path(
+        "tiles/<int:z>/<int:x>/<int:y>.mvt",
+        PlaceTileView.as_view(),
+        name="place-tile",
+    ),
 ]
 
 app_name = "geoservice"
@@ -1,6 +1,11 @@
-from django.contrib.gis.db.models.functions import Distance
+import functools
+import io
+import math
+
+from django.conf import settings
 from django.contrib.gis.geos import Point
-from django.contrib.gis.measure import Distance as DistanceMeasure
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import (
     OpenApiParameter,
     extend_schema,
@@ -8,22 +13,84 @@ from drf_spectacular.utils import (
 )
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from rest_framework.views import APIView
 
-from geo_service.models import Place
+from geo_service.cache import nearest_point_cache
+from geo_service.conditional import (
+    conditional,
+    dataset_validators,
+    place_validators,
+)
+from geo_service.exports import EXPORT_FORMATS, iter_export
+from geo_service.importers import (
+    FORMATS,
+    PlaceImportError,
+    detect_format,
+    import_places,
+)
+from geo_service.ingest import IngestQueueFull, ingest_queue
+from geo_service.metrics import exposition, measure
+from geo_service.models import OnConflict, Place
+from geo_service.pagination import PlaceCursorPagination, encode_cursor
+from geo_service.queries import (
+    is_postgis,
+    nearest_places,
+    nearest_places_batch,
+    place_changes,
+    place_detail,
+    places_in_bbox,
+    places_within,
+    search_places,
+)
 from geo_service.serializers import (
+    MAX_ZOOM,
+    BBoxQuerySerializer,
+    ChangesQuerySerializer,
+    NearestPointQuerySerializer,
     NearestPointSerializer,
     PlaceListSerializer,
     PlaceDetailSerializer,
     PlaceCreateSerializer,
+    RadiusQuerySerializer,
+    SearchQuerySerializer,
+    place_list_row,
 )
+from geo_service.slow_queries import slow_query_log
+from geo_service.spatial_engine import spatial_engine
+from geo_service.streaming import STREAM_FORMATS
+from geo_service.tiles import render_tile, tile_cache
+
+
+def postgis_only(view):
+    """Answer 501 from a view whose queries SpatiaLite cannot run."""
+
+    @functools.wraps(view)
+    def wrapper(self, request, *args, **kwargs):
+        if not is_postgis(write=request.method != "GET"):
+            return Response(
+                "This endpoint needs the PostGIS database backend.",
+                status=status.HTTP_501_NOT_IMPLEMENTED,
+            )
+        return view(self, request, *args, **kwargs)
+
+    return wrapper
 
 
 class PlaceViewSet(viewsets.ModelViewSet):
     queryset = Place.objects.all()
+    pagination_class = PlaceCursorPagination
+
+    def dispatch(self, request, *args, **kwargs):
+        match = request.resolver_match
+        view = match.view_name if match else type(self).__name__
+        with slow_query_log.capture(view):
+            return super().dispatch(request, *args, **kwargs)
 
     def get_serializer_class(self):
-        if self.action == "get_nearest_point":
+        if self.action in ["get_nearest_point", "batch_nearest_point"]:
             return NearestPointSerializer
         if self.action == "list":
             return PlaceListSerializer
@@ -39,6 +106,23 @@ class PlaceViewSet(viewsets.ModelViewSet):
         # Check if the remaining string consists of digits only
         return string.isdigit()
 
+    @staticmethod
+    def is_valid_k(string):
+        if not string.isdigit():
+            return False
+        return 1 <= int(string) <= settings.NEAREST_POINT_MAX_K
+
+    @staticmethod
+    def cluster_cell_size(width: float, height: float, zoom: int) -> float:
+        if zoom is None:
+            zoom = min(
+                int(math.log2(360 / max(width, height, 1e-9))), MAX_ZOOM
+            )
+        cell_size = 360 / 2**zoom / settings.PLACE_BBOX_CLUSTER_CELLS
+        return max(
+            cell_size, max(width, height) / settings.PLACE_BBOX_MAX_GRID
+        )
+
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -103,14 +187,36 @@ class PlaceViewSet(viewsets.ModelViewSet):
                     ),
                 ],
             ),
+            OpenApiParameter(
+                name="k",
+                type=int,
+                description="Return the k nearest points ranked by distance "
+                "instead of a single point (optional).",
+                required=False,
+                location=OpenApiParameter.QUERY,
+                examples=[
+                    OpenApiExample(
+                        value="",
+                        name="No value",
+                        description="Only the nearest point is returned",
+                    ),
+                    OpenApiExample(
+                        value=5,
+                        name="5 nearest points",
+                        description="List of the 5 nearest points",
+                    ),
+                ],
+            ),
         ],
         responses={200: NearestPointSerializer},
     )
     @action(detail=False, methods=["get"], name="get-nearest-point")
+    @conditional(dataset_validators)
     def get_nearest_point(self, request):
         latitude = request.query_params.get("latitude")
         longitude = request.query_params.get("longitude")
         distance = request.query_params.get("distance")
+        k = request.query_params.get("k")
 
         if latitude is None or longitude is None:
             return Response(
@@ -123,41 +229,394 @@ class PlaceViewSet(viewsets.ModelViewSet):
                 "You have to provide valid latitude and longitude.",
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        if k is not None and not self.is_valid_k(k):
+            return Response(
+                "k must be an integer between 1 and "
+                f"{settings.NEAREST_POINT_MAX_K}.",
+                status=status.HTTP_400_BAD_REQUEST,
+            )
         point = Point(float(longitude), float(latitude), srid=4326)
-        nearest_point = Place.objects.annotate(
-            distance=Distance("geom", point)
+        k = int(k) if k else None
+        distance = int(distance) if distance else None
+
+        hit = None
+        if nearest_point_cache.enabled:
+            nearest, hit = nearest_point_cache.get_or_set(
+                point, k or 1, distance, self._find_nearest_places
+            )
+        else:
+            nearest = self._find_nearest_places(point, k or 1, distance)
+
+        if not nearest:
+            response = Response(
+                {"detail": "No nearest point found."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        elif k is None:
+            response = Response(self.get_serializer(nearest[0]).data)
+        else:
+            response = Response(self.get_serializer(nearest, many=True).data)
+        if hit is not None:
+            response["X-Cache"] = "HIT" if hit else "MISS"
+        return response
+
+    @staticmethod
+    def _find_nearest_places(point, k, distance):
+        nearest = None
+        if spatial_engine.is_ready():
+            nearest = spatial_engine.nearest_places(
+                point, k=k, max_distance=distance
+            )
+        if nearest is None:
+            nearest = nearest_places(point, k=k, max_distance=distance)
+        return nearest
+
+    @extend_schema(
+        request=NearestPointQuerySerializer(many=True),
+        responses={200: NearestPointSerializer(many=True)},
+        examples=[
+            OpenApiExample(
+                name="Poltava and Ivano-Frankivsk",
+                description="Nearest points for two cities at once, the "
+                "second one limited to 1 km.",
+                value=[
+                    {"latitude": 49.5883, "longitude": 34.5514},
+                    {
+                        "latitude": 48.9226,
+                        "longitude": 24.7097,
+                        "distance": 1000,
+                    },
+                ],
+                request_only=True,
+            ),
+        ],
+    )
+    @action(
+        detail=False,
+        methods=["post"],
+        name="batch-nearest-point",
+        pagination_class=None,
+    )
+    def batch_nearest_point(self, request):
+        if (
+            isinstance(request.data, list)
+            and len(request.data) > settings.NEAREST_POINT_BATCH_SIZE
+        ):
+            return Response(
+                "You can look up at most "
+                f"{settings.NEAREST_POINT_BATCH_SIZE} points at once.",
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        queries = NearestPointQuerySerializer(data=request.data, many=True)
+        queries.is_valid(raise_exception=True)
+
+        nearest = nearest_places_batch(
+            [
+                (query["longitude"], query["latitude"], query.get("distance"))
+                for query in queries.validated_data
+            ]
+        )
+        found = iter(
+            self.get_serializer(
+                [place for place in nearest if place], many=True
+            ).data
         )
-        if distance:
-            nearest_point = nearest_point.filter(
-                distance__lte=DistanceMeasure(m=int(distance))
+        data = [next(found) if place else None for place in nearest]
+        return Response(data, status=status.HTTP_200_OK)
+
+    @extend_schema(
+        parameters=[RadiusQuerySerializer],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        name="radius",
+        pagination_class=None,
+    )
+    def radius(self, request):
+        query = RadiusQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        after_distance, after_id, returned = params.get("cursor", (-1.0, 0, 0))
+        limit = min(
+            params["page_size"],
+            settings.PLACE_RADIUS_MAX_RESULTS - returned,
+        )
+        rows = []
+        if limit > 0:
+            lookup = (
+                params["longitude"],
+                params["latitude"],
+                params["distance"],
+                (after_distance, after_id),
+                limit + 1,
             )
-        nearest_point = nearest_point.order_by("distance").first()
+            rows = None
+            if spatial_engine.is_ready():
+                rows = spatial_engine.places_within(*lookup)
+            if rows is None:
+                rows = places_within(*lookup)
+        next_url = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            returned += limit
+            if returned < settings.PLACE_RADIUS_MAX_RESULTS:
+                query_params = request.query_params.copy()
+                query_params["cursor"] = encode_cursor(
+                    [rows[-1]["distance"], rows[-1]["id"], returned]
+                )
+                next_url = request.build_absolute_uri(
+                    f"{request.path}?{query_params.urlencode()}"
+                )
+        return Response(
+            {"next": next_url, "results": rows}, status=status.HTTP_200_OK
+        )
 
-        if nearest_point:
-            serializer = self.get_serializer(nearest_point)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+    @extend_schema(
+        parameters=[SearchQuerySerializer],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        name="search",
+        pagination_class=None,
+    )
+    @postgis_only
+    def search(self, request):
+        query = SearchQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        point = None
+        if "latitude" in params:
+            point = (params["longitude"], params["latitude"])
+        rows = search_places(
+            params["q"],
+            point=point,
+            distance=params.get("distance"),
+            limit=params["limit"],
+        )
+        return Response(rows, status=status.HTTP_200_OK)
+
+    @extend_schema(
+        parameters=[ChangesQuerySerializer],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        name="changes",
+        pagination_class=None,
+    )
+    @postgis_only
+    def changes(self, request):
+        query = ChangesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        after = params.get("since", (0, 0, 0))
+        rows = place_changes(after=after, limit=params["page_size"])
+        if rows:
+            after = (rows[-1]["change_xid"], rows[-1]["seq"], rows[-1]["id"])
+        for row in rows:
+            del row["change_xid"]
+        # Always given: once the changes run out it is where to poll for
+        # new ones.
+        query_params = request.query_params.copy()
+        query_params["since"] = encode_cursor([*after])
+        next_url = request.build_absolute_uri(
+            f"{request.path}?{query_params.urlencode()}"
+        )
+        return Response(
+            {"next": next_url, "results": rows}, status=status.HTTP_200_OK
+        )
+
+    @extend_schema(
+        parameters=[BBoxQuerySerializer],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        name="bbox",
+        pagination_class=None,
+    )
+    @postgis_only
+    def bbox(self, request):
+        query = BBoxQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        (
+            min_longitude,
+            min_latitude,
+            max_longitude,
+            max_latitude,
+        ) = query.validated_data["bbox"]
+        if min_longitude <= max_longitude:
+            envelopes = [query.validated_data["bbox"]]
+            width = max_longitude - min_longitude
         else:
+            envelopes = [
+                (min_longitude, min_latitude, 180.0, max_latitude),
+                (-180.0, min_latitude, max_longitude, max_latitude),
+            ]
+            width = max_longitude - min_longitude + 360
+        clustered, rows = places_in_bbox(
+            envelopes,
+            max_places=settings.PLACE_BBOX_MAX_PLACES,
+            cell_size=self.cluster_cell_size(
+                width,
+                max_latitude - min_latitude,
+                query.validated_data.get("zoom"),
+            ),
+        )
+        if not clustered:
+            with measure("serialization"):
+                rows = [place_list_row(row) for row in rows]
+        return Response(
+            {"clustered": clustered, "results": rows},
+            status=status.HTTP_200_OK,
+        )
+
+    @extend_schema(
+        request={
+            "multipart/form-data": {
+                "type": "object",
+                "properties": {
+                    "file": {"type": "string", "format": "binary"},
+                    "format": {"type": "string", "enum": list(FORMATS)},
+                    "on_conflict": {
+                        "type": "string",
+                        "enum": OnConflict.values,
+                        "default": OnConflict.SKIP,
+                    },
+                },
+                "required": ["file"],
+            }
+        },
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(
+        detail=False,
+        methods=["post"],
+        name="import-places",
+        url_path="import",
+        parser_classes=[MultiPartParser],
+    )
+    @postgis_only
+    def import_places(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
             return Response(
-                {"detail": "No nearest point found."},
-                status=status.HTTP_404_NOT_FOUND,
+                "You have to provide a file.",
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            file_format = request.data.get("format") or detect_format(
+                upload.name
+            )
+            stream = io.TextIOWrapper(
+                upload.file, encoding="utf-8", newline=""
             )
+            report = import_places(
+                stream,
+                file_format,
+                on_conflict=request.data.get("on_conflict", OnConflict.SKIP),
+            )
+        except (PlaceImportError, UnicodeDecodeError) as error:
+            return Response(str(error), status=status.HTTP_400_BAD_REQUEST)
+        return Response(report.as_dict(), status=status.HTTP_200_OK)
 
     @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="stream",
+                type=str,
+                enum=list(STREAM_FORMATS),
+                description="Stream all places as NDJSON or as a GeoJSON "
+                "FeatureCollection instead of returning a page (optional).",
+                required=False,
+                location=OpenApiParameter.QUERY,
+            ),
+        ],
         responses={200: PlaceListSerializer(many=True)},
     )
+    @conditional(dataset_validators)
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        stream = request.query_params.get("stream")
+        if stream is None:
+            # Rows are read with values() and shaped like the serializer
+            # output, which skips model instances and GEOS geometries.
+            queryset = self.filter_queryset(self.get_queryset()).list_values()
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                with measure("serialization"):
+                    results = [place_list_row(row) for row in page]
+                return self.get_paginated_response(results)
+            queryset = list(queryset)
+            with measure("serialization"):
+                results = [place_list_row(row) for row in queryset]
+            return Response(results)
+        if stream not in STREAM_FORMATS:
+            return Response(
+                f"stream must be one of: {', '.join(STREAM_FORMATS)}.",
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        content_type, write = STREAM_FORMATS[stream]
+        queryset = self.filter_queryset(self.get_queryset()).order_by("id")
+        return StreamingHttpResponse(
+            write(queryset),
+            content_type=content_type,
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="export_format",
+                type=str,
+                enum=[*EXPORT_FORMATS],
+                location=OpenApiParameter.PATH,
+            ),
+        ],
+        responses={200: OpenApiTypes.BINARY},
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        name="export",
+        url_path="export/(?P<export_format>[a-z]+)",
+    )
+    @postgis_only
+    def export(self, request, export_format):
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                f"export_format must be one of: "
+                f"{', '.join(EXPORT_FORMATS)}.",
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        content_type, extension, _, _ = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(
+            iter_export(export_format), content_type=content_type
+        )
+        filename = f"places.{extension}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
 
     @extend_schema(
         parameters=[],
         responses={200: PlaceDetailSerializer},
     )
+    @conditional(place_validators)
     def retrieve(self, request, *args, **kwargs):
-        return super().retrieve(request, *args, **kwargs)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        pk = kwargs[lookup_url_kwarg]
+        place = place_detail(int(pk)) if pk.isdigit() else None
+        if place is None:
+            raise Http404
+        return Response(place)
 
     @extend_schema(
         request=PlaceCreateSerializer,
-        responses={201: PlaceDetailSerializer},
+        responses={201: PlaceDetailSerializer, 202: OpenApiTypes.OBJECT},
         examples=[
             OpenApiExample(
                 name="Add Chernivtsi",
@@ -199,7 +658,45 @@ class PlaceViewSet(viewsets.ModelViewSet):
         ],
     )
     def create(self, request, *args, **kwargs):
-        return super().create(request, *args, **kwargs)
+        if not settings.PLACE_INGEST_ASYNC:
+            return super().create(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        place = Place(
+            name=data.get("name"),
+            description=data.get("description"),
+            geom=data["geom"]["point"],
+        )
+        try:
+            ack = ingest_queue.submit(place, data["on_conflict"])
+        except IngestQueueFull:
+            return Response(
+                "Too many places are waiting to be written, try again later.",
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "1"},
+            )
+        location = reverse(
+            "geoservice:place-ingest-status", args=[ack], request=request
+        )
+        return Response(
+            {"id": ack, "status": "queued"},
+            status=status.HTTP_202_ACCEPTED,
+            headers={"Location": location},
+        )
+
+    @extend_schema(responses={200: OpenApiTypes.OBJECT})
+    @action(
+        detail=False,
+        methods=["get"],
+        name="ingest-status",
+        url_path="ingest/(?P<ack>[0-9a-f]{32})",
+    )
+    def ingest_status(self, request, ack):
+        ingest = ingest_queue.status(ack)
+        if ingest is None:
+            raise Http404
+        return Response({"id": ack, **ingest}, status=status.HTTP_200_OK)
 
     @extend_schema(
         request=PlaceCreateSerializer,
@@ -245,3 +742,37 @@ class PlaceViewSet(viewsets.ModelViewSet):
     )
     def destroy(self, request, *args, **kwargs):
         return super().destroy(request, *args, **kwargs)
+
+
+class PlaceTileView(APIView):
+    @extend_schema(
+        operation_id="geo_tiles_retrieve",
+        responses={
+            (200, "application/vnd.mapbox-vector-tile"): OpenApiTypes.BINARY
+        },
+    )
+    @postgis_only
+    def get(self, request, z, x, y):
+        if z > MAX_ZOOM or x >= 2**z or y >= 2**z:
+            return Response(
+                f"Tile {z}/{x}/{y} does not exist.",
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        cached = tile_cache.caches(z)
+        tile = tile_cache.get(z, x, y) if cached else None
+        hit = tile is not None
+        if not hit:
+            tile = render_tile(z, x, y)
+            if cached:
+                tile_cache.set(z, x, y, tile)
+        response = HttpResponse(
+            tile, content_type="application/vnd.mapbox-vector-tile"
+        )
+        if cached:
+            response["X-Cache"] = "HIT" if hit else "MISS"
+        return response
+
+
+def metrics(request):
+    content, content_type = exposition()
+    return HttpResponse(content, content_type=content_type)